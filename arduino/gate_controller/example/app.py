@@ -1,6 +1,5 @@
 import serial
-import barcode
-from barcode.writer import ImageWriter
+from barcode_render import escpos_barcode
 import os
 import win32print  # For Windows printing
 import time
@@ -68,17 +67,17 @@ def send_to_server(plat_nomor, jenis="Motor"):
         return f"OFF{int(time.time())%10000:04d}"
 
 def generate_and_print_barcode(barcode_data):
-    temp_file = "temp_barcode"
-    barcode_file = f"{temp_file}.png"
     printer_handle = None
 
     try:
-        # Generate a barcode image (Code 128 format)
-        barcode_format = barcode.get_barcode_class('code128')
-        barcode_image = barcode_format(barcode_data, writer=ImageWriter())
-
-        # Save the barcode image to a temporary file
-        barcode_image.save(temp_file)
+        # The printer draws the barcode itself (Code 128), no image needed
+        esc_pos_commands = (
+            b"\x1B\x40" +          # Initialize printer
+            b"\x1B\x61\x01" +      # Center alignment
+            escpos_barcode(barcode_data, 'code128') +
+            b"\x0A" +              # Line feed (new line)
+            b"\x1D\x56\x41\x00"    # Auto-cut command
+        )
 
         # Print the barcode using the default printer
         printer_name = win32print.GetDefaultPrinter()
@@ -87,11 +86,7 @@ def generate_and_print_barcode(barcode_data):
         printer_handle = win32print.OpenPrinter(printer_name)
         job_id = win32print.StartDocPrinter(printer_handle, 1, ("Barcode Print Job", None, "RAW"))
         win32print.StartPagePrinter(printer_handle)
-
-        with open(barcode_file, "rb") as f:
-            raw_data = f.read()
-            win32print.WritePrinter(printer_handle, raw_data)
-
+        win32print.WritePrinter(printer_handle, esc_pos_commands)
         win32print.EndPagePrinter(printer_handle)
         win32print.EndDocPrinter(printer_handle)
 
@@ -106,13 +101,6 @@ def generate_and_print_barcode(barcode_data):
             except Exception as e:
                 print(f"Error closing printer handle: {e}")
 
-        # Clean up the temporary file
-        if os.path.exists(barcode_file):
-            try:
-                os.remove(barcode_file)
-            except Exception as e:
-                print(f"Error deleting temporary file: {e}")
-
 def process_vehicle_entry(plat_nomor):
     try:
         # Get ticket number from server
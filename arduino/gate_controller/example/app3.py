@@ -1,5 +1,7 @@
 import serial
-import win32print 
+from barcode_render import escpos_barcode
+from print_spooler import PrintSpooler
+from printer_backend import load_backend
 import time
 import psycopg2
 import logging
@@ -12,9 +14,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Open the serial connection to the Arduino
-arduino = serial.Serial('COM7', 9600, timeout=1)
-
 # Database connection details
 DB_HOST = "192.168.2.6"
 DB_PORT = "5432"
@@ -22,42 +21,39 @@ DB_NAME = "parkingdjango"
 DB_USER = "postgres"          
 DB_PASSWORD = "postgres"       
 
-def print_barcode(barcode_data):
-    try:
-        printer_name = win32print.GetDefaultPrinter()
-        logger.info(f"Printing to: {printer_name}")
-        print(f"Printing to: {printer_name}")
-
-        printer_handle = win32print.OpenPrinter(printer_name)
-        job_id = win32print.StartDocPrinter(printer_handle, 1, ("Barcode Print Job", None, "RAW"))
-        win32print.StartPagePrinter(printer_handle)
-
-        esc_pos_commands = (
-            b"\x1B\x40" +          # Initialize printer
-            b"\x1B\x61\x01" +      # Center alignment
-            f"Barcode: {barcode_data}\n".encode() +  # Label for clarity
-            b"\x1D\x6B\x49" +      # Barcode type: Code 128
-            barcode_data.encode() + b"\x00" +  # Barcode data (null-terminated)
-            b"\x0A" +              # Line feed (new line)
-            b"\x1D\x56\x41\x00"    # Auto-cut command
-        )
-
-        win32print.WritePrinter(printer_handle, esc_pos_commands)
-        win32print.EndPagePrinter(printer_handle)
-        win32print.EndDocPrinter(printer_handle)
-
-        logger.info("Barcode printed successfully!")
+def build_barcode_ticket(barcode_data):
+    """ESC/POS commands for a barcode ticket"""
+    return (
+        b"\x1B\x40" +          # Initialize printer
+        b"\x1B\x61\x01" +      # Center alignment
+        f"Barcode: {barcode_data}\n".encode() +  # Label for clarity
+        escpos_barcode(barcode_data, 'code128') +  # Code 128, length-prefixed
+        b"\x0A" +              # Line feed (new line)
+        b"\x1D\x56\x41\x00"    # Auto-cut command
+    )
+
+def on_print_state(job, state):
+    if state == 'printed':
+        logger.info(f"Barcode printed successfully: {job['name']}")
         print("Barcode printed successfully!")
+    elif state == 'paper_out':
+        logger.warning(f"Printer out of paper, {job['name']} waiting")
+        print("Printer out of paper, ticket is waiting in the queue")
+    elif state == 'failed':
+        logger.error(f"Error printing barcode: {job['name']}")
+        print(f"Error printing barcode: {job['name']}")
+
+def print_barcode(spooler, barcode_data):
+    """Queue a barcode ticket; the spooler thread does the printing"""
+    if spooler is None:
+        logger.warning(f"Skipping barcode printing - printer not available: {barcode_data}")
+        print("Printer not available, ticket not printed")
+        return
+    try:
+        spooler.submit(build_barcode_ticket(barcode_data), name=barcode_data, key=barcode_data)
     except Exception as e:
-        logger.error(f"Error printing barcode: {e}")
-        print(f"Error printing barcode: {e}")
-    finally:
-        if 'printer_handle' in locals():
-            try:
-                win32print.ClosePrinter(printer_handle)
-            except Exception as e:
-                logger.error(f"Error closing printer handle: {e}")
-                print(f"Error closing printer handle: {e}")
+        logger.error(f"Error queueing barcode: {e}")
+        print(f"Error queueing barcode: {e}")
 
 def insert_into_database(barcode_data):
     connection = None
@@ -113,40 +109,64 @@ def main():
     print("Starting parking system...")
     print("Waiting for vehicle data...")
 
-    while True:
-        try:
-            # Reconnect to the Arduino if the connection is lost
-            if not arduino.is_open:
-                arduino.open()
-                logger.info("Reconnected to Arduino")
-                print("Reconnected to Arduino")
-
-            # Check for incoming data from the Arduino
-            if arduino.in_waiting > 0:
-                received_data = arduino.readline().decode('utf-8').strip()
-
-                if received_data:
-                    logger.info(f"Received data from Arduino: {received_data}")
-                    print(f"Received data from Arduino: {received_data}")
-
-                    # Step 1: Insert the data into the PostgreSQL database
-                    ticket_number = insert_into_database(received_data)
-                    
-                    if ticket_number:
-                        # Step 2: Print the ticket with barcode
-                        print_barcode(ticket_number)
-                    else:
-                        logger.warning("Skipping ticket printing due to database error")
-                        print("Skipping ticket printing due to database error")
-
-        except KeyboardInterrupt:
-            logger.info("Exiting...")
-            print("Exiting...")
-            break
-        except Exception as e:
-            logger.error(f"Error: {e}")
-            print(f"Error: {e}")
-            time.sleep(5)  # Wait before retrying
+    # Open the serial connection to the Arduino
+    arduino = serial.Serial('COM7', 9600, timeout=1)
+
+    # Keep recording vehicles without a printer; tickets are skipped until it is fixed
+    printer, spooler = None, None
+    try:
+        printer = load_backend()
+        logger.info(f"Printing to: {printer.name}")
+        print(f"Printing to: {printer.name}")
+        spooler = PrintSpooler(printer.send, on_state=on_print_state)
+        spooler.start()
+    except Exception as e:
+        logger.error(f"Could not open printer: {e}")
+        print(f"Could not open printer: {e}")
+        print("Check the [printer] section of config.ini (type, printer_name, vendor_id/product_id, host)")
+
+    try:
+        while True:
+            try:
+                # Reconnect to the Arduino if the connection is lost
+                if not arduino.is_open:
+                    arduino.open()
+                    logger.info("Reconnected to Arduino")
+                    print("Reconnected to Arduino")
+
+                # Check for incoming data from the Arduino
+                if arduino.in_waiting > 0:
+                    received_data = arduino.readline().decode('utf-8').strip()
+
+                    if received_data:
+                        logger.info(f"Received data from Arduino: {received_data}")
+                        print(f"Received data from Arduino: {received_data}")
+
+                        # Step 1: Insert the data into the PostgreSQL database
+                        ticket_number = insert_into_database(received_data)
+                        
+                        if ticket_number:
+                            # Step 2: Queue the ticket with barcode, without waiting for the printer
+                            print_barcode(spooler, ticket_number)
+                        else:
+                            logger.warning("Skipping ticket printing due to database error")
+                            print("Skipping ticket printing due to database error")
+
+            except Exception as e:
+                logger.error(f"Error: {e}")
+                print(f"Error: {e}")
+                time.sleep(5)  # Wait before retrying
+
+    except KeyboardInterrupt:
+        logger.info("Exiting...")
+        print("Exiting...")
+    finally:
+        # Unprinted tickets stay queued on disk for the next start
+        if spooler:
+            spooler.stop()
+        if printer:
+            printer.close()
+        arduino.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
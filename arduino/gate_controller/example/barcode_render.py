@@ -0,0 +1,232 @@
+import functools
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Code 128 symbols as bar/space widths in modules (bar first), by value.
+# 103-105 are Start A/B/C; the stop pattern is kept separately.
+CODE128_WIDTHS = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312",
+    "132212", "221213", "221312", "231212", "112232", "122132", "122231", "113222",
+    "123122", "123221", "223211", "221132", "221231", "213212", "223112", "312131",
+    "311222", "321122", "321221", "312212", "322112", "322211", "212123", "212321",
+    "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121",
+    "313121", "211331", "231131", "213113", "213311", "213131", "311123", "311321",
+    "331121", "312113", "312311", "332111", "314111", "221411", "431111", "111224",
+    "111422", "121124", "121421", "141122", "141221", "112214", "112412", "122114",
+    "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112",
+    "421211", "212141", "214121", "412121", "111143", "111341", "131141", "114113",
+    "114311", "411113", "411311", "113141", "114131", "311141", "411131", "211412",
+    "211214", "211232"
+)
+CODE128_STOP = "2331112"
+CODE128_START_B = 104
+CODE128_START_C = 105
+CODE128_SWITCH_B = 100
+CODE128_SWITCH_C = 99
+
+# Code 39 characters as nine bar/space elements (bar first), n = narrow, w = wide
+CODE39_PATTERNS = {
+    '0': "nnnwwnwnn", '1': "wnnwnnnnw", '2': "nnwwnnnnw", '3': "wnwwnnnnn",
+    '4': "nnnwwnnnw", '5': "wnnwwnnnn", '6': "nnwwwnnnn", '7': "nnnwnnwnw",
+    '8': "wnnwnnwnn", '9': "nnwwnnwnn", 'A': "wnnnnwnnw", 'B': "nnwnnwnnw",
+    'C': "wnwnnwnnn", 'D': "nnnnwwnnw", 'E': "wnnnwwnnn", 'F': "nnwnwwnnn",
+    'G': "nnnnnwwnw", 'H': "wnnnnwwnn", 'I': "nnwnnwwnn", 'J': "nnnnwwwnn",
+    'K': "wnnnnnnww", 'L': "nnwnnnnww", 'M': "wnwnnnnwn", 'N': "nnnnwnnww",
+    'O': "wnnnwnnwn", 'P': "nnwnwnnwn", 'Q': "nnnnnnwww", 'R': "wnnnnnwwn",
+    'S': "nnwnnnwwn", 'T': "nnnnwnwwn", 'U': "wwnnnnnnw", 'V': "nwwnnnnnw",
+    'W': "wwwnnnnnn", 'X': "nwnnwnnnw", 'Y': "wwnnwnnnn", 'Z': "nwwnwnnnn",
+    '-': "nwnnnnwnw", '.': "wwnnnnwnn", ' ': "nwwnnnwnn", '$': "nwnwnwnnn",
+    '/': "nwnwnnnwn", '+': "nwnnnwnwn", '%': "nnnwnwnwn", '*': "nwnnwnwnn"
+}
+CODE39_WIDE = 3
+
+# ESC/POS GS k symbology numbers (function B: length-prefixed data)
+ESCPOS_SYMBOLOGY = {'code39': 69, 'code128': 73}
+
+SYMBOLOGIES = ('code128', 'code39')
+
+def _widths_to_modules(widths):
+    # "2112" -> [1, 1, 0, 1, 0, 0]: bars and spaces alternate, starting with a bar
+    return np.repeat(np.arange(len(widths)) % 2 == 0, [int(w) for w in widths])
+
+@functools.lru_cache(maxsize=None)
+def code128_table():
+    """Module arrays for every Code 128 value, plus the stop pattern (built once)"""
+    return [_widths_to_modules(widths) for widths in CODE128_WIDTHS], _widths_to_modules(CODE128_STOP)
+
+@functools.lru_cache(maxsize=None)
+def code39_table():
+    """Module arrays for every Code 39 character, each followed by its narrow gap (built once)"""
+    return {
+        char: _widths_to_modules(''.join(str(CODE39_WIDE) if e == 'w' else '1' for e in pattern) + '1')
+        for char, pattern in CODE39_PATTERNS.items()
+    }
+
+def _digit_run(data, start):
+    end = start
+    while end < len(data) and data[end].isdigit() and data[end].isascii():
+        end += 1
+    return end - start
+
+def code128_segments(data):
+    """Split data into Code 128 code set B and C segments
+
+    Runs of digits go to code set C (two digits per symbol) when they are
+    long enough to pay for the switch: four at either end of the data, six
+    in the middle, or any even number making up all of it. Everything else
+    is code set B.
+
+    Returns:
+        List of (code_set, text) tuples
+
+    Raises:
+        ValueError: If data is empty or has characters outside printable ASCII
+    """
+    if not data:
+        raise ValueError("Code 128 data is empty")
+    segments = []
+    i = 0
+    while i < len(data):
+        run = _digit_run(data, i)
+        at_edge = i == 0 or i + run == len(data)
+        if run >= (4 if at_edge else 6) or (run == len(data) and run % 2 == 0):
+            # An odd digit is left for code set B
+            run -= run % 2
+            code_set, text = 'C', data[i:i + run]
+        else:
+            char = data[i]
+            if not 32 <= ord(char) < 127:
+                raise ValueError(f"Character {char!r} cannot be encoded in Code 128")
+            code_set, text = 'B', char
+        if segments and segments[-1][0] == code_set:
+            segments[-1] = (code_set, segments[-1][1] + text)
+        else:
+            segments.append((code_set, text))
+        i += len(text)
+    return segments
+
+def code128_values(data):
+    """Code 128 symbol values for data, including start and check symbols"""
+    values = []
+    for code_set, text in code128_segments(data):
+        if code_set == 'C':
+            values.append(CODE128_SWITCH_C if values else CODE128_START_C)
+            values.extend(int(text[j:j + 2]) for j in range(0, len(text), 2))
+        else:
+            values.append(CODE128_SWITCH_B if values else CODE128_START_B)
+            values.extend(ord(char) - 32 for char in text)
+    checksum = (values[0] + sum(position * value for position, value in enumerate(values[1:], 1))) % 103
+    values.append(checksum)
+    return values
+
+def encode_modules(data, symbology='code128'):
+    """Bar pattern for data as a boolean array, one entry per module (True = bar)
+
+    Raises:
+        ValueError: For an unknown symbology or data it cannot encode
+    """
+    if symbology == 'code128':
+        symbols, stop = code128_table()
+        return np.concatenate([symbols[value] for value in code128_values(data)] + [stop])
+    if symbology == 'code39':
+        table = code39_table()
+        text = data.upper()
+        invalid = [char for char in text if char not in table or char == '*']
+        if not text or invalid:
+            raise ValueError(f"Cannot encode {data!r} in Code 39")
+        # The last gap is not part of the symbol
+        return np.concatenate([table[char] for char in f"*{text}*"])[:-1]
+    raise ValueError(f"Unknown symbology: {symbology}")
+
+@functools.lru_cache(maxsize=8)
+def _label_font(size):
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 has only the fixed-size bitmap font
+        return ImageFont.load_default()
+
+def render_barcode(data, symbology='code128', module_width=2, height=80, quiet_zone=10,
+                   size=None, text=True, font_size=16):
+    """Render a barcode to an in-memory 1-bit image
+
+    Args:
+        data: Text to encode
+        symbology: 'code128' or 'code39'
+        module_width: Pixels per narrow module (ignored when size is given)
+        height: Bar height in pixels (ignored when size is given)
+        quiet_zone: Blank modules on each side
+        size: Optional (width, height) of the result; the widest whole-pixel
+            module that fits is used and the bars are centered, so module
+            widths stay even instead of being stretched by a resize
+        text: Print data below the bars
+        font_size: Size of that text
+
+    Returns:
+        PIL image in mode '1'
+    """
+    modules = encode_modules(data, symbology)
+    font = _label_font(font_size) if text else None
+    text_height = font_size + 4 if text else 0
+    total_modules = len(modules) + 2 * quiet_zone
+
+    if size:
+        module_width = max(1, size[0] // total_modules)
+        height = max(1, size[1] - text_height)
+
+    row = np.pad(~modules, quiet_zone, constant_values=True)
+    row = np.repeat(row, module_width)
+    bars = np.ascontiguousarray(np.broadcast_to(row, (height, len(row))))
+    image = Image.new('1', (len(row), height + text_height), 1)
+    image.paste(Image.fromarray(bars), (0, 0))
+    if text:
+        draw = ImageDraw.Draw(image)
+        draw.text((len(row) // 2, height + 2), data, font=font, fill=0, anchor='mt')
+
+    if size and image.size != tuple(size):
+        if image.width > size[0]:
+            # Too many modules even at one pixel each
+            image = image.resize((size[0], image.height), Image.NEAREST)
+        canvas = Image.new('1', tuple(size), 1)
+        canvas.paste(image, ((size[0] - image.width) // 2, 0))
+        image = canvas
+    return image
+
+def escpos_barcode(data, symbology='code128', height=80, module_width=2, hri=2):
+    """ESC/POS commands that make the printer draw the barcode itself
+
+    Args:
+        data: Text to encode
+        symbology: 'code128' or 'code39'
+        height: Bar height in dots (GS h)
+        module_width: Module width 2-6 (GS w)
+        hri: Human-readable text position, 0 none, 1 above, 2 below (GS H)
+
+    Returns:
+        bytes for GS H, GS h, GS w and GS k (function B, length-prefixed)
+    """
+    if symbology == 'code128':
+        # Code set selectors are sent in-line; code set C takes one byte per digit pair
+        payload = bytearray()
+        for code_set, text in code128_segments(data):
+            payload += b"{" + code_set.encode()
+            if code_set == 'C':
+                payload += bytes(int(text[j:j + 2]) for j in range(0, len(text), 2))
+            else:
+                payload += text.replace('{', '{{').encode('ascii')
+    elif symbology == 'code39':
+        encode_modules(data, symbology)  # validate
+        payload = data.upper().encode('ascii')
+    else:
+        raise ValueError(f"Unknown symbology: {symbology}")
+    if len(payload) > 255:
+        raise ValueError(f"Barcode data too long: {len(payload)} bytes")
+
+    return (
+        bytes([0x1D, 0x48, hri]) +
+        bytes([0x1D, 0x68, height]) +
+        bytes([0x1D, 0x77, module_width]) +
+        bytes([0x1D, 0x6B, ESCPOS_SYMBOLOGY[symbology], len(payload)]) + bytes(payload)
+    )
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import tempfile
+import argparse
+import configparser
+import numpy as np
+from app3 import build_barcode_ticket
+from escpos_raster import RasterPrinter
+from print_spooler import PrintSpooler
+from printer_backend import open_backend
+from ticket_printer import TicketPrinter
+
+PERCENTILES = (50, 95, 99)
+
+SAMPLE_TICKET = {
+    "plate_number": "B 1234 XY",
+    "vehicle_type": "Motor",
+    "entry_time": "2024-03-19 12:34:56"
+}
+
+def summarize(samples):
+    samples = np.array(samples) * 1000.0
+    result = {f"p{p}_ms": float(np.percentile(samples, p)) for p in PERCENTILES}
+    result['mean_ms'] = float(samples.mean())
+    return result
+
+class SlowPrinter:
+    # Wraps a backend with a fixed per-job print time, like a thermal printer feeding paper
+    def __init__(self, backend, seconds):
+        self.backend = backend
+        self.seconds = seconds
+
+    def send(self, data):
+        self.backend.send(data)
+        time.sleep(self.seconds)
+
+def entry_inline(send, tickets, gap):
+    # Button loop before the spooler: the next vehicle waits for the printer
+    waits = []
+    for index in range(tickets):
+        started = time.perf_counter()
+        send(build_barcode_ticket(f"PK-{index:06d}"))
+        waits.append(time.perf_counter() - started)
+        time.sleep(gap)
+    return waits
+
+def entry_spooled(send, tickets, gap, queue_dir):
+    spooler = PrintSpooler(send, queue_dir)
+    spooler.start()
+    waits = []
+    for index in range(tickets):
+        started = time.perf_counter()
+        spooler.submit(build_barcode_ticket(f"PK-{index:06d}"), name=str(index))
+        waits.append(time.perf_counter() - started)
+        time.sleep(gap)
+    spooler.flush()
+    spooler.stop()
+    return waits, spooler.stats()
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Entry-path printing latency on any printer backend")
+    parser.add_argument('--config', default='config.ini', help="Config file with a [printer] section")
+    parser.add_argument('--type', help="Override [printer] type, e.g. file or tcp")
+    parser.add_argument('--tickets', type=int, default=50)
+    parser.add_argument('--printer-ms', type=float, default=300.0, help="Simulated print time per job")
+    parser.add_argument('--gap-ms', type=float, default=100.0, help="Time between vehicles")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    temp_dir = tempfile.mkdtemp(prefix="benchmark_print_")
+
+    config = configparser.ConfigParser()
+    config.read(args.config)
+    if not config.has_section('printer'):
+        config.add_section('printer')
+    if args.type:
+        config.set('printer', 'type', args.type)
+    if config.get('printer', 'type', fallback='file') == 'file':
+        config.set('printer', 'output_file', os.path.join(temp_dir, 'printer_output.bin'))
+
+    backend = open_backend(config)
+    printer = SlowPrinter(backend, args.printer_ms / 1000.0)
+    gap = args.gap_ms / 1000.0
+    print(f"Backend: {backend.name}, {args.tickets} tickets, "
+          f"{args.printer_ms:.0f} ms per print, a vehicle every {args.gap_ms:.0f} ms")
+
+    # Raster cost per ticket, for backends that receive images
+    raster = RasterPrinter(backend, paper_width=config.getint('printer', 'paper_width', fallback=576))
+    ticket_printer = TicketPrinter()
+    samples = []
+    for _ in range(args.tickets):
+        started = time.perf_counter()
+        raster.print_image(ticket_printer.render_ticket(SAMPLE_TICKET))
+        samples.append(time.perf_counter() - started)
+    result = summarize(samples)
+    print(f"\nRaster ticket (render + pack + send): mean {result['mean_ms']:.2f} ms, "
+          f"p95 {result['p95_ms']:.2f} ms, {raster.stats()['bytes_sent'] // args.tickets} bytes")
+
+    print(f"\n  {'button loop blocked per vehicle':<38} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    inline = summarize(entry_inline(printer.send, args.tickets, gap))
+    spooled_waits, spooler_stats = entry_spooled(printer.send, args.tickets, gap, os.path.join(temp_dir, 'queue'))
+    spooled = summarize(spooled_waits)
+    for name, result in (("inline print (before)", inline), ("spooler submit (after)", spooled)):
+        print(f"  {name:<38} {result['mean_ms']:8.2f} {result['p50_ms']:8.2f} "
+              f"{result['p95_ms']:8.2f} {result['p99_ms']:8.2f}")
+    print(f"\nSpooler: submit-to-printed p50 {spooler_stats['latency_p50_ms']:.0f} ms, "
+          f"p95 {spooler_stats['latency_p95_ms']:.0f} ms, {spooler_stats['coalesced']} jobs coalesced")
+    backend.close()
@@ -0,0 +1,69 @@
+import io
+import sys
+import time
+import argparse
+import numpy as np
+from ticket_printer import TicketPrinter
+
+PERCENTILES = (50, 95, 99)
+
+SAMPLE_TICKET = {
+    "plate_number": "B 1234 XY",
+    "vehicle_type": "Motor",
+    "entry_time": "2024-03-19 12:34:56"
+}
+
+def measure(func, iterations, warmup=3):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    samples = np.array(samples)
+    result = {f"p{p}_ms": float(np.percentile(samples, p)) for p in PERCENTILES}
+    result['mean_ms'] = float(samples.mean())
+    return result
+
+def save_png(image):
+    # Encode as create_ticket_image does, without touching the disk
+    image.save(io.BytesIO(), format='PNG')
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Per-ticket render time with and without the template cache")
+    parser.add_argument('--iterations', type=int, default=200)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    printer = TicketPrinter()
+
+    # Barcode generation is identical in both paths; time it separately so
+    # the template saving is visible on its own
+    template = printer.get_template(use_cache=True)
+    barcode_img = printer.generate_barcode(SAMPLE_TICKET['plate_number'], size=template.barcode_size)
+
+    cases = [
+        ("layout only, rebuilt (before)",
+         lambda: printer.get_template(use_cache=False).render(SAMPLE_TICKET, barcode_img)),
+        ("layout only, cached (after)",
+         lambda: template.render(SAMPLE_TICKET, barcode_img)),
+        ("full ticket + PNG, rebuilt (before)",
+         lambda: save_png(printer.render_ticket(SAMPLE_TICKET, use_cache=False))),
+        ("full ticket + PNG, cached (after)",
+         lambda: save_png(printer.render_ticket(SAMPLE_TICKET))),
+    ]
+
+    print(f"{args.iterations} tickets per case")
+    print(f"  {'case':<38} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    results = {}
+    for name, func in cases:
+        result = measure(func, args.iterations)
+        results[name] = result
+        print(f"  {name:<38} {result['mean_ms']:8.2f} {result['p50_ms']:8.2f} "
+              f"{result['p95_ms']:8.2f} {result['p99_ms']:8.2f}")
+
+    before = results["full ticket + PNG, rebuilt (before)"]['mean_ms']
+    after = results["full ticket + PNG, cached (after)"]['mean_ms']
+    print(f"\nPer-ticket render: {before:.2f} ms -> {after:.2f} ms ({(after - before) / before * 100:+.1f}%)")
@@ -1,11 +1,13 @@
 import time
 import logging
 from datetime import datetime
-import win32print
 import random
 import serial
 import requests
 import json
+from barcode_render import escpos_barcode
+from print_spooler import PrintSpooler
+from printer_backend import load_backend
 
 # Setup logging
 logging.basicConfig(
@@ -27,7 +29,24 @@ class ParkingButton:
         """
         self.terminal = terminal
         self.api = terminal.api if terminal else None
-        self.printer_name = win32print.GetDefaultPrinter()
+        # Printer backend comes from [printer] in config.ini (win32, escpos, tcp, file, ...).
+        # Without a printer vehicles are still admitted, only the tickets are not printed
+        self.printer = None
+        self.printer_name = None
+        self.spooler = None
+        try:
+            self.printer = load_backend()
+            self.printer_name = self.printer.name
+            # Tickets are printed by the spooler thread so a slow printer never blocks the next vehicle
+            self.spooler = PrintSpooler(
+                self.printer.send,
+                lock=terminal.printer_lock if terminal else None,
+                on_state=self._on_print_state
+            )
+        except Exception as e:
+            logger.error(f"Could not open printer: {e}")
+            print(f"❌ Gagal membuka printer: {e}")
+            print("Pastikan [printer] di config.ini sesuai (type, printer_name, vendor_id/product_id, host)")
         self.offline_counter = self._load_counter()
         self.running = False
         self.arduino = None
@@ -91,77 +110,82 @@ class ParkingButton:
             logger.error(f"Error getting ticket from server: {e}")
         return None
             
-    def _print_ticket(self, ticket_data, is_offline=False):
-        """Print parking ticket using thermal printer"""
-        try:
-            printer_handle = win32print.OpenPrinter(self.printer_name)
-            job_id = win32print.StartDocPrinter(printer_handle, 1, ("Parking Ticket", None, "RAW"))
-            win32print.StartPagePrinter(printer_handle)
-            
-            # Prepare commands list
-            commands = []
-            
-            # Header
-            commands.extend([
-                b"\x1B\x40",          # Initialize printer
-                b"\x1B\x61\x01",      # Center alignment
-                b"\x1B\x21\x30",      # Double width + height + bold
-                b"=== PARKIR RSI BNA ===\n",
-                b"\x1B\x21\x00"       # Normal text
-            ])
-            
-            # Add offline indicator if needed
-            if is_offline:
-                commands.extend([
-                    b"\x1B\x21\x08",  # Bold
-                    b"[OFFLINE MODE]\n",
-                    b"\x1B\x21\x00"   # Normal text
-                ])
-            
-            commands.append(b"\n")
-            
-            # Ticket details
-            commands.extend([
-                f"Plat: {ticket_data['plat']}\n".encode(),
-                f"Jenis: {ticket_data.get('jenis', '-')}\n".encode(),
-                f"Waktu: {ticket_data['waktu_masuk']}\n\n".encode()
-            ])
-            
-            # Print barcode using CODE39
-            ticket_number = ticket_data['tiket']
-            commands.extend([
-                b"\x1D\x48\x02",      # HRI position - below barcode
-                b"\x1D\x68\x50",      # Barcode height = 80 dots
-                b"\x1D\x77\x02",      # Barcode width multiplier (2)
-                b"\x1D\x6B\x04",      # Select CODE39
-                bytes([len(ticket_number)]) + ticket_number.encode(),  # Length + data
-                b"\n\n"
-            ])
-            
-            # Footer
+    def _build_ticket(self, ticket_data, is_offline=False):
+        """ESC/POS commands for a parking ticket"""
+        # Prepare commands list
+        commands = []
+
+        # Header
+        commands.extend([
+            b"\x1B\x40",          # Initialize printer
+            b"\x1B\x61\x01",      # Center alignment
+            b"\x1B\x21\x30",      # Double width + height + bold
+            b"=== PARKIR RSI BNA ===\n",
+            b"\x1B\x21\x00"       # Normal text
+        ])
+
+        # Add offline indicator if needed
+        if is_offline:
             commands.extend([
-                b"\x1B\x61\x01",      # Center align
-                b"Terima kasih\n",
-                b"Jangan hilangkan tiket ini\n",
-                b"\n",
-                b"\x1D\x56\x41\x00"   # Cut paper
+                b"\x1B\x21\x08",  # Bold
+                b"[OFFLINE MODE]\n",
+                b"\x1B\x21\x00"   # Normal text
             ])
-            
-            # Combine all commands
-            ticket_text = b"".join(commands)
-            
-            # Send to printer
-            win32print.WritePrinter(printer_handle, ticket_text)
-            win32print.EndPagePrinter(printer_handle)
-            win32print.EndDocPrinter(printer_handle)
-            win32print.ClosePrinter(printer_handle)
-            
-            logger.info("Ticket printed successfully")
+
+        commands.append(b"\n")
+
+        # Ticket details
+        commands.extend([
+            f"Plat: {ticket_data['plat']}\n".encode(),
+            f"Jenis: {ticket_data.get('jenis', '-')}\n".encode(),
+            f"Waktu: {ticket_data['waktu_masuk']}\n\n".encode()
+        ])
+
+        # Print barcode using CODE39
+        ticket_number = ticket_data['tiket']
+        commands.extend([
+            # HRI below, 80 dots high, width multiplier 2
+            escpos_barcode(ticket_number, 'code39', height=80, module_width=2, hri=2),
+            b"\n\n"
+        ])
+
+        # Footer
+        commands.extend([
+            b"\x1B\x61\x01",      # Center align
+            b"Terima kasih\n",
+            b"Jangan hilangkan tiket ini\n",
+            b"\n",
+            b"\x1D\x56\x41\x00"   # Cut paper
+        ])
+
+        # Combine all commands
+        return b"".join(commands)
+
+    def _print_ticket(self, ticket_data, is_offline=False):
+        """Queue a parking ticket for the thermal printer without waiting for it"""
+        if self.spooler is None:
+            logger.warning(f"Skipping ticket printing - printer not available: {ticket_data['tiket']}")
+            print(f"⚠️ Printer tidak tersedia, tiket {ticket_data['tiket']} tidak dicetak")
+            return False
+
+        try:
+            self.spooler.submit(self._build_ticket(ticket_data, is_offline),
+                                name=ticket_data['tiket'], key=ticket_data['tiket'])
+            logger.info(f"Ticket queued for printing: {ticket_data['tiket']}")
             return True
-            
         except Exception as e:
-            logger.error(f"Error printing ticket: {e}")
+            logger.error(f"Error queueing ticket: {e}")
             return False
+
+    def _on_print_state(self, job, state):
+        """Report spooler progress for a ticket"""
+        if state == 'printed':
+            logger.info(f"Ticket printed successfully: {job['name']}")
+            print(f"✅ Tiket dicetak: {job['name']}")
+        elif state == 'paper_out':
+            print(f"⚠️ Kertas printer habis, tiket {job['name']} menunggu")
+        elif state == 'failed':
+            print(f"❌ Gagal mencetak tiket {job['name']}")
             
     def _handle_button_press(self):
         """Handle button press event"""
@@ -185,10 +209,14 @@ class ParkingButton:
                         'waktu_masuk': server_data['waktu']
                     }
                     logger.info(f"Got ticket from server: {ticket_data}")
-                    # Print ticket
+                    # Queue ticket; the spooler reports when it is printed
                     if self._print_ticket(ticket_data):
                         print(f"✅ Kendaraan {plate_number} berhasil masuk")
-                        print(f"✅ Tiket dicetak: {ticket_data['tiket']}")
+                        print(f"🖨️ Tiket diantrekan: {ticket_data['tiket']}")
+                        return
+                    if self.spooler is None:
+                        # Already registered online; an offline ticket would not print either
+                        print(f"✅ Kendaraan {plate_number} berhasil masuk (tanpa tiket)")
                         return
             
             # Fallback to offline mode
@@ -203,11 +231,11 @@ class ParkingButton:
             
             if self._print_ticket(offline_data, is_offline=True):
                 print(f"✅ [OFFLINE] Kendaraan {plate_number} berhasil masuk")
-                print(f"✅ Tiket dicetak: {offline_data['tiket']}")
+                print(f"🖨️ Tiket diantrekan: {offline_data['tiket']}")
                 self.offline_counter += 1
                 self._save_counter()
             else:
-                print(f"❌ Gagal mencetak tiket offline")
+                print(f"❌ Gagal mengantrekan tiket offline")
                 
         except Exception as e:
             logger.error(f"Error handling button press: {e}")
@@ -222,6 +250,8 @@ class ParkingButton:
         print("Tekan Ctrl+C untuk keluar\n")
         
         self.running = True
+        if self.spooler:
+            self.spooler.start()
         while self.running:
             try:
                 if self.arduino and self.arduino.is_open:
@@ -245,6 +275,11 @@ class ParkingButton:
     def stop(self):
         """Stop the button handler"""
         self.running = False
+        # Queued tickets are kept on disk and printed after the next start
+        if self.spooler:
+            self.spooler.stop()
+        if self.printer:
+            self.printer.close()
         if self.arduino and self.arduino.is_open:
             self.arduino.close()
         logger.info("Button handler stopped")
@@ -254,5 +289,4 @@ if __name__ == "__main__":
         button = ParkingButton(None)  # For standalone testing
         button.start()
     finally:
-        if button.arduino and button.arduino.is_open:
-            button.arduino.close() 
\ No newline at end of file
+        button.stop() 
\ No newline at end of file
@@ -0,0 +1,141 @@
+import threading
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CameraSupervisor:
+    """Watch a FrameGrabber for stalls and reconnect in the background
+
+    When no new frame arrives within stall_timeout, the dead capture is
+    swapped out and connect() is retried with jittered exponential backoff
+    until it returns a working capture. The grabber keeps its buffered
+    frames meanwhile, so callers can still fall back to the last good frame.
+    """
+
+    def __init__(self, grabber, connect, stall_timeout=2.0, base_delay=0.5, max_delay=30.0,
+                 check_interval=0.2, on_state_change=None):
+        """
+        Args:
+            grabber: FrameGrabber to watch
+            connect: Callable returning a new opened capture, or None
+            stall_timeout: Seconds without a frame before reconnecting
+            base_delay: First backoff delay in seconds
+            max_delay: Backoff ceiling in seconds
+            check_interval: Seconds between stall checks
+            on_state_change: Callable(connected, attempts, camera) for status updates
+        """
+        self.grabber = grabber
+        self.connect = connect
+        self.stall_timeout = stall_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.check_interval = check_interval
+        self.on_state_change = on_state_change
+
+        self.running = False
+        self.thread = None
+        self.stop_event = threading.Event()
+
+        # State and counters
+        self.connected = True
+        self.attempts = 0
+        self.outages = 0
+        self.reconnects = 0
+        self.outage_started = None
+        self.last_outage_seconds = None
+        self.watch_from = None
+
+    def start(self):
+        """Start the supervisor thread"""
+        if self.running:
+            return
+        self.running = True
+        self.watch_from = time.time()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name=f"CameraSupervisor-{self.grabber.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop supervising; an in-progress connect() is left to finish"""
+        self.running = False
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def backoff_delay(self, attempt):
+        """Delay before the given reconnect attempt (1-based)
+
+        Exponential in the attempt number and capped at max_delay, with the
+        upper half randomised so several gates don't hammer the NVR in step.
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def frame_age(self):
+        """Seconds since the grabber last delivered a frame"""
+        return time.time() - max(self.grabber.last_frame_time or 0, self.watch_from)
+
+    def _run(self):
+        while self.running:
+            if self.frame_age() > self.stall_timeout:
+                self._reconnect()
+            self.stop_event.wait(self.check_interval)
+
+    def _reconnect(self):
+        self.outages += 1
+        self.outage_started = time.time()
+        self.connected = False
+        logger.warning(f"Camera {self.grabber.name} stalled ({self.frame_age():.1f}s without a frame), reconnecting")
+
+        # Drop the dead capture so it stops holding a stream session
+        self.grabber.swap_camera(None)
+        self._notify(None)
+
+        self.attempts = 0
+        while self.running:
+            self.attempts += 1
+            if self.stop_event.wait(self.backoff_delay(self.attempts)):
+                return
+
+            try:
+                camera = self.connect()
+            except Exception as e:
+                logger.error(f"Reconnect attempt {self.attempts} failed: {e}")
+                camera = None
+
+            if camera is not None:
+                self.grabber.swap_camera(camera)
+                self.connected = True
+                self.reconnects += 1
+                self.last_outage_seconds = time.time() - self.outage_started
+                logger.info(f"Camera {self.grabber.name} reconnected after {self.attempts} attempt(s), "
+                            f"{self.last_outage_seconds:.1f}s outage")
+                # Give the new stream a full stall window to deliver its first frame
+                self.watch_from = time.time()
+                self._notify(camera)
+                self.attempts = 0
+                return
+
+            logger.warning(f"Reconnect attempt {self.attempts} failed for {self.grabber.name}")
+            self._notify(None)
+
+    def _notify(self, camera):
+        if self.on_state_change:
+            try:
+                self.on_state_change(self.connected, self.attempts, camera)
+            except Exception as e:
+                logger.error(f"Camera state callback failed: {e}")
+
+    def stats(self):
+        """State and counters for status display"""
+        return {
+            'connected': self.connected,
+            'attempts': self.attempts,
+            'outages': self.outages,
+            'reconnects': self.reconnects,
+            'last_outage_seconds': self.last_outage_seconds,
+            'frame_age': self.frame_age() if self.watch_from else None
+        }
@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import queue
+import sqlite3
+import argparse
+import threading
+import time
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    filename TEXT PRIMARY KEY,
+    ticket TEXT NOT NULL,
+    timestamp TEXT,
+    plate_number TEXT,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_captures_ticket ON captures (ticket);
+CREATE INDEX IF NOT EXISTS idx_captures_timestamp ON captures (timestamp);
+"""
+
+def ticket_from_filename(filename):
+    """Ticket number for a capture file (TKT..._0001.jpg -> TKT..._0001)"""
+    return os.path.splitext(os.path.basename(filename))[0]
+
+def normalize_timestamp(value):
+    """Store timestamps in one sortable format, whatever the sidecar used"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat(sep=' ', timespec='seconds')
+    except ValueError:
+        return value
+
+def open_database(db_path):
+    conn = sqlite3.connect(db_path, timeout=10)
+    # WAL lets the exit lane read while the gate writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def make_row(metadata):
+    filename = metadata['filename']
+    return (
+        filename,
+        ticket_from_filename(filename),
+        normalize_timestamp(metadata.get('timestamp')),
+        metadata.get('plate_number'),
+        json.dumps(metadata, separators=(',', ':'))
+    )
+
+class CaptureCatalog:
+    """Indexed SQLite catalog of capture metadata
+
+    Replaces the per-image JSON sidecars. Records are queued by add() and
+    written by a single background thread in batched transactions; lookups
+    by ticket or time range go through indexes instead of a directory scan.
+    """
+
+    def __init__(self, db_path, batch_size=32, flush_interval=1.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.records = queue.Queue()
+        self.read_lock = threading.Lock()
+
+        # Create the schema up front so readers never see a missing table
+        self.read_conn = open_database(db_path)
+        self.read_conn.row_factory = sqlite3.Row
+
+        self.written = 0
+        self.batches = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="CaptureCatalog", daemon=True)
+        self.thread.start()
+
+    def add(self, metadata):
+        """Queue a capture's metadata; must contain 'filename'"""
+        self.records.put(metadata)
+
+    def _run(self):
+        conn = open_database(self.db_path)
+        try:
+            while True:
+                batch = []
+                try:
+                    record = self.records.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch.append(record)
+                # Gather more records for one transaction, for at most
+                # flush_interval after the first one arrived
+                deadline = time.time() + self.flush_interval
+                while len(batch) < self.batch_size and record is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        record = self.records.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    batch.append(record)
+
+                stop = None in batch
+                rows = []
+                try:
+                    for record in batch:
+                        if record is None:
+                            continue
+                        try:
+                            rows.append(make_row(record))
+                        except Exception as e:
+                            logger.error(f"Skipping bad catalog record {record!r}: {e}")
+                    if rows:
+                        with conn:
+                            conn.executemany("INSERT OR REPLACE INTO captures VALUES (?, ?, ?, ?, ?)", rows)
+                        self.written += len(rows)
+                        self.batches += 1
+                except Exception as e:
+                    logger.error(f"Failed to write {len(rows)} catalog records: {e}")
+                finally:
+                    for _ in batch:
+                        self.records.task_done()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Block until every queued record has been committed"""
+        self.records.join()
+
+    def close(self):
+        """Commit pending records and stop the writer"""
+        if not self.running:
+            return
+        self.running = False
+        self.records.put(None)
+        self.thread.join(timeout=10)
+        with self.read_lock:
+            self.read_conn.close()
+
+    def _query(self, sql, params=()):
+        with self.read_lock:
+            rows = self.read_conn.execute(sql, params).fetchall()
+        return [json.loads(row['metadata']) for row in rows]
+
+    def get(self, filename):
+        """Metadata for one capture file, or None"""
+        rows = self._query("SELECT metadata FROM captures WHERE filename = ?", (filename,))
+        return rows[0] if rows else None
+
+    def find_ticket(self, ticket):
+        """Metadata for a ticket number, e.g. at the exit lane, or None"""
+        rows = self._query("SELECT metadata FROM captures WHERE ticket = ? "
+                           "ORDER BY timestamp DESC LIMIT 1", (ticket,))
+        return rows[0] if rows else None
+
+    def between(self, start, end):
+        """Captures with start <= timestamp < end (datetimes or ISO strings)"""
+        start, end = (value.isoformat(sep=' ', timespec='seconds') if isinstance(value, datetime) else value
+                      for value in (start, end))
+        return self._query("SELECT metadata FROM captures WHERE timestamp >= ? AND timestamp < ? "
+                           "ORDER BY timestamp", (start, end))
+
+    def count(self):
+        with self.read_lock:
+            return self.read_conn.execute("SELECT COUNT(*) FROM captures").fetchone()[0]
+
+    def stats(self):
+        return {
+            'pending': self.records.qsize(),
+            'written': self.written,
+            'batches': self.batches
+        }
+
+def import_sidecars(capture_dir, db_path, delete=False, batch_size=500):
+    """Import existing <image>.jpg.json sidecars into the catalog
+
+    Safe to run repeatedly: records are keyed by filename and replaced.
+
+    Args:
+        capture_dir: Directory holding captures and sidecars
+        db_path: Catalog database to create or update
+        delete: Remove each sidecar once its batch is committed
+        batch_size: Records per transaction
+
+    Returns:
+        Tuple (imported, skipped)
+    """
+    conn = open_database(db_path)
+    imported, skipped = 0, 0
+    batch, sidecars = [], []
+
+    def commit():
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO captures VALUES (?, ?, ?, ?, ?)", batch)
+        if delete:
+            for sidecar in sidecars:
+                os.remove(sidecar)
+        batch.clear()
+        sidecars.clear()
+
+    try:
+        for entry in sorted(os.scandir(capture_dir), key=lambda entry: entry.name):
+            if not entry.name.lower().endswith('.jpg.json'):
+                continue
+            try:
+                with open(entry.path, 'r') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable sidecar {entry.name}: {e}")
+                skipped += 1
+                continue
+
+            metadata.setdefault('filename', entry.name[:-len('.json')])
+            batch.append(make_row(metadata))
+            sidecars.append(entry.path)
+            imported += 1
+            if len(batch) >= batch_size:
+                commit()
+        if batch:
+            commit()
+    finally:
+        conn.close()
+    return imported, skipped
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Import capture sidecars into the capture catalog")
+    parser.add_argument('capture_dir', nargs='?', default=os.path.join(base_dir, 'capture_images'))
+    parser.add_argument('--db', default=os.path.join(base_dir, 'capture_catalog.db'),
+                        help="Catalog database path")
+    parser.add_argument('--delete', action='store_true',
+                        help="Delete sidecars after they are imported")
+    args = parser.parse_args()
+
+    started = time.time()
+    imported, skipped = import_sidecars(args.capture_dir, args.db, args.delete)
+    print(f"Imported {imported} sidecars into {args.db} ({skipped} skipped) in {time.time() - started:.1f}s")
+    sys.exit(1 if skipped and not imported else 0)
@@ -0,0 +1,346 @@
+import cv2
+import os
+import re
+import shutil
+import json
+import time
+import zipfile
+import threading
+import logging
+from datetime import datetime, date, timedelta
+from spool_common import atomic_write
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_NAME = re.compile(r'^TKT(\d{8})\d*_\d+.*\.jpg$', re.IGNORECASE)
+# Quarantined segments keep the day so the normal tiers still delete them
+SEGMENT_NAME = re.compile(r'^captures-(\d{8})(?:-bad\d+)?\.zip$')
+
+class RetentionPolicy:
+    """Ages (in days) at which captures move down a storage tier"""
+
+    def __init__(self, full_res_days=7, archive_after_days=30, delete_after_days=180,
+                 downscale_width=960, downscale_quality=70):
+        self.full_res_days = full_res_days
+        self.archive_after_days = archive_after_days
+        self.delete_after_days = delete_after_days
+        self.downscale_width = downscale_width
+        self.downscale_quality = downscale_quality
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a policy from the [retention] section of config.ini"""
+        return cls(
+            full_res_days=config.getint('retention', 'full_res_days', fallback=7),
+            archive_after_days=config.getint('retention', 'archive_after_days', fallback=30),
+            delete_after_days=config.getint('retention', 'delete_after_days', fallback=180),
+            downscale_width=config.getint('retention', 'downscale_width', fallback=960),
+            downscale_quality=config.getint('retention', 'downscale_quality', fallback=70)
+        )
+
+def capture_day(path):
+    """Day a capture was taken, from its TKTyyyymmdd... name or its mtime"""
+    match = CAPTURE_NAME.match(os.path.basename(path))
+    if match:
+        try:
+            return datetime.strptime(match.group(1), '%Y%m%d').date()
+        except ValueError:
+            pass
+    return date.fromtimestamp(os.path.getmtime(path))
+
+class RetentionEngine:
+    """Move captures through full-res -> reduced -> archived -> deleted
+
+    Work is done incrementally: each pass handles at most max_files_per_run
+    images and sleeps between files so it never reads or writes faster than
+    max_bytes_per_second. Progress per tier is kept as a "done through day"
+    cursor in a small state file, so finished days are not rescanned.
+    """
+
+    def __init__(self, capture_dir, archive_dir, policy, state_file, max_files_per_run=200,
+                 max_bytes_per_second=5 * 1024 * 1024, catalog=None, free_space_check=None,
+                 on_freed=None):
+        """
+        Args:
+            capture_dir: Directory the camera writes captures into
+            archive_dir: Directory for daily archive segments
+            policy: RetentionPolicy
+            state_file: JSON file holding the per-tier cursors
+            max_files_per_run: Images handled per pass
+            max_bytes_per_second: I/O budget for the background pass
+            catalog: Optional CaptureCatalog to record archive locations in
+            free_space_check: Optional callable returning True while free
+                space is sufficient; when it returns False, a pass frees
+                space ahead of the policy
+            on_freed: Optional callable(nbytes) run for every byte count
+                freed, e.g. StorageMonitor.record_freed
+        """
+        self.capture_dir = capture_dir
+        self.archive_dir = archive_dir
+        self.policy = policy
+        self.state_file = state_file
+        self.max_files_per_run = max_files_per_run
+        self.max_bytes_per_second = max_bytes_per_second
+        self.catalog = catalog
+        self.free_space_check = free_space_check
+        self.on_freed = on_freed
+
+        self.state = self.load_state()
+        self.wake = threading.Event()
+        self.running = False
+        self.in_pass = False
+        self.thread = None
+        self.totals = {'reduced': 0, 'archived': 0, 'deleted': 0, 'bytes_freed': 0, 'passes': 0}
+
+        if not os.path.exists(self.archive_dir):
+            os.makedirs(self.archive_dir)
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'reduced_through': None, 'reduce_cursor': None}
+
+    def save_state(self):
+        atomic_write(self.state_file, json.dumps(self.state, indent=4).encode())
+
+    def start(self, interval=600):
+        """Run a pass every `interval` seconds, or sooner when woken"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, args=(interval,), name="CaptureRetention", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def request_pass(self):
+        """Wake the background thread, e.g. when free space runs low
+
+        Ignored while a pass is running, so repeated low-space callbacks
+        during a pass do not chain straight into another one.
+        """
+        if not self.in_pass:
+            self.wake.set()
+
+    def _run(self, interval):
+        while self.running:
+            self.in_pass = True
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Retention pass failed: {e}")
+            finally:
+                self.in_pass = False
+            self.wake.wait(interval)
+            self.wake.clear()
+
+    def _throttle(self, nbytes):
+        if self.max_bytes_per_second:
+            time.sleep(nbytes / self.max_bytes_per_second)
+
+    def captures_by_day(self):
+        days = {}
+        with os.scandir(self.capture_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith('.jpg'):
+                    days.setdefault(capture_day(entry.path), []).append(entry.path)
+        return days
+
+    def run_once(self, today=None):
+        """One incremental pass over every tier
+
+        Returns:
+            Dict of counts for this pass
+        """
+        today = today or date.today()
+        summary = {'reduced': 0, 'archived': 0, 'deleted': 0, 'bytes_freed': 0}
+        budget = [self.max_files_per_run]
+        days = self.captures_by_day()
+
+        # Archive first: no point downscaling a day that is about to be packed
+        archive_before = today - timedelta(days=self.policy.archive_after_days)
+        for day in sorted(d for d in days if d <= archive_before):
+            if not self._archive_day(day, days.pop(day), summary, budget):
+                break
+
+        reduce_before = today - timedelta(days=self.policy.full_res_days)
+        reduced_through = self.state.get('reduced_through')
+        for day in sorted(d for d in days if d <= reduce_before):
+            if reduced_through and day.isoformat() <= reduced_through:
+                continue
+            if not self._reduce_day(day, days[day], summary, budget):
+                break
+
+        delete_before = today - timedelta(days=self.policy.delete_after_days)
+        for segment_day, path in self.archive_segments():
+            if segment_day <= delete_before:
+                self._delete_segment(path, summary)
+
+        if self.free_space_check and not self.free_space_check():
+            self._free_space(days, summary, today)
+
+        for key, value in summary.items():
+            self.totals[key] += value
+        self.totals['passes'] += 1
+        if any(summary.values()):
+            logger.info(f"Retention pass: {summary}")
+        return summary
+
+    def _count_freed(self, summary, nbytes):
+        summary['bytes_freed'] += nbytes
+        if self.on_freed and nbytes:
+            self.on_freed(nbytes)
+
+    def _reduce_day(self, day, paths, summary, budget):
+        # Downscale and recompress in place. A day cut short by the budget
+        # resumes after the last file handled; files already at or below the
+        # target width are left alone
+        cursor = self.state.get('reduce_cursor') or {}
+        resume_after = cursor.get('file') if cursor.get('day') == day.isoformat() else None
+        for path in sorted(paths):
+            if resume_after and os.path.basename(path) <= resume_after:
+                continue
+            if budget[0] <= 0:
+                self.save_state()
+                return False
+            budget[0] -= 1
+            self.state['reduce_cursor'] = {'day': day.isoformat(), 'file': os.path.basename(path)}
+            try:
+                size = os.path.getsize(path)
+                image = cv2.imread(path)
+                self._throttle(size)
+                if image is None or image.shape[1] <= self.policy.downscale_width:
+                    continue
+                scale = self.policy.downscale_width / image.shape[1]
+                image = cv2.resize(image, (self.policy.downscale_width, int(image.shape[0] * scale)),
+                                   interpolation=cv2.INTER_AREA)
+                ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.policy.downscale_quality])
+                if not ok:
+                    continue
+                atomic_write(path, encoded.tobytes())
+                self._throttle(len(encoded))
+                summary['reduced'] += 1
+                self._count_freed(summary, max(size - len(encoded), 0))
+            except Exception as e:
+                logger.error(f"Failed to reduce {path}: {e}")
+
+        self.state['reduced_through'] = day.isoformat()
+        self.state['reduce_cursor'] = None
+        self.save_state()
+        return True
+
+    def segment_path(self, day):
+        return os.path.join(self.archive_dir, f"captures-{day.strftime('%Y%m%d')}.zip")
+
+    def _open_segment(self, segment, temp_path):
+        # A segment that is not a valid zip (e.g. from an interrupted write
+        # by an older version) is set aside and the day starts a new one;
+        # mode 'a' would otherwise append a fresh zip behind the damaged data
+        if os.path.exists(segment):
+            if zipfile.is_zipfile(segment):
+                shutil.copyfile(segment, temp_path)
+                try:
+                    return zipfile.ZipFile(temp_path, 'a', compression=zipfile.ZIP_STORED)
+                except zipfile.BadZipFile:
+                    pass
+            bad_path = f"{segment[:-len('.zip')]}-bad{int(time.time())}.zip"
+            os.replace(segment, bad_path)
+            logger.error(f"Archive segment is corrupt, moved to {os.path.basename(bad_path)}")
+        return zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_STORED)
+
+    def _archive_day(self, day, paths, summary, budget):
+        # Append to a copy of the day's segment and swap it in, so a crash
+        # mid-append never leaves a segment without its central directory.
+        # JPEGs are stored, not recompressed
+        segment = self.segment_path(day)
+        temp_path = f"{segment}.tmp"
+        archived = []
+        try:
+            with self._open_segment(segment, temp_path) as archive:
+                existing = set(archive.namelist())
+                for path in sorted(paths):
+                    if budget[0] <= 0:
+                        break
+                    budget[0] -= 1
+                    name = os.path.basename(path)
+                    if name not in existing:
+                        archive.write(path, name)
+                        self._throttle(os.path.getsize(path))
+                    archived.append(path)
+            os.replace(temp_path, segment)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        for path in archived:
+            size = os.path.getsize(path)
+            os.remove(path)
+            summary['archived'] += 1
+            self._count_freed(summary, size)
+            if self.catalog:
+                metadata = self.catalog.get(os.path.basename(path))
+                if metadata is not None:
+                    metadata['archive'] = os.path.basename(segment)
+                    self.catalog.add(metadata)
+
+        return len(archived) == len(paths)
+
+    def archive_segments(self):
+        """(day, path) for every archive segment, oldest first"""
+        segments = []
+        for name in os.listdir(self.archive_dir):
+            match = SEGMENT_NAME.match(name)
+            if match:
+                segments.append((datetime.strptime(match.group(1), '%Y%m%d').date(),
+                                 os.path.join(self.archive_dir, name)))
+        return sorted(segments)
+
+    def _delete_segment(self, path, summary):
+        size = os.path.getsize(path)
+        os.remove(path)
+        summary['deleted'] += 1
+        self._count_freed(summary, size)
+        logger.info(f"Archive segment deleted: {os.path.basename(path)}")
+
+    def _free_space(self, days, summary, today):
+        # Disk is low despite the policy: drop the oldest archive segments,
+        # then the oldest captures, until the check passes again. Today's
+        # captures are never touched.
+        logger.warning("Free space low, deleting oldest captures ahead of retention policy")
+        for _, path in self.archive_segments():
+            self._delete_segment(path, summary)
+            if self.free_space_check():
+                return
+        for day in sorted(days):
+            if day >= today:
+                break
+            for path in days[day]:
+                size = os.path.getsize(path)
+                os.remove(path)
+                summary['deleted'] += 1
+                self._count_freed(summary, size)
+                self._mark_deleted(path)
+            logger.warning(f"Captures for {day} deleted to free space")
+            if self.free_space_check():
+                return
+
+    def _mark_deleted(self, path):
+        # Keep the catalog row for the ticket history, but record that the
+        # image itself is gone
+        if not self.catalog:
+            return
+        metadata = self.catalog.get(os.path.basename(path))
+        if metadata is not None:
+            metadata['deleted'] = datetime.now().isoformat(timespec='seconds')
+            self.catalog.add(metadata)
+
+    def stats(self):
+        return dict(self.totals, state=dict(self.state))
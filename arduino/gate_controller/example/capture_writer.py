@@ -0,0 +1,167 @@
+import cv2
+import queue
+import threading
+import time
+import logging
+from spool_common import atomic_write
+
+logger = logging.getLogger(__name__)
+
+class CaptureWriter:
+    """Encode and persist captures on background threads
+
+    Jobs go through a bounded queue to a small pool of writer threads, so
+    the ticket can be issued while the JPEG is still being encoded. When the
+    queue is full, submit() waits briefly and then writes on the caller's
+    thread rather than dropping the capture.
+    """
+
+    def __init__(self, workers=2, queue_size=16, submit_timeout=1.0, on_write=None):
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.submit_timeout = submit_timeout
+        # Callable(nbytes) after each file is written, e.g. a storage monitor
+        self.on_write = on_write
+        self.lock = threading.Lock()
+        self.running = True
+
+        # Metrics
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        self.inline_writes = 0
+        self.max_depth = 0
+        self.encode_seconds = 0.0
+        self.write_seconds = 0.0
+
+        self.threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self._run, name=f"CaptureWriter-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit_image(self, path, frame, quality=95, refine=None, on_done=None):
+        """Queue a frame to be JPEG-encoded and written to path
+
+        Args:
+            path: Destination file
+            frame: Frame to write
+            quality: JPEG quality
+            refine: Optional callable() run on the writer thread before
+                encoding; returns a better frame to write instead, or None
+                to keep frame. Lets the caller move on before e.g. the
+                post-trigger window has been captured
+            on_done: Optional callable(path, ok) once the file is written
+        """
+        self._submit((path, frame, quality, refine, on_done))
+
+    def _submit(self, job):
+        with self.lock:
+            self.submitted += 1
+        if not self.running:
+            self._write(job)
+            return
+        try:
+            self.jobs.put(job, timeout=self.submit_timeout)
+        except queue.Full:
+            # Back-pressure: better a slow ticket than a lost capture
+            logger.warning(f"Capture queue full, writing inline: {job[0]}")
+            with self.lock:
+                self.inline_writes += 1
+            self._write(job)
+            return
+        with self.lock:
+            self.max_depth = max(self.max_depth, self.jobs.qsize())
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                self._write(job)
+            finally:
+                self.jobs.task_done()
+
+    def _write(self, job):
+        path, frame, quality, refine, on_done = job
+        ok = False
+        try:
+            if refine:
+                try:
+                    better = refine()
+                    if better is not None:
+                        frame = better
+                except Exception as e:
+                    logger.error(f"Failed to refine capture {path}, keeping the first frame: {e}")
+
+            started = time.perf_counter()
+            ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+            if not ok:
+                raise Exception("JPEG encode failed")
+            data = encoded.tobytes()
+            encoded_at = time.perf_counter()
+
+            atomic_write(path, data)
+            finished = time.perf_counter()
+            if self.on_write:
+                self.on_write(len(data))
+
+            with self.lock:
+                self.written += 1
+                self.encode_seconds += encoded_at - started
+                self.write_seconds += finished - encoded_at
+            logger.debug(f"Capture written: {path}")
+            ok = True
+        except Exception as e:
+            with self.lock:
+                self.failed += 1
+            logger.error(f"Failed to write capture {path}: {e}")
+
+        if on_done:
+            try:
+                on_done(path, ok)
+            except Exception as e:
+                logger.error(f"Capture callback failed for {path}: {e}")
+
+    def flush(self, timeout=None):
+        """Wait until every queued job has been written
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.jobs.all_tasks_done:
+            while self.jobs.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.jobs.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=10.0):
+        """Flush pending captures and stop the writer threads"""
+        if not self.running:
+            return
+        drained = self.flush(timeout)
+        if not drained:
+            logger.error(f"Capture writer closed with {self.jobs.qsize()} jobs pending")
+        self.running = False
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join(timeout=2)
+
+    def stats(self):
+        """Queue depth and throughput counters"""
+        with self.lock:
+            written = self.written
+            return {
+                'queue_depth': self.jobs.qsize(),
+                'max_depth': self.max_depth,
+                'submitted': self.submitted,
+                'written': written,
+                'failed': self.failed,
+                'inline_writes': self.inline_writes,
+                'avg_encode_ms': self.encode_seconds / written * 1000 if written else 0.0,
+                'avg_write_ms': self.write_seconds / written * 1000 if written else 0.0
+            }
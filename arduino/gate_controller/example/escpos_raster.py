@@ -0,0 +1,124 @@
+import struct
+import time
+import threading
+import logging
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+ESC_INIT = b"\x1b\x40"
+ESC_CENTER = b"\x1b\x61\x01"
+GS_CUT = b"\x1d\x56\x41\x00"
+GS_RASTER = b"\x1d\x76\x30\x00"  # GS v 0, normal density
+
+def pack_image(image, paper_width=None, threshold=128):
+    """Convert a PIL image to packed 1-bit rows for GS v 0
+
+    Pixels darker than threshold print. Images wider than the paper are
+    scaled down; narrower ones are centered. Rows are padded to a whole
+    number of bytes and packed eight dots per byte, MSB first.
+
+    Args:
+        image: PIL image in any mode
+        paper_width: Printable width in dots (576 for 80 mm, 384 for 58 mm), or None
+        threshold: Gray level below which a dot is printed
+
+    Returns:
+        uint8 array of shape (height, width_bytes)
+    """
+    if paper_width and image.width > paper_width:
+        height = max(1, round(image.height * paper_width / image.width))
+        image = image.resize((paper_width, height), Image.LANCZOS)
+
+    if image.mode == '1':
+        dots = ~np.asarray(image, dtype=bool)
+    else:
+        dots = np.asarray(image.convert('L')) < threshold
+
+    width = paper_width or dots.shape[1]
+    width += -width % 8
+    left = (width - dots.shape[1]) // 2
+    padded = np.zeros((dots.shape[0], width), dtype=bool)
+    padded[:, left:left + dots.shape[1]] = dots
+    return np.packbits(padded, axis=1)
+
+def raster_commands(packed, band_height=256):
+    """GS v 0 commands for packed rows, one per band of band_height rows
+
+    Printers buffer a whole raster command before printing it, so long
+    tickets are split into bands that start printing while the rest is
+    still being sent.
+    """
+    width_bytes = packed.shape[1]
+    for top in range(0, packed.shape[0], band_height):
+        band = packed[top:top + band_height]
+        yield GS_RASTER + struct.pack('<HH', width_bytes, band.shape[0]) + band.tobytes()
+
+class RasterPrinter:
+    """Print PIL images as ESC/POS raster graphics
+
+    Images are thresholded and bit-packed with NumPy, split into GS v 0
+    bands and streamed to the backend in chunks, so the printer starts
+    feeding paper before the whole ticket has been sent and no printer
+    driver is involved.
+    """
+
+    def __init__(self, backend, paper_width=576, threshold=128, band_height=256, chunk_size=4096):
+        """
+        Args:
+            backend: PrinterBackend (or any object with write, flush and close)
+            paper_width: Printable width in dots
+            threshold: Gray level below which a dot is printed
+            band_height: Rows per GS v 0 command
+            chunk_size: Bytes per backend write
+        """
+        self.backend = backend
+        self.paper_width = paper_width
+        self.threshold = threshold
+        self.band_height = band_height
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+
+        self.jobs = 0
+        self.bytes_sent = 0
+        self.pack_seconds = 0.0
+        self.send_seconds = 0.0
+
+    def _send(self, data):
+        view = memoryview(data)
+        for start in range(0, len(view), self.chunk_size):
+            self.backend.write(view[start:start + self.chunk_size])
+        self.bytes_sent += len(data)
+
+    def print_image(self, image, cut=True, feed_lines=4):
+        """Print one image and optionally cut the paper"""
+        with self.lock:
+            started = time.perf_counter()
+            packed = pack_image(image, self.paper_width, self.threshold)
+            packed_at = time.perf_counter()
+
+            self._send(ESC_INIT + ESC_CENTER)
+            for command in raster_commands(packed, self.band_height):
+                self._send(command)
+            self._send(b"\n" * feed_lines + (GS_CUT if cut else b""))
+            self.backend.flush()
+            finished = time.perf_counter()
+
+            self.jobs += 1
+            self.pack_seconds += packed_at - started
+            self.send_seconds += finished - packed_at
+        logger.debug(f"Raster image printed: {packed.shape[1] * 8}x{packed.shape[0]} dots")
+
+    def close(self):
+        self.backend.close()
+
+    def stats(self):
+        with self.lock:
+            jobs = self.jobs
+            return {
+                'jobs': jobs,
+                'bytes_sent': self.bytes_sent,
+                'avg_pack_ms': self.pack_seconds / jobs * 1000 if jobs else 0.0,
+                'avg_send_ms': self.send_seconds / jobs * 1000 if jobs else 0.0
+            }
@@ -0,0 +1,302 @@
+import cv2
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Frames are scored on a downscaled grayscale copy; blur shows up at any size
+SHARPNESS_WIDTH = 480
+
+def sharpness(frame):
+    """Cheap focus measure: variance of the Laplacian
+
+    Args:
+        frame: BGR or grayscale image
+
+    Returns:
+        Float, higher is sharper
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    if gray.shape[1] > SHARPNESS_WIDTH:
+        scale = SHARPNESS_WIDTH / gray.shape[1]
+        gray = cv2.resize(gray, (SHARPNESS_WIDTH, int(gray.shape[0] * scale)),
+                          interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+class FrameGrabber:
+    """Continuously decode a camera stream into a small ring buffer
+
+    RTSP streams buffer frames on the receiving side, so reading only when a
+    button is pressed returns stale images unless several frames are thrown
+    away first. A grabber thread keeps reading instead, and callers take the
+    newest frame immediately.
+
+    With history_seconds set, the buffer also keeps every frame from the
+    last few seconds (capped at max_bytes) so a trigger can pick frames
+    from before the button was pressed.
+
+    With decode=False the stream is only grabbed (kept connected and
+    current, without BGR conversion or buffering) until request_decode()
+    asks for frames, e.g. for the full-resolution stream in dual-stream mode.
+    idle_fps still decodes a few grabbed frames per second in that state,
+    so the pre-trigger history and latest() stay usable between requests.
+    """
+
+    def __init__(self, camera, buffer_size=5, name="camera", history_seconds=0, max_bytes=None,
+                 decode=True, idle_fps=0):
+        self.camera = camera
+        self.name = name
+        self.decode = decode
+        self.decode_until = 0
+        self.idle_interval = 1.0 / idle_fps if idle_fps else None
+        self.last_idle_decode = 0
+        self.buffer_size = buffer_size
+        self.history_seconds = history_seconds
+        self.max_bytes = max_bytes
+        self.frames = deque()
+        self.buffer_bytes = 0
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+        # Camera swapping: the camera currently inside read() is released by
+        # the grabber thread itself once the read returns
+        self.camera_lock = threading.Lock()
+        self.reading = None
+
+        # Counters
+        self.frames_read = 0
+        self.failed_reads = 0
+        self.dropped_frames = 0
+        self.started_at = None
+        self.last_frame_time = None
+
+        # Nominal frame interval from the stream, used to detect gaps
+        try:
+            fps = camera.get(cv2.CAP_PROP_FPS)
+        except Exception:
+            fps = 0
+        self.frame_interval = 1.0 / fps if fps and 0 < fps <= 120 else None
+
+    def start(self):
+        """Start the grabber thread"""
+        if self.running:
+            return
+        self.running = True
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._run, name=f"FrameGrabber-{self.name}", daemon=True)
+        self.thread.start()
+        logger.info(f"Frame grabber started: {self.name}")
+
+    def stop(self):
+        """Stop the grabber thread and wait for it to exit"""
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+        logger.info(f"Frame grabber stopped: {self.name}")
+
+    def _run(self):
+        while self.running:
+            with self.camera_lock:
+                camera = self.reading = self.camera
+            if camera is None:
+                # Disconnected; the supervisor will swap a new camera in
+                time.sleep(0.05)
+                continue
+
+            decoding = self.is_decoding()
+            try:
+                if decoding:
+                    ret, frame = camera.read()
+                else:
+                    ret, frame = camera.grab(), None
+                    if ret and self._idle_decode_due():
+                        self.last_idle_decode = time.time()
+                        ret, frame = camera.retrieve()
+            except Exception as e:
+                logger.error(f"Error reading frame from {self.name}: {e}")
+                ret, frame = False, None
+
+            with self.camera_lock:
+                self.reading = None
+                swapped = camera is not self.camera
+            if swapped:
+                camera.release()
+                continue
+
+            now = time.time()
+            if not ret or (decoding and frame is None):
+                self.failed_reads += 1
+                # Don't spin on a dead stream
+                time.sleep(0.05)
+                continue
+
+            if frame is None:
+                with self.condition:
+                    self.frames_read += 1
+                    self.last_frame_time = now
+                continue
+
+            with self.condition:
+                if decoding and self.last_frame_time is not None and self.frame_interval:
+                    gap = now - self.last_frame_time
+                    if gap > self.frame_interval * 1.5:
+                        self.dropped_frames += int(round(gap / self.frame_interval)) - 1
+                self.frames_read += 1
+                self.last_frame_time = now
+                self.frames.append((now, self.frames_read, frame))
+                self.buffer_bytes += frame.nbytes
+                self._trim(now)
+                self.condition.notify_all()
+
+    def _trim(self, now):
+        # Always keep buffer_size frames; keep older ones only while they
+        # are inside the history window and the memory budget
+        while len(self.frames) > 1:
+            timestamp, _, frame = self.frames[0]
+            over_budget = self.max_bytes is not None and self.buffer_bytes > self.max_bytes
+            if len(self.frames) <= self.buffer_size and not over_budget:
+                break
+            if not over_budget and now - timestamp <= self.history_seconds:
+                break
+            self.frames.popleft()
+            self.buffer_bytes -= frame.nbytes
+
+    def request_decode(self, seconds):
+        """Decode and buffer frames for at least the next `seconds`
+
+        Has no effect on a grabber created with decode=True.
+        """
+        self.decode_until = max(self.decode_until, time.time() + seconds)
+
+    def end_decode(self, grace=0):
+        """Stop decoding after at most `grace` seconds (undoes request_decode)"""
+        self.decode_until = min(self.decode_until, time.time() + grace)
+
+    def _idle_decode_due(self):
+        return self.idle_interval is not None and time.time() - self.last_idle_decode >= self.idle_interval
+
+    def is_decoding(self):
+        return self.decode or time.time() < self.decode_until
+
+    def swap_camera(self, camera):
+        """Replace the capture being read, e.g. after a reconnect
+
+        The old capture is released here, or by the grabber thread if it is
+        still blocked reading from it. Pass None to stop reading until a new
+        camera is available; buffered frames are kept.
+        """
+        with self.camera_lock:
+            old = self.camera
+            self.camera = camera
+            release_now = old is not None and old is not self.reading and old is not camera
+        if release_now:
+            old.release()
+
+    def latest(self, max_age=None):
+        """Get the newest frame
+
+        Args:
+            max_age: Reject frames older than this many seconds
+
+        Returns:
+            Tuple (frame, timestamp), or (None, None) if no usable frame
+        """
+        with self.condition:
+            if not self.frames:
+                return None, None
+            timestamp, _, frame = self.frames[-1]
+        if max_age is not None and time.time() - timestamp > max_age:
+            return None, None
+        return frame, timestamp
+
+    def wait_for_frame(self, after=None, timeout=1.0):
+        """Wait for a frame newer than `after`
+
+        Args:
+            after: Timestamp the frame must be newer than (default: now)
+            timeout: Maximum seconds to wait
+
+        Returns:
+            Tuple (frame, timestamp), or (None, None) on timeout
+        """
+        after = time.time() if after is None else after
+        deadline = time.time() + timeout
+        with self.condition:
+            while self.running:
+                if self.frames and self.frames[-1][0] > after:
+                    timestamp, _, frame = self.frames[-1]
+                    return frame, timestamp
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+        return None, None
+
+    def frames_between(self, start, end):
+        """Buffered frames with start <= timestamp <= end, oldest first
+
+        Returns:
+            List of (timestamp, frame) tuples
+        """
+        with self.condition:
+            return [(timestamp, frame) for timestamp, _, frame in self.frames
+                    if start <= timestamp <= end]
+
+    def best_frames(self, trigger_time, before=1.0, after=0.5, timeout=None):
+        """Pick the sharpest frames around a trigger
+
+        Waits until the post-trigger window has been captured (or timeout),
+        then scores every buffered frame in the window.
+
+        Args:
+            trigger_time: Timestamp of the button press
+            before: Seconds of history before the trigger to consider
+            after: Seconds after the trigger to consider
+            timeout: Maximum seconds to wait for the window to fill
+
+        Returns:
+            Dict with 'best', 'before' and 'after' entries, each None or a
+            dict with frame, timestamp and sharpness; plus 'considered'
+        """
+        end = trigger_time + after
+        deadline = time.time() + (after + 1.0 if timeout is None else timeout)
+        with self.condition:
+            while self.running and (not self.frames or self.frames[-1][0] < end):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+
+        scored = [{'frame': frame, 'timestamp': timestamp, 'sharpness': sharpness(frame)}
+                  for timestamp, frame in self.frames_between(trigger_time - before, end)]
+
+        def sharpest(entries):
+            return max(entries, key=lambda entry: entry['sharpness']) if entries else None
+
+        return {
+            'best': sharpest(scored),
+            'before': sharpest([entry for entry in scored if entry['timestamp'] < trigger_time]),
+            'after': sharpest([entry for entry in scored if entry['timestamp'] >= trigger_time]),
+            'considered': len(scored)
+        }
+
+    def stats(self):
+        """Counters for status display and logging"""
+        now = time.time()
+        elapsed = now - self.started_at if self.started_at else 0
+        return {
+            'frames_read': self.frames_read,
+            'failed_reads': self.failed_reads,
+            'dropped_frames': self.dropped_frames,
+            'fps': self.frames_read / elapsed if elapsed > 0 else 0.0,
+            'buffered_frames': len(self.frames),
+            'decoding': self.is_decoding(),
+            'buffer_mb': self.buffer_bytes / (1024 * 1024),
+            'last_frame_age': now - self.last_frame_time if self.last_frame_time else None
+        }
@@ -24,10 +24,17 @@ class GetInTerminal:
         """Initialize terminal"""
         self.api = ParkingAPI()
         self.printer = TicketPrinter()
-        self.printer_busy = False
+        # Shared with the button's print spooler: the lock is held while a
+        # ticket is being sent
         self.printer_lock = threading.Lock()
         self.button = None
     
+    @property
+    def printer_busy(self):
+        """True while the button's print spooler is sending a ticket"""
+        spooler = self.button.spooler if self.button else None
+        return bool(spooler and spooler.busy)
+    
     def process_vehicle_entry(self, plate_number, vehicle_type):
         """Process vehicle entry"""
         try:
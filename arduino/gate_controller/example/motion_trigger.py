@@ -0,0 +1,164 @@
+import cv2
+import threading
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class MotionDetector:
+    """Frame differencing with hysteresis on small grayscale frames
+
+    Each frame is shrunk to `width` pixels, blurred and compared with a
+    running-average background. A vehicle "enters" once the changed-pixel
+    fraction stays above on_fraction for on_frames frames, and "leaves" once
+    it stays below off_fraction for off_frames frames. The background is
+    frozen while a vehicle is present so a car waiting at the barrier is
+    not absorbed into it; after max_active_seconds it is re-learned anyway
+    so a lighting change cannot hold the trigger on forever.
+    """
+
+    def __init__(self, width=160, zone=None, pixel_threshold=25, on_fraction=0.02, off_fraction=0.005,
+                 on_frames=3, off_frames=15, learning_rate=0.05, max_active_seconds=120):
+        """
+        Args:
+            width: Processing width in pixels
+            zone: Optional (x, y, w, h) as fractions of the frame to watch
+            pixel_threshold: Gray-level change counted as motion
+            on_fraction: Changed fraction of the zone that starts an event
+            off_fraction: Changed fraction below which an event can end
+            on_frames: Consecutive frames above on_fraction to enter
+            off_frames: Consecutive frames below off_fraction to leave
+            learning_rate: Background running-average weight
+            max_active_seconds: Force a background reset after this long
+        """
+        self.width = width
+        self.zone = zone
+        self.pixel_threshold = pixel_threshold
+        self.on_fraction = on_fraction
+        self.off_fraction = off_fraction
+        self.on_frames = on_frames
+        self.off_frames = off_frames
+        self.learning_rate = learning_rate
+        self.max_active_seconds = max_active_seconds
+
+        self.background = None
+        self.active = False
+        self.active_since = None
+        self.streak = 0
+        self.last_fraction = 0.0
+
+    def prepare(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        height = max(1, int(gray.shape[0] * self.width / gray.shape[1]))
+        small = cv2.resize(gray, (self.width, height), interpolation=cv2.INTER_AREA)
+        if self.zone:
+            x, y, w, h = self.zone
+            small = small[int(y * height):int((y + h) * height), int(x * self.width):int((x + w) * self.width)]
+        return cv2.GaussianBlur(small, (5, 5), 0).astype(np.float32)
+
+    def update(self, frame, now=None):
+        """Feed one frame
+
+        Returns:
+            'enter', 'leave' or None
+        """
+        now = time.time() if now is None else now
+        current = self.prepare(frame)
+        if self.background is None or self.background.shape != current.shape:
+            self.background = current
+            return None
+
+        diff = cv2.absdiff(current, self.background)
+        fraction = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        self.last_fraction = fraction
+
+        event = None
+        if not self.active:
+            self.streak = self.streak + 1 if fraction > self.on_fraction else 0
+            if self.streak >= self.on_frames:
+                self.active, self.active_since, self.streak = True, now, 0
+                event = 'enter'
+            else:
+                cv2.accumulateWeighted(current, self.background, self.learning_rate)
+        else:
+            self.streak = self.streak + 1 if fraction < self.off_fraction else 0
+            timed_out = now - self.active_since > self.max_active_seconds
+            if self.streak >= self.off_frames or timed_out:
+                self.active, self.active_since, self.streak = False, None, 0
+                if timed_out:
+                    self.background = current
+                event = 'leave'
+        return event
+
+class MotionTrigger:
+    """Run a MotionDetector over a FrameGrabber on a background thread"""
+
+    def __init__(self, grabber, detector, on_enter=None, on_leave=None, max_fps=10):
+        self.grabber = grabber
+        self.detector = detector
+        self.on_enter = on_enter
+        self.on_leave = on_leave
+        self.min_interval = 1.0 / max_fps if max_fps else 0
+        self.running = False
+        self.thread = None
+
+        self.events = 0
+        self.frames_checked = 0
+        self.last_event_time = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="MotionTrigger", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    @property
+    def vehicle_present(self):
+        return self.detector.active
+
+    def _run(self):
+        last_time = None
+        while self.running:
+            frame, frame_time = self.grabber.wait_for_frame(after=last_time, timeout=1.0)
+            if frame is None:
+                continue
+            last_time = frame_time
+            self.frames_checked += 1
+
+            try:
+                event = self.detector.update(frame, frame_time)
+            except Exception as e:
+                logger.error(f"Motion detection failed: {e}")
+                event = None
+
+            if event:
+                self.events += 1
+                self.last_event_time = frame_time
+                logger.info(f"Motion trigger: vehicle {event} (changed {self.detector.last_fraction:.1%})")
+                callback = self.on_enter if event == 'enter' else self.on_leave
+                if callback:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.error(f"Motion {event} callback failed: {e}")
+
+            # Detection doesn't need every substream frame
+            elapsed = time.time() - frame_time
+            if elapsed < self.min_interval:
+                time.sleep(self.min_interval - elapsed)
+
+    def stats(self):
+        return {
+            'vehicle_present': self.detector.active,
+            'changed_fraction': self.detector.last_fraction,
+            'events': self.events,
+            'frames_checked': self.frames_checked
+        }
@@ -4,6 +4,7 @@ import time
 import os
 from datetime import datetime
 import logging
+from frame_grabber import FrameGrabber
 
 # Setup logging
 logging.basicConfig(
@@ -33,6 +34,10 @@ class ParkingCamera:
         # Inisialisasi kamera
         self.setup_camera()
         
+        # Baca kamera terus-menerus agar frame terbaru selalu siap
+        self.grabber = FrameGrabber(self.camera, name="local")
+        self.grabber.start()
+        
         # Load counter
         self.load_counter()
         
@@ -86,14 +91,9 @@ class ParkingCamera:
             filename = f"TKT{timestamp}_{str(self.counter).zfill(4)}.jpg"
             filepath = os.path.join(self.capture_dir, filename)
             
-            # Ambil beberapa frame untuk stabilisasi kamera
-            for _ in range(5):
-                ret, frame = self.camera.read()
-                time.sleep(0.1)
-            
-            # Ambil dan simpan gambar
-            ret, frame = self.camera.read()
-            if ret:
+            # Ambil frame terbaru dari grabber (tanpa membuang frame lama)
+            frame, frame_time = self.grabber.latest(max_age=1.0)
+            if frame is not None:
                 cv2.imwrite(filepath, frame)
                 logger.info(f"Gambar berhasil disimpan: {filename}")
                 print(f"\n✅ Gambar disimpan: {filename}")
@@ -125,6 +125,7 @@ class ParkingCamera:
     def cleanup(self):
         """Bersihkan resources"""
         try:
+            self.grabber.stop()
             self.camera.release()
             GPIO.cleanup()
             logger.info("Cleanup berhasil")
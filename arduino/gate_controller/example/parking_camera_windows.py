@@ -1,18 +1,29 @@
 import cv2
 import time
+import threading
 import os
 from datetime import datetime
 import logging
-import shutil
 import requests
 from urllib.parse import quote
 import configparser
-import json
 import numpy as np
 import serial
-import win32print
 import psycopg2
 from psycopg2 import Error
+from frame_grabber import FrameGrabber
+from capture_writer import CaptureWriter
+from spool_common import atomic_write
+from capture_catalog import CaptureCatalog
+from capture_retention import RetentionEngine, RetentionPolicy
+from storage_monitor import StorageMonitor
+from motion_trigger import MotionDetector, MotionTrigger
+from plate_reader import PlateReader
+from print_spooler import PrintSpooler, spool_dir
+from printer_backend import open_backend
+from camera_supervisor import CameraSupervisor
+from stream_probe import (DAHUA_STREAM_PATHS, DAHUA_SUBSTREAM_PATH, probe_streams,
+                          load_cached_stream, save_cached_stream)
 
 # Setup logging
 logging.basicConfig(
@@ -23,7 +34,30 @@ logging.basicConfig(
 logger = logging.getLogger('parking_system')
 
 class ParkingCamera:
+    # Bagian tiket yang tidak berubah, disusun sekali saja
+    TICKET_HEADER = (
+        b"\x1B\x40" +          # Initialize printer
+        b"\x1B\x61\x01" +      # Center alignment
+        b"RSI BANJARNEGARA\n" +
+        b"TIKET PARKIR\n" +
+        b"--------------------------------\n" +
+        b"\x1B\x61\x00"        # Left alignment
+    )
+    TICKET_FOOTER = (
+        b"--------------------------------\n" +
+        b"\x1B\x61\x01" +      # Center alignment
+        b"Terima Kasih\n" +
+        b"Simpan Tiket Anda\n" +
+        b"\n\n" +              # Extra lines for spacing
+        b"\x1D\x56\x41\x00"    # Auto-cut command
+    )
+
     def __init__(self):
+        init_started = time.perf_counter()
+        self.startup_stats = {'camera_seconds': None, 'cached_url_used': False, 'total_seconds': None}
+        self.stream_upgrade_pending = False
+        self.stream_upgrade_thread = None
+        
         # Load konfigurasi
         self.config = self.load_config()
         
@@ -31,6 +65,8 @@ class ParkingCamera:
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.capture_dir = os.path.join(self.base_dir, self.config['storage']['capture_dir'])
         self.counter_file = os.path.join(self.base_dir, self.config['system']['counter_file'])
+        self.stream_cache_file = os.path.join(
+            self.base_dir, self.config.get('system', 'stream_cache_file', fallback='stream_cache.json'))
         
         # Status koneksi
         self.connection_status = {
@@ -41,14 +77,97 @@ class ParkingCamera:
             'camera_type': 'Dahua'
         }
         
+        # Region of interest (area plat nomor) untuk kamera yang terpasang tetap
+        self.roi = self.load_roi()
+
+        # Ring frame sebelum/sesudah tombol ditekan
+        self.pretrigger = self.load_pretrigger()
+
         # Buat folder jika belum ada
         if not os.path.exists(self.capture_dir):
             os.makedirs(self.capture_dir)
             logger.info(f"Folder capture dibuat: {self.capture_dir}")
         
+        # Pantau sisa disk di background; jalur capture hanya membaca flag
+        self.storage = StorageMonitor(
+            self.capture_dir,
+            min_free_gb=float(self.config['storage']['min_free_space_gb']),
+            hard_min_free_gb=self.config.getfloat('storage', 'hard_min_free_space_mb', fallback=200) / 1024,
+            interval=self.config.getfloat('storage', 'monitor_interval_seconds', fallback=30),
+            on_low=self.on_storage_low
+        )
+        self.storage.start()
+        
+        # Encode dan tulis gambar di background agar tiket tidak menunggu disk
+        self.writer = CaptureWriter(
+            workers=self.config.getint('storage', 'writer_threads', fallback=2),
+            queue_size=self.config.getint('storage', 'writer_queue_size', fallback=16),
+            on_write=self.storage.record_written
+        )
+        
+        # Katalog metadata capture (SQLite, menggantikan file .jpg.json)
+        self.catalog = CaptureCatalog(os.path.join(
+            self.base_dir, self.config.get('storage', 'catalog_db', fallback='capture_catalog.db')))
+        
+        # Retensi capture_images: full-res -> diperkecil -> arsip harian -> dihapus
+        self.retention = None
+        if self.config.getboolean('retention', 'enabled', fallback=False):
+            self.retention = RetentionEngine(
+                self.capture_dir,
+                os.path.join(self.base_dir, self.config.get('retention', 'archive_dir', fallback='capture_archive')),
+                RetentionPolicy.from_config(self.config),
+                os.path.join(self.base_dir, 'retention_state.json'),
+                max_files_per_run=self.config.getint('retention', 'max_files_per_run', fallback=200),
+                max_bytes_per_second=self.config.getfloat('retention', 'max_mb_per_second', fallback=5) * 1024 * 1024,
+                catalog=self.catalog,
+                free_space_check=self.storage.has_free_space,
+                on_freed=self.storage.record_freed
+            )
+            self.retention.start(interval=self.config.getint('retention', 'interval_seconds', fallback=600))
+        
+        # Mode dual-stream: substream untuk deteksi/preview, main stream untuk bukti
+        self.dual_stream = self.config.getboolean('camera', 'dual_stream', fallback=True)
+        
         # Setup kamera
         self.setup_camera()
         
+        # Baca stream terus-menerus agar frame terbaru selalu siap. Pada mode
+        # dual-stream main stream hanya di-grab dan di-decode beberapa frame per
+        # detik untuk ring pre-trigger; decode penuh baru saat dibutuhkan
+        self.grabber = FrameGrabber(
+            self.camera,
+            name="dahua",
+            history_seconds=self.pretrigger['before'] if self.pretrigger['enabled'] else 0,
+            max_bytes=self.pretrigger['max_memory_mb'] * 1024 * 1024,
+            decode=not self.dual_stream,
+            idle_fps=self.pretrigger['dual_stream_fps']
+        )
+        self.grabber.start()
+        
+        # Reconnect otomatis jika stream macet
+        self.supervisor = CameraSupervisor(
+            self.grabber,
+            self.connect_camera,
+            stall_timeout=self.config.getint('camera', 'stall_timeout_ms', fallback=2000) / 1000,
+            max_delay=self.config.getfloat('camera', 'reconnect_max_delay', fallback=30.0),
+            on_state_change=self.on_camera_state
+        )
+        self.supervisor.start()
+        
+        # Startup memakai stream dari cache; naikkan ke main stream di background
+        if self.stream_upgrade_pending:
+            self.start_stream_upgrade()
+        
+        if self.dual_stream:
+            self.setup_substream()
+        
+        # Trigger visual: siapkan capture/OCR begitu kendaraan masuk zona
+        self.motion = None
+        self.plate_reader = None
+        self.prewarm = None
+        if self.config.getboolean('motion', 'enabled', fallback=False):
+            self.setup_motion()
+        
         # Setup button
         self.setup_button()
         
@@ -61,67 +180,264 @@ class ParkingCamera:
         # Load counter
         self.load_counter()
         
-        logger.info("Sistem parkir berhasil diinisialisasi")
+        self.startup_stats['total_seconds'] = time.perf_counter() - init_started
+        logger.info(f"Sistem parkir berhasil diinisialisasi ({self.startup_stats['total_seconds']:.1f} detik)")
 
     def setup_camera(self):
         """Setup koneksi ke kamera Dahua menggunakan RTSP"""
+        started = time.perf_counter()
         try:
-            camera_config = self.config['camera']
-            
-            # Format RTSP URL untuk Dahua
-            rtsp_urls = [
-                f"rtsp://{camera_config['username']}:{quote(camera_config['password'])}@{camera_config['ip']}:{camera_config['port']}/cam/realmonitor?channel=1&subtype=0",
-                f"rtsp://{camera_config['username']}:{quote(camera_config['password'])}@{camera_config['ip']}:{camera_config['port']}/cam/realmonitor?channel=1&subtype=1",
-                f"rtsp://{camera_config['username']}:{quote(camera_config['password'])}@{camera_config['ip']}:{camera_config['port']}/cam/realmonitor?channel=1",
-                f"rtsp://{camera_config['username']}:{quote(camera_config['password'])}@{camera_config['ip']}:{camera_config['port']}/h264/ch1/main/av_stream"
-            ]
-            
-            print("\nMencoba koneksi ke kamera Dahua menggunakan RTSP...")
+            self.camera = self.connect_camera(initial=True)
+            if self.camera is None:
+                raise Exception("Tidak dapat terhubung ke kamera dengan semua URL yang dicoba")
             
-            for url in rtsp_urls:
-                try:
-                    print(f"Mencoba URL: {url}")
-                    self.camera = cv2.VideoCapture(url)
-                    
-                    if self.camera.isOpened():
-                        # Coba ambil frame untuk memastikan koneksi benar-benar berhasil
-                        ret, frame = self.camera.read()
-                        if ret and frame is not None:
-                            self.connection_status.update({
-                                'is_connected': True,
-                                'last_connected': datetime.now(),
-                                'reconnect_attempts': 0,
-                                'current_url': url
-                            })
-                            
-                            # Set resolusi kamera
-                            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, int(self.config['image']['width']))
-                            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, int(self.config['image']['height']))
-                            
-                            logger.info(f"Koneksi ke kamera Dahua berhasil dengan URL: {url}")
-                            print("✅ Kamera Dahua terdeteksi dan terhubung")
-                            return
-                        else:
-                            print("❌ Koneksi terbuka tapi tidak bisa membaca frame")
-                            self.camera.release()
-                    else:
-                        print("❌ Gagal membuka koneksi")
-                        
-                except Exception as e:
-                    print(f"❌ Error mencoba URL {url}: {str(e)}")
-                    if hasattr(self, 'camera'):
-                        self.camera.release()
-                    continue
-            
-            raise Exception("Tidak dapat terhubung ke kamera dengan semua URL yang dicoba")
+            self.startup_stats['camera_seconds'] = time.perf_counter() - started
+            logger.info(f"Koneksi ke kamera Dahua berhasil dengan URL: {self.connection_status['current_url']} "
+                        f"({self.startup_stats['camera_seconds']:.1f} detik)")
+            print(f"✅ Kamera Dahua terdeteksi dan terhubung ({self.startup_stats['camera_seconds']:.1f} detik)")
                 
         except Exception as e:
             self.connection_status['is_connected'] = False
             logger.error(f"Gagal setup kamera: {str(e)}")
             raise Exception(f"Gagal setup kamera: {str(e)}")
 
-    def capture_image(self):
-        """Ambil gambar dari kamera dan simpan"""
+    def stream_base_url(self):
+        """rtsp://user:pass@ip:port dari konfigurasi kamera"""
+        camera_config = self.config['camera']
+        return f"rtsp://{camera_config['username']}:{quote(camera_config['password'])}@{camera_config['ip']}:{camera_config['port']}"
+
+    def main_stream_paths(self):
+        """Path stream utama yang dicoba, urut dari yang paling diutamakan
+
+        Pada mode dual-stream substream dibuka terpisah, bukan sebagai main.
+        """
+        return [path for path in DAHUA_STREAM_PATHS
+                if not (self.dual_stream and path == DAHUA_SUBSTREAM_PATH)]
+
+    def connect_camera(self, initial=False):
+        """Buka stream RTSP kamera Dahua
+
+        URL yang terakhir berhasil (disimpan di file cache) dicoba dulu
+        sendiri dengan batas waktu singkat. Jika itu bukan URL utama, URL
+        utama dicoba ulang di background (lihat start_stream_upgrade). Jika
+        cache gagal, semua varian URL dicoba bersamaan sesuai urutan
+        preferensi. Dipakai saat startup (initial=True) dan oleh supervisor
+        saat reconnect.
+
+        Returns:
+            Capture yang sudah terbuka, atau None
+        """
+        base_url = self.stream_base_url()
+        paths = self.main_stream_paths()
+        
+        cached_path = load_cached_stream(self.stream_cache_file)
+        if cached_path in paths:
+            cached_timeout = self.config.getfloat('camera', 'cached_probe_timeout', fallback=2.0)
+            print(f"\nMencoba koneksi ke kamera Dahua dengan URL dari cache (batas {cached_timeout:.0f} detik)...")
+            _, camera = probe_streams([base_url + cached_path], cached_timeout)
+            if camera is not None:
+                self.stream_upgrade_pending = cached_path != paths[0]
+                if initial:
+                    self.startup_stats['cached_url_used'] = True
+                return self.use_stream(camera, cached_path)
+        
+        timeout = self.config.getfloat('camera', 'probe_timeout', fallback=5.0)
+        print(f"\nMencoba koneksi ke kamera Dahua ({len(paths)} URL paralel, batas {timeout:.0f} detik)...")
+        
+        index, camera = probe_streams([base_url + path for path in paths], timeout)
+        if camera is None:
+            return None
+        
+        self.stream_upgrade_pending = False
+        return self.use_stream(camera, paths[index])
+
+    def use_stream(self, camera, path):
+        """Catat stream yang berhasil dibuka dan set resolusinya
+
+        Returns:
+            Capture yang sama
+        """
+        self.connection_status.update({
+            'is_connected': True,
+            'last_connected': datetime.now(),
+            'reconnect_attempts': 0,
+            'current_url': self.stream_base_url() + path
+        })
+        
+        # Set resolusi kamera
+        camera.set(cv2.CAP_PROP_FRAME_WIDTH, int(self.config['image']['width']))
+        camera.set(cv2.CAP_PROP_FRAME_HEIGHT, int(self.config['image']['height']))
+        
+        save_cached_stream(self.stream_cache_file, path)
+        return camera
+
+    def start_stream_upgrade(self):
+        """Coba ulang URL utama di background saat memakai URL cadangan
+
+        Dipanggil setelah grabber memakai capture dari cache, agar pergantian
+        ke main stream tidak tertimpa oleh supervisor.
+        """
+        if self.stream_upgrade_thread is not None and self.stream_upgrade_thread.is_alive():
+            return
+        self.stream_upgrade_thread = threading.Thread(target=self.upgrade_stream, name="stream-upgrade",
+                                                      daemon=True)
+        self.stream_upgrade_thread.start()
+
+    def upgrade_stream(self):
+        """Probe URL utama; jika berhasil ganti capture yang dibaca grabber"""
+        path = self.main_stream_paths()[0]
+        timeout = self.config.getfloat('camera', 'probe_timeout', fallback=5.0)
+        _, camera = probe_streams([self.stream_base_url() + path], timeout)
+        if camera is None:
+            logger.info(f"Main stream belum tersedia, tetap memakai {self.connection_status['current_url']}")
+            return
+        
+        self.use_stream(camera, path)
+        self.grabber.swap_camera(camera)
+        self.camera = camera
+        self.stream_upgrade_pending = False
+        logger.info("Beralih ke main stream kamera")
+        print("✅ Beralih ke main stream kamera")
+
+    def connect_substream(self):
+        """Buka substream resolusi rendah (subtype=1)
+
+        Returns:
+            Capture yang sudah terbuka, atau None
+        """
+        timeout = self.config.getfloat('camera', 'probe_timeout', fallback=5.0)
+        index, camera = probe_streams([self.stream_base_url() + DAHUA_SUBSTREAM_PATH], timeout)
+        return camera
+
+    def setup_substream(self):
+        """Setup substream untuk deteksi dan preview
+
+        Jika substream tidak tersedia, kembali ke mode satu stream: main stream
+        di-decode terus seperti biasa.
+        """
+        self.sub_camera = self.connect_substream()
+        if self.sub_camera is None:
+            logger.warning("Substream tidak tersedia, memakai main stream untuk semua keperluan")
+            print("⚠️ Substream tidak tersedia, mode satu stream")
+            self.dual_stream = False
+            self.grabber.decode = True
+            return
+        
+        self.sub_grabber = FrameGrabber(self.sub_camera, buffer_size=2, name="dahua-sub")
+        self.sub_grabber.start()
+        self.sub_supervisor = CameraSupervisor(
+            self.sub_grabber,
+            self.connect_substream,
+            stall_timeout=self.config.getint('camera', 'stall_timeout_ms', fallback=2000) / 1000,
+            max_delay=self.config.getfloat('camera', 'reconnect_max_delay', fallback=30.0)
+        )
+        self.sub_supervisor.start()
+        logger.info("Substream terhubung untuk deteksi dan preview")
+        print("✅ Substream terhubung (deteksi/preview)")
+
+    def setup_motion(self):
+        """Setup deteksi gerak pada stream preview (substream jika ada)"""
+        motion_config = self.config['motion']
+        
+        # Zona deteksi = ROI plat (dalam piksel main stream) sebagai pecahan frame
+        zone = None
+        if self.roi:
+            x, y, w, h = self.roi
+            width, height = int(self.config['image']['width']), int(self.config['image']['height'])
+            zone = (x / width, y / height, w / width, h / height)
+        
+        detector = MotionDetector(
+            width=motion_config.getint('width', fallback=160),
+            zone=zone,
+            pixel_threshold=motion_config.getint('pixel_threshold', fallback=25),
+            on_fraction=motion_config.getfloat('on_fraction', fallback=0.02),
+            off_fraction=motion_config.getfloat('off_fraction', fallback=0.005),
+            on_frames=motion_config.getint('on_frames', fallback=3),
+            off_frames=motion_config.getint('off_frames', fallback=15),
+            max_active_seconds=motion_config.getfloat('max_active_seconds', fallback=120)
+        )
+        source = self.sub_grabber if self.dual_stream else self.grabber
+        self.motion = MotionTrigger(source, detector, on_enter=self.on_vehicle_enter,
+                                    on_leave=self.on_vehicle_leave)
+        
+        if motion_config.getboolean('prewarm_ocr', fallback=False):
+            script = os.path.normpath(os.path.join(self.base_dir, motion_config.get(
+                'recognize_script', fallback='../../../src/scripts/recognize_plate.py')))
+            self.plate_reader = PlateReader(script)
+            # Muat model OCR sekarang, bukan saat kendaraan pertama datang
+            self.plate_reader.start()
+        
+        self.motion.start()
+        logger.info("Trigger gerak aktif")
+        print("✅ Trigger gerak aktif")
+
+    def on_vehicle_enter(self):
+        """Kendaraan masuk zona: mulai decode main stream dan siapkan OCR"""
+        max_active = self.config.getfloat('motion', 'max_active_seconds', fallback=120)
+        self.grabber.request_decode(max_active)
+        self.prewarm = {'since': time.time(), 'ocr': None}
+        if self.plate_reader:
+            settle = self.config.getfloat('motion', 'settle_seconds', fallback=0.5)
+            timer = threading.Timer(settle, self.prewarm_ocr, args=(self.prewarm,))
+            timer.daemon = True
+            timer.start()
+
+    def on_vehicle_leave(self):
+        """Kendaraan keluar zona: hentikan decode main stream setelah jeda"""
+        trigger_wait = self.config.getfloat('camera', 'trigger_wait', fallback=2.0)
+        self.grabber.end_decode(self.pretrigger['after'] + trigger_wait + 1.0)
+        self.prewarm = None
+
+    def prewarm_ocr(self, prewarm):
+        """Baca plat dari frame paling tajam sebelum tombol ditekan"""
+        if self.prewarm is not prewarm:
+            return
+        settle = self.config.getfloat('motion', 'settle_seconds', fallback=0.5)
+        selection = self.grabber.best_frames(time.time(), before=settle, after=0, timeout=0)
+        if selection['best'] is None:
+            return
+        prewarm['ocr'] = self.plate_reader.recognize(self.crop_roi(selection['best']['frame']))
+        prewarm['ocr_frame_time'] = selection['best']['timestamp']
+
+    def take_prewarmed_ocr(self, timeout=0.5):
+        """Hasil OCR yang disiapkan saat kendaraan masuk, atau None"""
+        prewarm, self.prewarm = self.prewarm, None
+        if not prewarm or prewarm.get('ocr') is None:
+            return None
+        try:
+            response = prewarm['ocr'].result(timeout=timeout)
+        except Exception as e:
+            logger.warning(f"OCR pra-trigger tidak tersedia: {str(e)}")
+            return None
+        # Server hanya memberi confidence per kandidat; kandidat pertama = hasil
+        candidates = response.get('candidates') or []
+        return {
+            'plate': response.get('plate'),
+            'confidence': candidates[0].get('confidence') if candidates else None,
+            'error': response.get('error'),
+            'frame_timestamp': datetime.fromtimestamp(prewarm['ocr_frame_time']).isoformat()
+        }
+
+    def on_camera_state(self, connected, attempts, camera):
+        """Callback supervisor: perbarui status koneksi"""
+        self.connection_status['is_connected'] = connected
+        self.connection_status['reconnect_attempts'] = attempts
+        if camera is not None:
+            self.camera = camera
+            print("✅ Kamera terhubung kembali")
+            if self.stream_upgrade_pending:
+                self.start_stream_upgrade()
+        elif attempts == 0:
+            print("\n⚠️ Stream kamera terhenti, mencoba menghubungkan kembali...")
+
+    def capture_image(self, trigger_time=None):
+        """Ambil gambar dari kamera dan simpan
+
+        Jika pre-trigger aktif, frame paling tajam sebelum tombol ditekan
+        langsung dipakai agar tiket tidak menunggu. Writer lalu menunggu
+        jendela sesudah tombol di background dan menyimpan frame yang lebih
+        tajam jika ada, kemudian metadata dan frame konteks.
+        """
         try:
             # Cek storage sebelum capture
             if not self.check_storage():
@@ -134,43 +450,147 @@ class ParkingCamera:
             timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
             filename = f"TKT{timestamp}_{str(self.counter).zfill(4)}.jpg"
             filepath = os.path.join(self.capture_dir, filename)
+            trigger_time = trigger_time or time.time()
             
-            # Ambil beberapa frame untuk stabilisasi
-            for _ in range(3):
-                ret, frame = self.camera.read()
-                if not ret:
-                    raise Exception("Gagal membaca frame dari kamera")
-                time.sleep(0.1)
+            # Mode dual-stream: mulai decode main stream sekarang
+            trigger_wait = self.config.getfloat('camera', 'trigger_wait', fallback=2.0)
+            self.grabber.request_decode(self.pretrigger['after'] + trigger_wait + 1.0)
             
-            # Ambil dan simpan gambar
-            ret, frame = self.camera.read()
-            if ret and frame is not None:
-                # Simpan dengan kualitas sesuai konfigurasi
-                cv2.imwrite(filepath, frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.config['image']['quality'])])
-                
-                logger.info(f"Gambar berhasil disimpan: {filename}")
-                print(f"\n✅ Gambar disimpan: {filename}")
-                
-                # Update status koneksi
-                self.connection_status.update({
-                    'is_connected': True,
-                    'last_connected': datetime.now()
-                })
-                
-                # Simpan metadata
-                self.save_metadata(filename, frame.shape)
-                
-                # Simpan counter baru
-                self.save_counter()
-                return True, filename
+            selection = None
+            if self.pretrigger['enabled']:
+                # Frame paling tajam dari sebelum tombol ditekan, tanpa menunggu
+                selection = self.grabber.best_frames(trigger_time, before=self.pretrigger['before'],
+                                                     after=0, timeout=0)
+            
+            if selection and selection['best']:
+                frame, frame_time = selection['best']['frame'], selection['best']['timestamp']
             else:
+                # Ambil frame terbaru dari grabber (tanpa membuang frame lama)
+                frame, frame_time = self.grabber.latest(max_age=1.0)
+            
+            if frame is None:
+                # Stream sedang reconnect: tunggu sebentar frame baru, jika tidak
+                # ada pakai frame bagus terakhir agar tiket tetap keluar
+                frame, frame_time = self.grabber.wait_for_frame(timeout=trigger_wait)
+                if frame is None:
+                    frame, frame_time = self.grabber.latest()
+                    if frame is not None:
+                        logger.warning(f"Kamera terputus, memakai frame terakhir "
+                                       f"({time.time() - frame_time:.1f} detik lalu)")
+            
+            if frame is None:
                 logger.error("Gagal mengambil gambar dari kamera")
                 return False, None
+            
+            # Update status koneksi
+            self.connection_status.update({
+                'is_connected': True,
+                'last_connected': datetime.now()
+            })
+            
+            # Antrekan encode + simpan dengan kualitas sesuai konfigurasi; jika
+            # pre-trigger aktif, writer menunggu frame sesudah tombol ditekan
+            quality = int(self.config['image']['quality'])
+            capture = {'frame': frame, 'timestamp': frame_time, 'selection': selection}
+            refine = None
+            if self.pretrigger['enabled'] and self.pretrigger['after'] > 0:
+                def refine():
+                    return self.refine_capture(capture, trigger_time)
+            ocr = self.take_prewarmed_ocr()
+            
+            def on_done(path, ok):
+                if not ok:
+                    print(f"\n❌ Gagal menyimpan gambar: {filename}")
+                    return
+                logger.info(f"Gambar disimpan: {filename}")
+                print(f"\n✅ Gambar disimpan: {filename}")
+                
+                # Simpan juga frame terbaik dari sisi lain tombol sebagai cadangan OCR
+                if capture['selection'] and self.pretrigger['save_context']:
+                    self.save_context_frames(filename, capture['selection'], quality)
+                
+                # Simpan metadata (termasuk hasil OCR pra-trigger jika ada)
+                self.save_metadata(filename, capture['frame'].shape, capture['timestamp'],
+                                   self.describe_selection(capture['selection'], trigger_time), ocr)
+            
+            self.writer.submit_image(filepath, frame, quality, refine=refine, on_done=on_done)
+            logger.info(f"Gambar diantrekan untuk disimpan: {filename}")
+            
+            # Simpan counter baru
+            self.save_counter()
+            return True, filename
                 
         except Exception as e:
             logger.error(f"Error saat capture gambar: {str(e)}")
             return False, None
 
+    def refine_capture(self, capture, trigger_time):
+        """Jalan di thread writer: tunggu jendela sesudah tombol ditekan
+
+        Returns:
+            Frame yang lebih tajam dari frame awal, atau None jika frame
+            awal tetap yang terbaik
+        """
+        selection = self.grabber.best_frames(trigger_time, before=self.pretrigger['before'],
+                                             after=self.pretrigger['after'])
+        if not selection['best']:
+            return None
+        capture['selection'] = selection
+        if selection['best']['timestamp'] == capture['timestamp']:
+            return None
+        capture['frame'], capture['timestamp'] = selection['best']['frame'], selection['best']['timestamp']
+        return capture['frame']
+
+    def load_pretrigger(self):
+        """Load pengaturan ring pre-trigger dari bagian [pretrigger] config.ini"""
+        return {
+            'enabled': self.config.getboolean('pretrigger', 'enabled', fallback=True),
+            'before': self.config.getfloat('pretrigger', 'before_seconds', fallback=1.5),
+            'after': self.config.getfloat('pretrigger', 'after_seconds', fallback=0.5),
+            'max_memory_mb': self.config.getint('pretrigger', 'max_memory_mb', fallback=256),
+            'dual_stream_fps': self.config.getfloat('pretrigger', 'dual_stream_fps', fallback=4),
+            'save_context': self.config.getboolean('pretrigger', 'save_context', fallback=False)
+        }
+
+    def save_context_frames(self, filename, selection, quality):
+        """Simpan frame terbaik sebelum dan sesudah tombol ditekan (_pre/_post)"""
+        best = selection['best']
+        base = filename.replace('.jpg', '')
+        for side in ('before', 'after'):
+            entry = selection[side]
+            if entry is None or entry is best:
+                continue
+            suffix = 'pre' if side == 'before' else 'post'
+            self.writer.submit_image(os.path.join(self.capture_dir, f"{base}_{suffix}.jpg"), entry['frame'], quality)
+
+    def describe_selection(self, selection, trigger_time):
+        """Ringkasan pemilihan frame untuk metadata"""
+        if not selection or not selection['best']:
+            return None
+        trigger_time = trigger_time or selection['best']['timestamp']
+        summary = {'frames_considered': selection['considered']}
+        for side in ('best', 'before', 'after'):
+            entry = selection[side]
+            summary[side] = {
+                'offset_ms': round((entry['timestamp'] - trigger_time) * 1000),
+                'sharpness': round(entry['sharpness'], 1)
+            } if entry else None
+        return summary
+
+    def load_roi(self):
+        """Load region of interest dari bagian [roi] config.ini"""
+        if 'roi' not in self.config or not self.config['roi'].getboolean('enabled', fallback=False):
+            return None
+        roi_config = self.config['roi']
+        return tuple(int(roi_config[key]) for key in ('x', 'y', 'width', 'height'))
+
+    def crop_roi(self, frame):
+        """Potong frame ke region of interest sebelum filter dan OCR"""
+        if not self.roi:
+            return frame
+        x, y, w, h = self.roi
+        return frame[max(y, 0):y + h, max(x, 0):x + w]
+
     def load_config(self):
         """Load konfigurasi dari file config.ini"""
         try:
@@ -204,22 +624,25 @@ class ParkingCamera:
     def save_counter(self):
         """Simpan nilai counter ke file"""
         try:
-            with open(self.counter_file, 'w') as f:
-                f.write(str(self.counter))
+            atomic_write(self.counter_file, str(self.counter).encode())
         except Exception as e:
             logger.error(f"Error saving counter: {str(e)}")
 
-    def save_metadata(self, filename, shape):
+    def save_metadata(self, filename, shape, frame_time=None, selection=None, ocr=None):
         """Simpan metadata gambar"""
         try:
             metadata = {
                 'filename': filename,
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'frame_timestamp': datetime.fromtimestamp(frame_time).isoformat() if frame_time else None,
                 'resolution': {
                     'width': shape[1],
                     'height': shape[0],
                     'channels': shape[2]
                 },
+                'roi': list(self.roi) if self.roi else None,
+                'frame_selection': selection,
+                'ocr': ocr,
                 'camera_info': {
                     'ip': self.config['camera']['ip'],
                     'connection_status': {
@@ -231,33 +654,62 @@ class ParkingCamera:
                 }
             }
             
-            metadata_file = os.path.join(self.capture_dir, f"{filename}.json")
-            with open(metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=4)
-                
-            logger.info(f"Metadata tersimpan: {metadata_file}")
+            self.catalog.add(metadata)
+            logger.info(f"Metadata diantrekan ke katalog: {filename}")
             
         except Exception as e:
             logger.error(f"Gagal menyimpan metadata: {str(e)}")
 
+    def on_storage_low(self, free_bytes):
+        """Callback StorageMonitor: jalankan retensi segera"""
+        if getattr(self, 'retention', None):
+            self.retention.request_pass()
+
     def check_storage(self):
-        """Cek kapasitas storage"""
-        try:
-            total, used, free = shutil.disk_usage(self.base_dir)
-            free_gb = free // (2**30)  # Convert to GB
-            min_free_space = float(self.config['storage']['min_free_space_gb'])
-            
-            if free_gb < min_free_space:
-                logger.warning(f"Storage tersisa kurang dari {min_free_space}GB: {free_gb}GB")
-                print(f"\n⚠️ Peringatan: Storage tersisa {free_gb}GB")
-                return False
-            return True
-        except Exception as e:
-            logger.error(f"Error checking storage: {str(e)}")
-            return False
+        """Cek kapasitas storage dari flag StorageMonitor (tanpa akses disk)
+
+        Di bawah min_free_space_gb, retensi dijalankan untuk membebaskan ruang
+        dan capture tetap berjalan. Capture hanya ditolak jika sisa ruang di
+        bawah batas darurat (hard_min_free_space_mb).
+        """
+        if self.storage.low:
+            free_gb = (self.storage.free_bytes or 0) / (2**30)
+            logger.warning(f"Storage tersisa kurang dari {self.config['storage']['min_free_space_gb']}GB: {free_gb:.1f}GB")
+            print(f"\n⚠️ Peringatan: Storage tersisa {free_gb:.1f}GB")
+        return not self.storage.critical
 
     def display_status(self):
         """Tampilkan status sistem"""
+        grabber_stats = self.grabber.stats()
+        supervisor_stats = self.supervisor.stats()
+        writer_stats = self.writer.stats()
+        retention_line = 'nonaktif'
+        if self.retention:
+            retention_stats = self.retention.stats()
+            retention_line = (f"{retention_stats['reduced']} diperkecil, {retention_stats['archived']} diarsip, "
+                              f"{retention_stats['deleted']} dihapus")
+        stream_line = 'satu stream (main di-decode terus)'
+        if self.dual_stream:
+            sub_stats = self.sub_grabber.stats()
+            stream_line = (f"dual (substream {sub_stats['fps']:.1f} fps, main "
+                           f"{'decode' if grabber_stats['decoding'] else 'grab saja'})")
+        motion_line = 'nonaktif'
+        if self.motion:
+            motion_stats = self.motion.stats()
+            motion_line = (f"{'kendaraan di zona' if motion_stats['vehicle_present'] else 'kosong'} "
+                           f"({motion_stats['events']} event, perubahan {motion_stats['changed_fraction']:.1%})")
+        printer_line = 'tidak tersedia'
+        if getattr(self, 'spooler', None):
+            spooler_stats = self.spooler.stats()
+            printer_line = (f"{'KERTAS HABIS' if spooler_stats['paper_out'] else spooler_stats['state']}, "
+                            f"antrean {spooler_stats['queue_depth']}, dicetak {spooler_stats['printed']}, "
+                            f"gagal {spooler_stats['failed']}, latensi p95 {spooler_stats['latency_p95_ms']:.0f} ms")
+        storage_stats = self.storage.stats()
+        storage_line = f"{storage_stats['free_gb'] or 0:.1f} GB bebas"
+        if storage_stats['trend_gb_per_day'] is not None:
+            storage_line += f", tren {storage_stats['trend_gb_per_day']:+.2f} GB/hari"
+        if storage_stats['seconds_until_low'] is not None:
+            storage_line += f", batas minimum dalam ~{storage_stats['seconds_until_low'] / 86400:.1f} hari"
         status = f"""
 Status Sistem:
 -------------
@@ -266,6 +718,17 @@ IP: {self.config['camera']['ip']}
 Resolusi: {self.config['image']['width']}x{self.config['image']['height']}
 Total Gambar: {self.counter}
 Last Connected: {self.connection_status['last_connected']}
+Reconnect: {supervisor_stats['reconnects']}x dari {supervisor_stats['outages']} gangguan (percobaan saat ini: {supervisor_stats['attempts']}, gangguan terakhir: {supervisor_stats['last_outage_seconds'] or 0:.1f} detik)
+Waktu Startup: {self.startup_stats['total_seconds'] or 0:.1f} detik (kamera {self.startup_stats['camera_seconds'] or 0:.1f} detik{', URL dari cache' if self.startup_stats['cached_url_used'] else ''})
+Frame Dibaca: {grabber_stats['frames_read']} ({grabber_stats['fps']:.1f} fps)
+Frame Hilang: {grabber_stats['dropped_frames']} (gagal baca: {grabber_stats['failed_reads']})
+Buffer Pre-trigger: {grabber_stats['buffered_frames']} frame ({grabber_stats['buffer_mb']:.0f} MB)
+Mode Stream: {stream_line}
+Trigger Gerak: {motion_line}
+Storage: {storage_line}
+Retensi: {retention_line}
+Printer: {printer_line}
+Antrean Simpan: {writer_stats['queue_depth']} (maks {writer_stats['max_depth']}, gagal {writer_stats['failed']}, encode {writer_stats['avg_encode_ms']:.0f} ms)
 """
         print(status)
 
@@ -348,25 +811,39 @@ Last Connected: {self.connection_status['last_connected']}
             return False
 
     def setup_printer(self):
-        """Setup printer thermal menggunakan win32print"""
+        """Setup printer thermal sesuai [printer] type di config.ini"""
         try:
             self.printer_available = False
             
             print("\nMencari printer thermal...")
             
             try:
-                # Get default printer
-                self.printer_name = win32print.GetDefaultPrinter()
+                # Backend dipilih dari config (win32, escpos, usb, serial, tcp, file)
+                self.printer = open_backend(self.config)
+                self.printer_name = self.printer.name
                 print(f"✅ Printer terdeteksi: {self.printer_name}")
                 self.printer_available = True
+
+                # Satu thread yang memegang printer; antrean disimpan di disk
+                self.spooler = PrintSpooler(
+                    self.printer.send,
+                    queue_dir=spool_dir(__file__, self.config.get('printer', 'queue_dir', fallback='print_queue'),
+                                        self.config.get('printer', 'queue_name', fallback='') or None),
+                    max_attempts=self.config.getint('printer', 'max_attempts', fallback=3),
+                    retry_delay=self.config.getfloat('printer', 'retry_delay', fallback=2.0),
+                    paper_out_delay=self.config.getfloat('printer', 'paper_out_delay', fallback=5.0),
+                    max_batch=self.config.getint('printer', 'max_batch', fallback=4),
+                    on_state=self.on_print_state
+                )
+                self.spooler.start()
                 return
                 
             except Exception as e:
-                print(f"❌ Gagal mendapatkan default printer: {str(e)}")
+                print(f"❌ Gagal membuka printer ({self.config.get('printer', 'type', fallback='win32')}): {str(e)}")
                 print("\nTroubleshooting printer:")
                 print("1. Pastikan printer thermal terhubung ke USB")
-                print("2. Pastikan driver printer terinstall")
-                print("3. Pastikan printer diset sebagai default printer")
+                print("2. Pastikan driver printer terinstall (type = win32) atau libusb (type = escpos/usb)")
+                print("3. Pastikan [printer] di config.ini sesuai (type, vendor_id/product_id, host)")
                 print("4. Pastikan printer menyala dan kertas tersedia")
             
         except Exception as e:
@@ -375,52 +852,42 @@ Last Connected: {self.connection_status['last_connected']}
             self.printer_available = False
 
     def print_ticket(self, filename):
-        """Cetak tiket parkir menggunakan win32print"""
+        """Antrekan tiket parkir ke spooler (tidak menunggu printer)"""
         if not self.printer_available:
             logger.info("Melewati pencetakan tiket - printer tidak tersedia")
             return
 
         try:
-            # Buka koneksi ke printer
-            printer_handle = win32print.OpenPrinter(self.printer_name)
-            job_id = win32print.StartDocPrinter(printer_handle, 1, ("Tiket Parkir", None, "RAW"))
-            win32print.StartPagePrinter(printer_handle)
-
-            # Format tiket dengan ESC/POS commands
+            # Format tiket dengan ESC/POS commands; bagian tetap sudah disiapkan
             timestamp = datetime.now()
+            ticket_number = filename.replace('.jpg', '')
             ticket_text = (
-                b"\x1B\x40" +          # Initialize printer
-                b"\x1B\x61\x01" +      # Center alignment
-                b"RSI BANJARNEGARA\n" +
-                b"TIKET PARKIR\n" +
-                b"--------------------------------\n" +
-                b"\x1B\x61\x00" +      # Left alignment
+                self.TICKET_HEADER +
                 f"Tanggal : {timestamp.strftime('%d-%m-%Y')}\n".encode() +
                 f"Jam     : {timestamp.strftime('%H:%M:%S')}\n".encode() +
-                f"No.     : {filename.replace('.jpg','')}\n".encode() +
-                b"--------------------------------\n" +
-                b"\x1B\x61\x01" +      # Center alignment
-                b"Terima Kasih\n" +
-                b"Simpan Tiket Anda\n" +
-                b"\n\n" +              # Extra lines for spacing
-                b"\x1D\x56\x41\x00"    # Auto-cut command
+                f"No.     : {ticket_number}\n".encode() +
+                self.TICKET_FOOTER
             )
 
-            # Kirim data ke printer
-            win32print.WritePrinter(printer_handle, ticket_text)
+            self.spooler.submit(ticket_text, name=ticket_number, key=ticket_number)
+            logger.info(f"Tiket masuk antrean cetak: {filename}")
 
-            # Selesaikan job printing
-            win32print.EndPagePrinter(printer_handle)
-            win32print.EndDocPrinter(printer_handle)
-            win32print.ClosePrinter(printer_handle)
-            
-            logger.info(f"Tiket berhasil dicetak: {filename}")
-            print("✅ Tiket berhasil dicetak")
-            
         except Exception as e:
-            logger.error(f"Gagal mencetak tiket: {str(e)}")
+            logger.error(f"Gagal mengantrekan tiket: {str(e)}")
             print(f"❌ Gagal mencetak tiket: {str(e)}")
 
+    def on_print_state(self, job, state):
+        """Umpan balik status cetak dari spooler"""
+        if state == 'printed':
+            logger.info(f"Tiket berhasil dicetak: {job['name']}")
+            print(f"✅ Tiket berhasil dicetak: {job['name']}")
+        elif state == 'paper_out':
+            logger.warning(f"Kertas printer habis, tiket {job['name']} menunggu")
+            print(f"⚠️ Kertas printer habis! Tiket {job['name']} akan dicetak setelah kertas diisi")
+        elif state == 'failed':
+            logger.error(f"Gagal mencetak tiket: {job['name']}")
+            print(f"❌ Gagal mencetak tiket: {job['name']}")
+
     def setup_database(self):
         """Setup koneksi ke database PostgreSQL"""
         try:
@@ -465,10 +932,12 @@ Last Connected: {self.connection_status['last_connected']}
 
     def process_button_press(self):
         """Proses ketika tombol ditekan - ambil gambar, cetak tiket, dan simpan ke database"""
+        # Catat waktu tombol ditekan sebelum memproses apa pun
+        trigger_time = time.time()
         print("\nMemproses... Mohon tunggu...")
         
         # Ambil gambar
-        success, filename = self.capture_image()
+        success, filename = self.capture_image(trigger_time)
         
         if success:
             # Simpan ke database
@@ -487,6 +956,32 @@ Last Connected: {self.connection_status['last_connected']}
     def cleanup(self):
         """Bersihkan resources"""
         try:
+            if getattr(self, 'retention', None):
+                self.retention.stop()
+            if hasattr(self, 'storage'):
+                self.storage.stop()
+            if getattr(self, 'motion', None):
+                self.motion.stop()
+            if getattr(self, 'plate_reader', None):
+                self.plate_reader.close()
+            if getattr(self, 'spooler', None):
+                # Tiket yang belum tercetak tetap di antrean disk
+                self.spooler.stop()
+            if hasattr(self, 'sub_supervisor'):
+                self.sub_supervisor.stop()
+            if hasattr(self, 'sub_grabber'):
+                self.sub_grabber.stop()
+                if self.sub_grabber.camera is not None:
+                    self.sub_grabber.camera.release()
+            if hasattr(self, 'supervisor'):
+                self.supervisor.stop()
+            if hasattr(self, 'grabber'):
+                self.grabber.stop()
+            if hasattr(self, 'writer'):
+                # Pastikan semua gambar yang diantrekan sudah tertulis
+                self.writer.close()
+            if hasattr(self, 'catalog'):
+                self.catalog.close()
             if hasattr(self, 'camera'):
                 self.camera.release()
             if hasattr(self, 'button'):
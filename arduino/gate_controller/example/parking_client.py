@@ -6,11 +6,11 @@ import requests
 import serial
 import serial.tools.list_ports
 import time
-import win32print
-import win32ui
-from PIL import Image, ImageDraw, ImageFont, ImageWin
-import barcode
-from barcode.writer import ImageWriter
+import configparser
+from PIL import Image, ImageDraw, ImageFont
+from barcode_render import render_barcode
+from escpos_raster import RasterPrinter
+from printer_backend import open_backend
 import base64
 from io import BytesIO
 
@@ -30,6 +30,8 @@ class ParkingClient:
         self.printer = None
         self.arduino = None
         self.printer_name = None
+        self.config = configparser.ConfigParser()
+        self.config.read('config.ini')
         self.initialize_devices()
 
     def initialize_devices(self):
@@ -39,7 +41,27 @@ class ParkingClient:
 
     def initialize_printer(self):
         """Initialize printer connection"""
+        if self.config.getboolean('printer', 'raster', fallback=False):
+            # Raw ESC/POS raster straight to the printer, bypassing the Windows driver
+            try:
+                backend = open_backend(self.config)
+                self.printer = RasterPrinter(
+                    backend,
+                    paper_width=self.config.getint('printer', 'paper_width', fallback=576),
+                    threshold=self.config.getint('printer', 'raster_threshold', fallback=128)
+                )
+                self.printer_name = f"raster:{backend.name}"
+                logger.info(f"Using ESC/POS raster printer: {self.printer_name}")
+                print(f"✅ Printer raster: {self.printer_name}")
+                return
+            except Exception as e:
+                logger.error(f"Raster printer initialization error: {str(e)}")
+                print("⚠️ Printer raster tidak tersedia, memakai driver Windows")
+                self.printer = None
+
         try:
+            # Windows driver (GDI) printing; pywin32 is only needed on this path
+            import win32print
             printers = win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL, None, 1)
             logger.info(f"Available printers: {printers}")
             
@@ -113,13 +135,8 @@ class ParkingClient:
             draw.text((20, 140), f"PLAT : {data['plat']}", font=font_normal, fill='black')
             draw.text((20, 180), f"WAKTU: {data['waktu']}", font=font_normal, fill='black')
 
-            # Generate barcode
-            barcode_class = barcode.get_barcode_class('code39')
-            barcode_instance = barcode_class(data['tiket'], writer=ImageWriter())
-            barcode_image = barcode_instance.render()
-            
-            # Resize barcode to fit ticket width
-            barcode_image = barcode_image.resize((width-40, 100))
+            # Generate barcode in memory, sized to fit ticket width
+            barcode_image = render_barcode(data['tiket'], 'code39', size=(width-40, 100))
             
             # Paste barcode
             image.paste(barcode_image, (20, 240))
@@ -142,11 +159,16 @@ class ParkingClient:
             if not ticket_image:
                 return False
 
-            # Save temporary file
-            temp_file = "temp_ticket.bmp"
-            ticket_image.save(temp_file)
+            if self.printer:
+                self.printer.print_image(ticket_image)
+                logger.info(f"Ticket printed successfully: {data['tiket']}")
+                print("✅ Tiket berhasil dicetak")
+                return True
 
             # Print using default Windows printer
+            import win32print
+            import win32ui
+            from PIL import ImageWin
             hprinter = win32print.OpenPrinter(self.printer_name)
             try:
                 hdc = win32ui.CreateDC()
@@ -170,9 +192,6 @@ class ParkingClient:
                 
             finally:
                 win32print.ClosePrinter(hprinter)
-                # Clean up
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
             
         except Exception as e:
             logger.error(f"Error printing ticket: {str(e)}")
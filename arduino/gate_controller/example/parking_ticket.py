@@ -1,8 +1,7 @@
 import os
 from datetime import datetime
-from barcode import Code128
-from barcode.writer import ImageWriter
 from PIL import Image, ImageDraw, ImageFont
+from barcode_render import render_barcode
 import psycopg2
 from psycopg2 import Error
 
@@ -72,14 +71,8 @@ class ParkingTicket:
         ticket_number = self.generate_ticket_number()
 
         try:
-            # Generate barcode
-            barcode = Code128(ticket_number, writer=ImageWriter())
-            barcode_path = f"barcode_{ticket_number}"
-            barcode.save(barcode_path)
-
-            # Open and resize barcode image
-            barcode_img = Image.open(f"{barcode_path}.png")
-            barcode_img = barcode_img.resize((360, 100))
+            # Generate barcode in memory at its final size
+            barcode_img = render_barcode(ticket_number, 'code128', size=(360, 100))
 
             # Add barcode to ticket
             ticket.paste(barcode_img, (self.margin, 200))
@@ -101,9 +94,6 @@ class ParkingTicket:
             ticket_path = f"ticket_{ticket_number}.png"
             ticket.save(ticket_path)
 
-            # Clean up temporary barcode file
-            os.remove(f"{barcode_path}.png")
-
             # Save ticket information to database
             if self.save_to_database(ticket_number, plate_number):
                 print("Ticket saved to database successfully")
@@ -0,0 +1,144 @@
+import cv2
+import sys
+import json
+import base64
+import itertools
+import subprocess
+import threading
+import logging
+import numpy as np
+from multiprocessing import shared_memory
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+class PlateReader:
+    """Client for a long-lived `recognize_plate.py --serve` process
+
+    The EasyOCR model is loaded once when the process starts; requests go
+    over the JSON-lines protocol and are answered through futures, so OCR
+    can run while the gate does other work. Frames are handed over in
+    shared memory (no JPEG encode/decode); if a segment cannot be created
+    the frame is sent as base64 JPEG instead.
+    """
+
+    def __init__(self, script_path, python=None, jpeg_quality=90, use_shared_memory=True):
+        self.script_path = script_path
+        self.python = python or sys.executable
+        self.jpeg_quality = jpeg_quality
+        self.use_shared_memory = use_shared_memory
+        self.process = None
+        self.pending = {}
+        # Shared-memory segments by request id, released once answered
+        self.segments = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+
+    def start(self):
+        """Start the recognition server (model loading continues in the background)"""
+        with self.lock:
+            if self.process and self.process.poll() is None:
+                return
+            self.ready.clear()
+            self.process = subprocess.Popen(
+                [self.python, self.script_path, '--serve'],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1
+            )
+            threading.Thread(target=self._read_responses, args=(self.process,),
+                             name="PlateReader", daemon=True).start()
+        logger.info(f"Plate recognition server started: {self.script_path}")
+
+    def _read_responses(self, process):
+        for line in process.stdout:
+            try:
+                response = json.loads(line)
+            except ValueError:
+                logger.warning(f"Invalid response from plate recognizer: {line.strip()}")
+                continue
+            if response.get('event') == 'ready':
+                self.ready.set()
+                continue
+            with self.lock:
+                future = self.pending.pop(response.get('id'), None)
+                segment = self.segments.pop(response.get('id'), None)
+            self._release(segment)
+            if future:
+                future.set_result(response)
+
+        # Server exited: fail whatever is still waiting
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            segments, self.segments = self.segments, {}
+        for segment in segments.values():
+            self._release(segment)
+        for future in pending.values():
+            future.set_exception(Exception("Plate recognizer stopped"))
+        logger.warning("Plate recognition server exited")
+
+    def _share(self, frame):
+        """Copy a frame into a new shared-memory segment
+
+        Returns:
+            (segment, header) or (None, None) if no segment could be created
+        """
+        try:
+            segment = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        except OSError as e:
+            logger.warning(f"Shared memory unavailable, sending JPEG: {e}")
+            return None, None
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=segment.buf)[:] = frame
+        return segment, {'name': segment.name, 'shape': list(frame.shape), 'dtype': str(frame.dtype)}
+
+    @staticmethod
+    def _release(segment):
+        if segment is None:
+            return
+        segment.close()
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+    def recognize(self, frame):
+        """Submit a BGR frame for recognition
+
+        Returns:
+            Future resolving to the server's response dict ('plate', 'error', ...)
+        """
+        self.start()
+        future = Future()
+        segment, header = self._share(frame) if self.use_shared_memory else (None, None)
+        if header:
+            request = {'shm': header}
+        else:
+            ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                future.set_exception(Exception("JPEG encode failed"))
+                return future
+            request = {'image': base64.b64encode(encoded.tobytes()).decode('ascii')}
+
+        request_id = next(self.ids)
+        request['id'] = request_id
+        with self.lock:
+            self.pending[request_id] = future
+            if segment is not None:
+                self.segments[request_id] = segment
+            try:
+                self.process.stdin.write(json.dumps(request) + '\n')
+                self.process.stdin.flush()
+            except OSError as e:
+                self.pending.pop(request_id, None)
+                self._release(self.segments.pop(request_id, None))
+                future.set_exception(e)
+        return future
+
+    def close(self):
+        with self.lock:
+            process, self.process = self.process, None
+        if process and process.poll() is None:
+            process.stdin.close()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
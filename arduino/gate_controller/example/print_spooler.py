@@ -0,0 +1,342 @@
+import os
+import sys
+import json
+import time
+import base64
+import threading
+import logging
+from collections import OrderedDict, deque
+from spool_common import PaperOutError, atomic_write
+
+logger = logging.getLogger(__name__)
+
+def spool_dir(script_file=None, queue_dir='print_queue', name=None):
+    """Journal directory for one entry script: <script dir>/<queue_dir>/<name>
+
+    A relative queue_dir is resolved against the script's directory, not
+    the working directory, and every entry script gets its own
+    subdirectory (name defaults to the script name), so gate processes
+    started from the same place never share job ids or journal files.
+
+    Args:
+        script_file: Entry script path (default: the running script)
+        queue_dir: Base directory, relative to the script or absolute
+        name: Subdirectory, e.g. a gate id when one script runs twice
+    """
+    script_file = os.path.abspath(script_file or sys.argv[0] or 'print')
+    name = name or os.path.splitext(os.path.basename(script_file))[0]
+    return os.path.join(os.path.dirname(script_file), queue_dir, name)
+
+class PrintSpooler:
+    """Single printer writer with a persistent job queue
+
+    submit() journals the job to queue_dir and returns immediately; one
+    worker thread owns the printer and sends jobs in order. Jobs that are
+    already waiting are coalesced into one batch that holds the printer
+    once; each job in it is still sent and journaled as printed on its
+    own, so a batch retried after a partial send only reprints the jobs
+    that did not go out. A PaperOutError keeps the job at the
+    head of the queue until paper is loaded; other errors are retried up
+    to max_attempts and then the job file is kept as .failed. Jobs still
+    queued when the process stops are printed after the next start.
+    """
+
+    def __init__(self, send, queue_dir=None, lock=None, max_attempts=3, retry_delay=2.0,
+                 paper_out_delay=5.0, max_batch=4, on_state=None, history=200):
+        """
+        Args:
+            send: Callable(bytes) that writes one payload to the printer
+            queue_dir: Directory holding the journaled jobs (default: spool_dir())
+            lock: Lock held while the printer is in use, shared with other printing code
+            max_attempts: Sends before a job is given up (paper-out waits don't count)
+            retry_delay: Seconds between attempts after an error
+            paper_out_delay: Seconds between attempts while out of paper
+            max_batch: Most queued jobs coalesced into one send
+            on_state: Callable(job, state) on every state change, for status feedback
+            history: Job states and latencies remembered for stats
+        """
+        self.send = send
+        self.queue_dir = queue_dir = queue_dir or spool_dir()
+        self.lock = lock or threading.Lock()
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.paper_out_delay = paper_out_delay
+        self.max_batch = max_batch
+        self.on_state = on_state
+
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.jobs = deque()
+        self.states = OrderedDict()
+        self.history = history
+        self.running = False
+        self.thread = None
+        self.busy = False
+        self.paper_out = False
+        self.state = 'idle'
+
+        # Metrics
+        self.submitted = 0
+        self.printed = 0
+        self.failed = 0
+        self.retries = 0
+        self.paper_out_events = 0
+        self.coalesced = 0
+        self.duplicates = 0
+        self.send_seconds = 0.0
+        self.sends = 0
+        self.latencies = deque(maxlen=history)
+
+        os.makedirs(queue_dir, exist_ok=True)
+        self.next_id = 1
+        self._load_journal()
+
+    def _job_path(self, job_id, suffix='.job'):
+        return os.path.join(self.queue_dir, f"{job_id:08d}{suffix}")
+
+    def _load_journal(self):
+        for name in sorted(os.listdir(self.queue_dir)):
+            stem, ext = os.path.splitext(name)
+            if not stem.isdigit() or ext not in ('.job', '.failed'):
+                continue
+            self.next_id = max(self.next_id, int(stem) + 1)
+            if ext != '.job':
+                continue
+            try:
+                with open(os.path.join(self.queue_dir, name), 'r') as f:
+                    record = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Unreadable print job {name}: {e}")
+                continue
+            self.jobs.append({
+                'id': int(stem),
+                'name': record.get('name', ''),
+                'key': record.get('key'),
+                'submitted': record.get('submitted', time.time()),
+                'payload': base64.b64decode(record['payload']),
+                'attempts': 0
+            })
+        if self.jobs:
+            logger.info(f"Print queue restored with {len(self.jobs)} pending jobs")
+
+    def submit(self, payload, name='', key=None):
+        """Queue raw printer data without waiting for the printer
+
+        Args:
+            payload: Bytes to send (e.g. ESC/POS commands for one ticket)
+            name: Label for logs and status feedback, such as the ticket number
+            key: Optional identity; a job whose key is already queued is not added again
+
+        Returns:
+            Job id
+        """
+        with self.condition:
+            if key is not None:
+                for job in self.jobs:
+                    if job['key'] == key:
+                        self.duplicates += 1
+                        logger.info(f"Print job {name or key} already queued as {job['id']}")
+                        return job['id']
+            job = {
+                'id': self.next_id,
+                'name': name,
+                'key': key,
+                'submitted': time.time(),
+                'payload': bytes(payload),
+                'attempts': 0
+            }
+            self.next_id += 1
+            # Journal before queueing so a crash cannot lose an accepted job
+            atomic_write(self._job_path(job['id']), json.dumps({
+                'name': name,
+                'key': key,
+                'submitted': job['submitted'],
+                'payload': base64.b64encode(job['payload']).decode('ascii')
+            }).encode())
+            self.jobs.append(job)
+            self.submitted += 1
+            self.condition.notify()
+        self._set_state(job, 'queued')
+        return job['id']
+
+    def _set_state(self, job, state):
+        with self.condition:
+            if self.states.get(job['id']) == state:
+                return
+            self.states[job['id']] = state
+            self.states.move_to_end(job['id'])
+            while len(self.states) > self.history:
+                self.states.popitem(last=False)
+        if self.on_state:
+            try:
+                self.on_state(job, state)
+            except Exception as e:
+                logger.error(f"Print state callback failed: {e}")
+
+    def job_state(self, job_id):
+        """'queued', 'printing', 'retry', 'paper_out', 'printed', 'failed' or None"""
+        with self.condition:
+            return self.states.get(job_id)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="PrintSpooler", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the worker; unprinted jobs stay journaled for the next start"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+    def flush(self, timeout=None):
+        """Wait until the queue is empty
+
+        Returns:
+            True if every job was printed or given up, False on timeout
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while self.jobs:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def _next_batch(self):
+        batch = [self.jobs[0]]
+        if batch[0]['attempts'] == 0:
+            # Jobs that have failed before are sent on their own
+            for job in list(self.jobs)[1:self.max_batch]:
+                if job['attempts']:
+                    break
+                batch.append(job)
+        return batch
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.jobs:
+                    self.state = 'idle'
+                    self.condition.wait()
+                if not self.running:
+                    return
+                batch = self._next_batch()
+
+            delay = self._send_batch(batch)
+            if delay:
+                self.stop_event.wait(delay)
+
+    def _send_batch(self, batch):
+        """Send a batch; returns the delay before the next attempt, if any"""
+        if not self.paper_out:
+            # While out of paper jobs stay 'paper_out' until they print
+            for job in batch:
+                self._set_state(job, 'printing')
+            self.state = 'printing'
+        started = time.perf_counter()
+        sent = 0
+        try:
+            with self.lock:
+                self.busy = True
+                try:
+                    # One send per job, journaled as soon as it is out
+                    for job in batch:
+                        self.send(job['payload'])
+                        sent += 1
+                        self._printed(job)
+                finally:
+                    self.busy = False
+        except PaperOutError as e:
+            if not self.paper_out:
+                self.paper_out = True
+                self.paper_out_events += 1
+                logger.warning(f"Printer out of paper, holding {len(self.jobs)} jobs: {e}")
+            self.state = 'paper_out'
+            for job in batch[sent:]:
+                self._set_state(job, 'paper_out')
+            return self.paper_out_delay
+        except Exception as e:
+            # Only the job that failed uses up an attempt; the rest of the
+            # batch was never sent
+            job = batch[sent]
+            logger.error(f"Print failed ({job['name'] or job['id']}): {e}")
+            self.state = 'error'
+            job['attempts'] += 1
+            if job['attempts'] >= self.max_attempts:
+                self._finish(job, 'failed')
+            else:
+                self.retries += 1
+                self._set_state(job, 'retry')
+            for job in batch[sent + 1:]:
+                self._set_state(job, 'queued')
+            return self.retry_delay
+        finally:
+            if sent:
+                self.send_seconds += time.perf_counter() - started
+                self.sends += 1
+                self.coalesced += sent - 1
+
+        self.state = 'idle'
+        return None
+
+    def _printed(self, job):
+        if self.paper_out:
+            self.paper_out = False
+            logger.info("Printer has paper again")
+        self.latencies.append(time.time() - job['submitted'])
+        self._finish(job, 'printed')
+
+    def _finish(self, job, state):
+        path = self._job_path(job['id'])
+        try:
+            if state == 'printed':
+                os.remove(path)
+            else:
+                os.replace(path, self._job_path(job['id'], '.failed'))
+        except OSError as e:
+            logger.error(f"Could not update print journal for job {job['id']}: {e}")
+        with self.condition:
+            self.jobs.remove(job)
+            if state == 'printed':
+                self.printed += 1
+            else:
+                self.failed += 1
+            self.condition.notify_all()
+        self._set_state(job, state)
+
+    def stats(self):
+        """Queue depth, outcomes and latency (submit to printed) percentiles"""
+        with self.condition:
+            latencies = sorted(self.latencies)
+            depth = len(self.jobs)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+        return {
+            'state': self.state,
+            'paper_out': self.paper_out,
+            'queue_depth': depth,
+            'submitted': self.submitted,
+            'printed': self.printed,
+            'failed': self.failed,
+            'retries': self.retries,
+            'paper_out_events': self.paper_out_events,
+            'coalesced': self.coalesced,
+            'duplicates': self.duplicates,
+            'latency_p50_ms': percentile(50),
+            'latency_p95_ms': percentile(95),
+            'latency_max_ms': latencies[-1] * 1000 if latencies else 0.0,
+            'avg_send_ms': self.send_seconds / self.sends * 1000 if self.sends else 0.0
+        }
@@ -0,0 +1,260 @@
+import os
+import socket
+import threading
+import logging
+from spool_common import PaperOutError
+
+logger = logging.getLogger(__name__)
+
+class PrinterBackend:
+    """Destination for raw ESC/POS bytes
+
+    write() may be called several times for one job (raster images are
+    streamed in chunks); flush() ends the job. Platform libraries are
+    imported by each backend's constructor, so this module and the
+    scripts using it import on any OS and only the configured backend's
+    dependencies need to be installed.
+    """
+
+    name = 'printer'
+
+    def write(self, data):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def paper_out(self):
+        """True if the printer reports an empty roll (False when it can't tell)"""
+        return False
+
+    def send(self, data):
+        """Print one complete job; usable as a PrintSpooler send function"""
+        if self.paper_out():
+            raise PaperOutError(f"{self.name} reports paper out")
+        self.write(data)
+        self.flush()
+
+class Win32RawBackend(PrinterBackend):
+    """Windows printer queue in RAW mode; each flush() is one spooler document"""
+
+    def __init__(self, printer_name=None, document_name="Tiket Parkir"):
+        import win32print
+        self.win32print = win32print
+        self.name = printer_name or win32print.GetDefaultPrinter()
+        self.document_name = document_name
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+
+    def flush(self):
+        if not self.buffer:
+            return
+        data, self.buffer = bytes(self.buffer), bytearray()
+        handle = self.win32print.OpenPrinter(self.name)
+        try:
+            self.win32print.StartDocPrinter(handle, 1, (self.document_name, None, "RAW"))
+            try:
+                self.win32print.StartPagePrinter(handle)
+                self.win32print.WritePrinter(handle, data)
+                self.win32print.EndPagePrinter(handle)
+            finally:
+                self.win32print.EndDocPrinter(handle)
+        finally:
+            self.win32print.ClosePrinter(handle)
+
+    def paper_out(self):
+        handle = self.win32print.OpenPrinter(self.name)
+        try:
+            status = self.win32print.GetPrinter(handle, 2)['Status']
+        finally:
+            self.win32print.ClosePrinter(handle)
+        return bool(status & self.win32print.PRINTER_STATUS_PAPER_OUT)
+
+class EscposUsbBackend(PrinterBackend):
+    """USB printer through python-escpos"""
+
+    def __init__(self, vendor_id, product_id):
+        from escpos.printer import Usb
+        self.printer = Usb(vendor_id, product_id)
+        self.name = f"usb:{vendor_id:04x}:{product_id:04x}"
+
+    def write(self, data):
+        self.printer._raw(bytes(data))
+
+    def close(self):
+        self.printer.close()
+
+    def paper_out(self):
+        try:
+            # 0 = no paper, 1 = near end, 2 = ok
+            return self.printer.paper_status() == 0
+        except Exception:
+            # Not every printer/transport answers status requests
+            return False
+
+class UsbBackend(PrinterBackend):
+    """Raw USB through pyusb (bulk OUT endpoint), without python-escpos"""
+
+    def __init__(self, vendor_id, product_id, timeout_ms=5000):
+        import usb.core
+        import usb.util
+        self.usb = usb
+        self.device = usb.core.find(idVendor=vendor_id, idProduct=product_id)
+        if self.device is None:
+            raise IOError(f"USB printer {vendor_id:04x}:{product_id:04x} not found")
+        try:
+            if self.device.is_kernel_driver_active(0):
+                self.device.detach_kernel_driver(0)
+        except (NotImplementedError, usb.core.USBError):
+            pass  # Not supported on Windows
+        self.device.set_configuration()
+        interface = self.device.get_active_configuration()[(0, 0)]
+        self.endpoint = usb.util.find_descriptor(
+            interface,
+            custom_match=lambda e: usb.util.endpoint_direction(e.bEndpointAddress) == usb.util.ENDPOINT_OUT
+        )
+        if self.endpoint is None:
+            raise IOError("USB printer has no OUT endpoint")
+        self.timeout_ms = timeout_ms
+        self.name = f"usb:{vendor_id:04x}:{product_id:04x}"
+
+    def write(self, data):
+        self.endpoint.write(data, self.timeout_ms)
+
+    def close(self):
+        self.usb.util.dispose_resources(self.device)
+
+class SerialBackend(PrinterBackend):
+    """Printer on a serial port (or a USB virtual COM port)
+
+    flow_control is 'none', 'rtscts' (hardware) or 'xonxoff' (software).
+    Hardware flow control needs RTS/CTS wired through; many cheap thermal
+    printer cables leave them out, so it is off by default.
+    """
+
+    def __init__(self, port, baudrate=38400, write_timeout=10, flow_control='none'):
+        import serial
+        flow_control = (flow_control or 'none').strip().lower()
+        if flow_control not in ('none', 'rtscts', 'xonxoff'):
+            raise ValueError(f"Unknown serial flow control: {flow_control}")
+        self.port = serial.Serial(port, baudrate, write_timeout=write_timeout,
+                                  rtscts=flow_control == 'rtscts', xonxoff=flow_control == 'xonxoff')
+        self.name = port
+
+    def write(self, data):
+        self.port.write(data)
+
+    def flush(self):
+        self.port.flush()
+
+    def close(self):
+        self.port.close()
+
+class TcpBackend(PrinterBackend):
+    """Network printer on a raw TCP port (JetDirect, usually 9100)
+
+    The connection is opened on first use and reopened after an error.
+    """
+
+    def __init__(self, host, port=9100, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.name = f"{host}:{port}"
+
+    def write(self, data):
+        if self.sock is None:
+            self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        try:
+            self.sock.sendall(data)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            finally:
+                self.sock = None
+
+class FileBackend(PrinterBackend):
+    """Capture printer output to a file instead of printing
+
+    Stands in for a real printer on machines without one, e.g. to run or
+    benchmark the entry path on Linux. Set paper to False to simulate an
+    empty roll.
+    """
+
+    def __init__(self, path='printer_output.bin'):
+        self.path = path
+        self.file = open(path, 'ab')
+        self.name = f"file:{path}"
+        self.paper = True
+        self.jobs = 0
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        with self.lock:
+            self.file.write(data)
+
+    def flush(self):
+        with self.lock:
+            self.file.flush()
+            self.jobs += 1
+
+    def close(self):
+        self.file.close()
+
+    def paper_out(self):
+        return not self.paper
+
+def open_backend(config, section='printer'):
+    """Printer backend selected by `type` in a config section
+
+    Types:
+        win32: Windows printer queue (printer_name, empty for the default printer)
+        escpos: python-escpos USB (vendor_id, product_id)
+        usb: Raw pyusb (vendor_id, product_id)
+        serial: Serial port (serial_port, baudrate, flow_control)
+        tcp: Raw TCP (host, tcp_port)
+        file: Capture to a file (output_file)
+
+    Raises:
+        ValueError: For an unknown type
+        ImportError: If the backend's library is not installed
+    """
+    kind = config.get(section, 'type', fallback='win32').strip().lower()
+    if kind == 'win32':
+        backend = Win32RawBackend(config.get(section, 'printer_name', fallback='') or None)
+    elif kind == 'escpos':
+        backend = EscposUsbBackend(int(config.get(section, 'vendor_id'), 0), int(config.get(section, 'product_id'), 0))
+    elif kind == 'usb':
+        backend = UsbBackend(int(config.get(section, 'vendor_id'), 0), int(config.get(section, 'product_id'), 0))
+    elif kind == 'serial':
+        backend = SerialBackend(config.get(section, 'serial_port'), config.getint(section, 'baudrate', fallback=38400),
+                                flow_control=config.get(section, 'flow_control', fallback='none'))
+    elif kind == 'tcp':
+        backend = TcpBackend(config.get(section, 'host'), config.getint(section, 'tcp_port', fallback=9100),
+                             config.getfloat(section, 'timeout', fallback=5.0))
+    elif kind == 'file':
+        backend = FileBackend(config.get(section, 'output_file', fallback='printer_output.bin'))
+    else:
+        raise ValueError(f"Unknown printer type: {kind}")
+    logger.info(f"Printer backend: {kind} ({backend.name})")
+    return backend
+
+def load_backend(config_file='config.ini', section='printer'):
+    """open_backend() for a config file, for scripts that don't otherwise read config.ini"""
+    import configparser
+    config = configparser.ConfigParser()
+    if not config.read(config_file) or not config.has_section(section):
+        logger.warning(f"No [{section}] in {os.path.abspath(config_file)}, using the Windows default printer")
+        config.read_dict({section: {'type': 'win32'}})
+    return open_backend(config, section)
@@ -0,0 +1,21 @@
+import os
+
+class PaperOutError(Exception):
+    """Raised by a send function when the printer reports it is out of paper"""
+
+def atomic_write(path, data):
+    """Write bytes to path via a temp file and rename
+
+    Readers never see a half-written file: either the old file or the
+    complete new one is present.
+
+    Args:
+        path: Destination file
+        data: Bytes to write
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
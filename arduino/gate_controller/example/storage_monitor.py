@@ -0,0 +1,175 @@
+import shutil
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+GB = 2 ** 30
+
+class StorageMonitor:
+    """Sample free disk space in the background and publish cheap flags
+
+    The capture path only reads `low` and `critical`; the actual statvfs
+    happens on a timer, or early once `sample_bytes` have been written
+    since the last sample. Recent samples give a free-space trend so a full
+    disk can be predicted before it happens.
+    """
+
+    def __init__(self, path, min_free_gb=1.0, hard_min_free_gb=0.2, interval=30.0,
+                 sample_bytes=256 * 1024 * 1024, history=720, on_low=None, usage_func=None):
+        """
+        Args:
+            path: Any path on the disk to watch
+            min_free_gb: Below this, `low` is set and on_low is called
+            hard_min_free_gb: Below this, `critical` is set
+            interval: Seconds between timed samples
+            sample_bytes: Sample early after this many bytes are written
+            history: Samples kept for the trend
+            on_low: Callable(free_bytes) run when space goes low
+            usage_func: Replacement for shutil.disk_usage, for tests
+        """
+        self.path = path
+        self.min_free = min_free_gb * GB
+        self.hard_min_free = hard_min_free_gb * GB
+        self.interval = interval
+        self.sample_bytes = sample_bytes
+        self.on_low = on_low
+        self.usage_func = usage_func or shutil.disk_usage
+
+        self.samples = deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+
+        # Published state, read without locking by the capture path
+        self.free_bytes = None
+        self.total_bytes = None
+        self.low = False
+        self.critical = False
+        self.bytes_since_sample = 0
+        self.sample()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="StorageMonitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def _run(self):
+        while self.running:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            if self.running:
+                self.sample()
+
+    def record_written(self, nbytes):
+        """Account for bytes written; triggers an early sample past the threshold"""
+        with self.lock:
+            self.bytes_since_sample += nbytes
+            due = self.bytes_since_sample >= self.sample_bytes
+        if due:
+            self.wake.set()
+
+    def sample(self):
+        """Measure free space now and update the flags
+
+        Returns:
+            Free bytes, or None if the disk could not be read
+        """
+        try:
+            total, used, free = self.usage_func(self.path)
+        except OSError as e:
+            logger.error(f"Could not read disk usage for {self.path}: {e}")
+            with self.lock:
+                self.free_bytes = None
+            return None
+
+        with self.lock:
+            was_low = self.low
+            self.samples.append((time.time(), free))
+            self.free_bytes = free
+            self.total_bytes = total
+            self.bytes_since_sample = 0
+            self.low = free < self.min_free
+            self.critical = free < self.hard_min_free
+
+        if self.low and not was_low:
+            logger.warning(f"Free space low: {free / GB:.2f} GB")
+        if self.low and self.on_low:
+            try:
+                self.on_low(free)
+            except Exception as e:
+                logger.error(f"Low-space callback failed: {e}")
+        return free
+
+    def record_freed(self, nbytes):
+        """Account for bytes deleted; updates the flags without a statvfs"""
+        with self.lock:
+            if self.free_bytes is None:
+                return
+            self.free_bytes += nbytes
+            self.low = self.free_bytes < self.min_free
+            self.critical = self.free_bytes < self.hard_min_free
+
+    def has_free_space(self):
+        """True unless the last sample was below min_free_gb
+
+        Reads the cached flag only. An unreadable disk counts as enough
+        space, so a failed sample never makes anyone delete files.
+        """
+        return self.free_bytes is None or not self.low
+
+    def trend(self):
+        """Free-space change in bytes per second, from a least-squares fit
+
+        Returns:
+            Slope (negative while the disk fills), or None with < 2 samples
+        """
+        with self.lock:
+            samples = list(self.samples)
+        if len(samples) < 2:
+            return None
+        t0 = samples[0][0]
+        times = [t - t0 for t, _ in samples]
+        frees = [free for _, free in samples]
+        mean_t = sum(times) / len(times)
+        mean_free = sum(frees) / len(frees)
+        variance = sum((t - mean_t) ** 2 for t in times)
+        if variance == 0:
+            return None
+        return sum((t - mean_t) * (free - mean_free) for t, free in zip(times, frees)) / variance
+
+    def seconds_until_low(self):
+        """Predicted seconds until free space drops below min_free_gb
+
+        Returns:
+            0 if already low, None if space is not shrinking
+        """
+        if self.low:
+            return 0
+        slope = self.trend()
+        if slope is None or slope >= 0 or self.free_bytes is None:
+            return None
+        return (self.free_bytes - self.min_free) / -slope
+
+    def stats(self):
+        slope = self.trend()
+        return {
+            'free_gb': self.free_bytes / GB if self.free_bytes is not None else None,
+            'low': self.low,
+            'critical': self.critical,
+            'trend_gb_per_day': slope * 86400 / GB if slope is not None else None,
+            'seconds_until_low': self.seconds_until_low(),
+            'samples': len(self.samples)
+        }
@@ -0,0 +1,128 @@
+import cv2
+import os
+import json
+import time
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+# Low-resolution Dahua substream, used for detection and preview in dual-stream mode
+DAHUA_SUBSTREAM_PATH = "/cam/realmonitor?channel=1&subtype=1"
+
+# Dahua RTSP path variants, in order of preference
+DAHUA_STREAM_PATHS = [
+    "/cam/realmonitor?channel=1&subtype=0",
+    DAHUA_SUBSTREAM_PATH,
+    "/cam/realmonitor?channel=1",
+    "/h264/ch1/main/av_stream"
+]
+
+def open_stream(url, timeout=5.0, capture_factory=None):
+    """Open an RTSP stream and confirm it delivers a frame
+
+    Args:
+        url: Stream URL
+        timeout: Open/read timeout passed to the FFmpeg backend, in seconds
+        capture_factory: Callable(url, timeout) returning a capture object,
+            for tests; defaults to cv2.VideoCapture with timeouts set
+
+    Returns:
+        An opened capture, or None
+    """
+    capture = None
+    try:
+        if capture_factory:
+            capture = capture_factory(url, timeout)
+        else:
+            timeout_ms = int(timeout * 1000)
+            capture = cv2.VideoCapture(url, cv2.CAP_FFMPEG, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms
+            ])
+        if capture.isOpened():
+            ret, frame = capture.read()
+            if ret and frame is not None:
+                return capture
+        capture.release()
+    except Exception as e:
+        logger.warning(f"Probe failed for {url}: {e}")
+        if capture is not None:
+            capture.release()
+    return None
+
+def probe_streams(urls, timeout=5.0, capture_factory=None):
+    """Open candidate URLs concurrently and pick the most preferred one that works
+
+    Probes run in parallel, each with its own deadline. The result is
+    returned as soon as the best-ranked URL still in the running has
+    succeeded, so a working main stream doesn't wait for slower variants.
+    Captures that lose, or finish after the deadline, are released.
+
+    Args:
+        urls: Candidate URLs, most preferred first
+        timeout: Per-probe deadline in seconds
+        capture_factory: See open_stream
+
+    Returns:
+        Tuple (index, capture), or (None, None) if nothing worked
+    """
+    if not urls:
+        return None, None
+
+    executor = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="StreamProbe")
+    futures = {executor.submit(open_stream, url, timeout, capture_factory): index
+               for index, url in enumerate(urls)}
+    successes = {}
+    pending = set(futures)
+    deadline = time.time() + timeout + 1.0
+
+    try:
+        while pending:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                capture = future.result()
+                if capture is not None:
+                    successes[futures[future]] = capture
+            if successes:
+                best = min(successes)
+                if all(futures[future] > best for future in pending):
+                    break
+    finally:
+        chosen = min(successes) if successes else None
+        for index, capture in successes.items():
+            if index != chosen:
+                capture.release()
+        # Probes still blocked in open release their capture when they finish
+        for future in pending:
+            future.add_done_callback(_release_result)
+        executor.shutdown(wait=False)
+
+    if chosen is None:
+        return None, None
+    return chosen, successes[chosen]
+
+def _release_result(future):
+    capture = future.result()
+    if capture is not None:
+        capture.release()
+
+def load_cached_stream(cache_file):
+    """Stream path that worked last time, or None"""
+    try:
+        with open(cache_file, 'r') as f:
+            return json.load(f).get('path')
+    except (OSError, ValueError):
+        return None
+
+def save_cached_stream(cache_file, path):
+    """Remember the working stream path (without credentials)"""
+    try:
+        with open(cache_file, 'w') as f:
+            json.dump({'path': path, 'updated': datetime.now().isoformat()}, f, indent=4)
+    except OSError as e:
+        logger.warning(f"Could not write stream cache {cache_file}: {e}")
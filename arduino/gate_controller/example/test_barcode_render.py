@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+from barcode_render import (CODE128_WIDTHS, code128_segments, code128_values, code39_table,
+                            encode_modules, escpos_barcode, render_barcode)
+
+def module_widths(modules):
+    # Run lengths of alternating bars and spaces
+    edges = np.flatnonzero(np.diff(modules.astype(np.int8))) + 1
+    return np.diff(np.concatenate([[0], edges, [len(modules)]]))
+
+def decode_code128(modules):
+    widths = module_widths(modules)
+    lookup = {pattern: value for value, pattern in enumerate(CODE128_WIDTHS)}
+    values = [lookup[''.join(str(w) for w in widths[i:i + 6])] for i in range(0, len(widths) - 7, 6)]
+    *symbols, checksum = values
+    expected = (symbols[0] + sum(i * v for i, v in enumerate(symbols[1:], 1))) % 103
+    return symbols, checksum == expected
+
+class TestCode128(unittest.TestCase):
+    def test_symbols_are_eleven_modules(self):
+        for pattern in CODE128_WIDTHS:
+            self.assertEqual(sum(int(w) for w in pattern), 11)
+        self.assertEqual(len(set(CODE128_WIDTHS)), len(CODE128_WIDTHS))
+
+    def test_round_trip(self):
+        for data in ["B 1234 XY", "PKR20240319123456", "12", "A1234567"]:
+            symbols, checksum_ok = decode_code128(encode_modules(data))
+            self.assertTrue(checksum_ok, data)
+            self.assertEqual(symbols, code128_values(data)[:-1])
+
+    def test_digit_runs_use_code_set_c(self):
+        self.assertEqual(code128_segments("PKR20240319123456"), [('B', "PKR"), ('C', "20240319123456")])
+        self.assertEqual(code128_segments("12345"), [('C', "1234"), ('B', "5")])
+        self.assertEqual(code128_segments("B 1234 XY"), [('B', "B 1234 XY")])
+
+    def test_rejects_unencodable_data(self):
+        with self.assertRaises(ValueError):
+            encode_modules("")
+        with self.assertRaises(ValueError):
+            encode_modules("café")
+
+class TestCode39(unittest.TestCase):
+    def test_characters_are_three_of_nine_wide(self):
+        for char, modules in code39_table().items():
+            widths = module_widths(modules[:-1])
+            self.assertEqual(len(widths), 9, char)
+            self.assertEqual(sum(widths == 3), 3, char)
+
+    def test_start_stop_and_case(self):
+        modules = encode_modules("tkt-01", 'code39')
+        self.assertTrue(np.array_equal(modules, encode_modules("TKT-01", 'code39')))
+        star = code39_table()['*']
+        self.assertTrue(np.array_equal(modules[:len(star)], star))
+        with self.assertRaises(ValueError):
+            encode_modules("A*B", 'code39')
+
+class TestRender(unittest.TestCase):
+    def test_fits_size_with_whole_pixel_modules(self):
+        image = render_barcode("B 1234 XY", size=(360, 100))
+        self.assertEqual(image.mode, '1')
+        self.assertEqual(image.size, (360, 100))
+        row = np.array(image)[0]
+        widths = module_widths(~row)
+        self.assertTrue(all(w % 2 == 0 for w in widths[1:-1]))
+
+    def test_bars_match_modules(self):
+        modules = encode_modules("PKR001")
+        image = render_barcode("PKR001", module_width=1, height=10, quiet_zone=0, text=False)
+        self.assertEqual(image.size, (len(modules), 10))
+        self.assertTrue(np.array_equal(~np.array(image)[5], modules))
+
+class TestEscPos(unittest.TestCase):
+    def test_code128_command(self):
+        command = escpos_barcode("PKR2024", height=80, module_width=2)
+        self.assertEqual(command[:9], b"\x1d\x48\x02\x1d\x68\x50\x1d\x77\x02")
+        self.assertEqual(command[9:12], b"\x1d\x6b\x49")
+        payload = b"{BPKR{C" + bytes([20, 24])
+        self.assertEqual(command[12:], bytes([len(payload)]) + payload)
+
+    def test_code39_command(self):
+        self.assertTrue(escpos_barcode("tk1", 'code39').endswith(b"\x1d\x6b\x45\x03TK1"))
+
+if __name__ == '__main__':
+    unittest.main()
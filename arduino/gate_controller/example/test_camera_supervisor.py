@@ -0,0 +1,89 @@
+import unittest
+import time
+import numpy as np
+from frame_grabber import FrameGrabber
+from camera_supervisor import CameraSupervisor
+
+class FlakyCamera:
+    """Delivers frames until `frames` have been read, then stalls"""
+
+    def __init__(self, frames=None):
+        self.frames = frames
+        self.count = 0
+        self.released = False
+
+    def get(self, prop):
+        return 50
+
+    def read(self):
+        time.sleep(0.02)
+        if self.released or (self.frames is not None and self.count >= self.frames):
+            return False, None
+        self.count += 1
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        self.released = True
+
+class TestCameraSupervisor(unittest.TestCase):
+    def test_reconnects_after_stall(self):
+        first = FlakyCamera(frames=5)
+        replacements = []
+        attempts = []
+
+        def connect():
+            # First attempt fails, second succeeds
+            attempts.append(time.time())
+            if len(attempts) < 2:
+                return None
+            camera = FlakyCamera()
+            replacements.append(camera)
+            return camera
+
+        grabber = FrameGrabber(first)
+        supervisor = CameraSupervisor(grabber, connect, stall_timeout=0.2, base_delay=0.05,
+                                      max_delay=0.1, check_interval=0.02)
+        grabber.start()
+        supervisor.start()
+        try:
+            deadline = time.time() + 3
+            while not replacements and time.time() < deadline:
+                time.sleep(0.02)
+            self.assertTrue(replacements)
+            frame, _ = grabber.wait_for_frame(timeout=1.0)
+            self.assertIsNotNone(frame)
+            self.assertTrue(first.released)
+            stats = supervisor.stats()
+            self.assertTrue(stats['connected'])
+            self.assertEqual(stats['outages'], 1)
+            self.assertEqual(stats['reconnects'], 1)
+            self.assertGreater(replacements[0].count, 0)
+        finally:
+            supervisor.stop()
+            grabber.stop()
+
+    def test_last_good_frame_survives_outage(self):
+        grabber = FrameGrabber(FlakyCamera(frames=3))
+        supervisor = CameraSupervisor(grabber, lambda: None, stall_timeout=0.1, base_delay=0.05,
+                                      max_delay=0.1, check_interval=0.02)
+        grabber.start()
+        supervisor.start()
+        try:
+            time.sleep(0.4)
+            self.assertFalse(supervisor.stats()['connected'])
+            self.assertIsNone(grabber.latest(max_age=0.1)[0])
+            self.assertIsNotNone(grabber.latest()[0])
+        finally:
+            supervisor.stop()
+            grabber.stop()
+
+    def test_backoff_is_capped_and_jittered(self):
+        supervisor = CameraSupervisor(None, None, base_delay=1.0, max_delay=8.0)
+        for attempt in range(1, 10):
+            delay = supervisor.backoff_delay(attempt)
+            ceiling = min(8.0, 2 ** (attempt - 1))
+            self.assertGreaterEqual(delay, ceiling / 2)
+            self.assertLessEqual(delay, ceiling)
+
+if __name__ == '__main__':
+    unittest.main()
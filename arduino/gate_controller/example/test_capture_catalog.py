@@ -0,0 +1,73 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from capture_catalog import CaptureCatalog, import_sidecars
+
+class TestCaptureCatalog(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.dir, 'capture_catalog.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_batched_writes_and_lookups(self):
+        catalog = CaptureCatalog(self.db_path, batch_size=8, flush_interval=0.1)
+        for index in range(20):
+            catalog.add({
+                'filename': f"TKT20250330{index:06d}_{index:04d}.jpg",
+                'timestamp': f"2025-03-30 21:{index:02d}:00",
+                'resolution': {'width': 1920, 'height': 1080, 'channels': 3}
+            })
+        catalog.flush()
+
+        self.assertEqual(catalog.count(), 20)
+        self.assertLess(catalog.stats()['batches'], 20)
+        record = catalog.find_ticket('TKT20250330000005_0005')
+        self.assertEqual(record['resolution']['width'], 1920)
+        self.assertIsNone(catalog.find_ticket('TKT-missing'))
+        self.assertEqual(len(catalog.between('2025-03-30 21:05:00', '2025-03-30 21:10:00')), 5)
+        catalog.close()
+
+    def test_close_commits_pending_records(self):
+        catalog = CaptureCatalog(self.db_path, flush_interval=5)
+        catalog.add({'filename': 'TKT1_0001.jpg', 'timestamp': '2025-03-30T21:11:56.322481'})
+        catalog.close()
+
+        reopened = CaptureCatalog(self.db_path)
+        self.assertEqual(reopened.get('TKT1_0001.jpg')['filename'], 'TKT1_0001.jpg')
+        reopened.close()
+
+    def test_bad_record_does_not_stop_writer(self):
+        catalog = CaptureCatalog(self.db_path, flush_interval=0.05)
+        catalog.add({'timestamp': '2025-03-30T21:11:56'})
+        catalog.add({'filename': 'TKT1_0001.jpg'})
+        catalog.flush()
+        catalog.add({'filename': 'TKT2_0002.jpg'})
+        catalog.flush()
+        self.assertEqual(catalog.count(), 2)
+        catalog.close()
+
+    def test_import_sidecars(self):
+        for index in range(3):
+            with open(os.path.join(self.dir, f"TKT{index}_000{index}.jpg.json"), 'w') as f:
+                json.dump({'filename': f"TKT{index}_000{index}.jpg",
+                           'timestamp': '2025-03-30T21:11:56'}, f)
+        with open(os.path.join(self.dir, 'TKT9_0009.jpg.json'), 'w') as f:
+            f.write('{broken')
+
+        self.assertEqual(import_sidecars(self.dir, self.db_path, delete=True), (3, 1))
+        # Re-running is harmless
+        self.assertEqual(import_sidecars(self.dir, self.db_path), (0, 1))
+        self.assertTrue(os.path.exists(os.path.join(self.dir, 'TKT9_0009.jpg.json')))
+        self.assertFalse(os.path.exists(os.path.join(self.dir, 'TKT0_0000.jpg.json')))
+
+        catalog = CaptureCatalog(self.db_path)
+        self.assertEqual(catalog.count(), 3)
+        self.assertEqual(catalog.find_ticket('TKT1_0001')['timestamp'], '2025-03-30T21:11:56')
+        catalog.close()
+
+if __name__ == '__main__':
+    unittest.main()
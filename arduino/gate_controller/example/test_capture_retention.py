@@ -0,0 +1,128 @@
+import unittest
+import os
+import shutil
+import zipfile
+import tempfile
+from datetime import date, timedelta
+import numpy as np
+import cv2
+from capture_catalog import CaptureCatalog
+from capture_retention import RetentionEngine, RetentionPolicy
+
+TODAY = date(2025, 6, 30)
+
+class TestRetentionEngine(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.capture_dir = os.path.join(self.dir, 'capture_images')
+        os.makedirs(self.capture_dir)
+        self.image = np.random.randint(0, 255, (360, 640, 3), dtype=np.uint8)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def make_engine(self, **kwargs):
+        policy = RetentionPolicy(full_res_days=7, archive_after_days=30, delete_after_days=90,
+                                 downscale_width=320, downscale_quality=60)
+        return RetentionEngine(self.capture_dir, os.path.join(self.dir, 'archive'), policy,
+                               os.path.join(self.dir, 'state.json'), max_bytes_per_second=None, **kwargs)
+
+    def capture(self, days_ago, index):
+        day = TODAY - timedelta(days=days_ago)
+        path = os.path.join(self.capture_dir, f"TKT{day.strftime('%Y%m%d')}120000_{index:04d}.jpg")
+        cv2.imwrite(path, self.image)
+        return path
+
+    def test_tiers(self):
+        fresh = self.capture(1, 1)
+        old = self.capture(10, 2)
+        older = [self.capture(40, 3), self.capture(40, 4)]
+        segment = os.path.join(self.dir, 'archive', 'captures-20250101.zip')
+        engine = self.make_engine()
+        with zipfile.ZipFile(segment, 'w'):
+            pass
+
+        summary = engine.run_once(TODAY)
+
+        self.assertEqual(cv2.imread(fresh).shape[1], 640)
+        self.assertEqual(cv2.imread(old).shape[1], 320)
+        self.assertFalse(any(os.path.exists(path) for path in older))
+        archived = engine.segment_path(TODAY - timedelta(days=40))
+        with zipfile.ZipFile(archived) as archive:
+            self.assertEqual(len(archive.namelist()), 2)
+        self.assertFalse(os.path.exists(segment))
+        self.assertEqual((summary['reduced'], summary['archived'], summary['deleted']), (1, 2, 1))
+
+        # Second pass has nothing left to do
+        summary = engine.run_once(TODAY)
+        self.assertEqual(summary['reduced'] + summary['archived'] + summary['deleted'], 0)
+
+    def test_corrupt_segment_is_quarantined(self):
+        older = [self.capture(40, 3), self.capture(40, 4)]
+        engine = self.make_engine()
+        segment = engine.segment_path(TODAY - timedelta(days=40))
+        with open(segment, 'wb') as f:
+            f.write(b'PK\x03\x04 truncated')
+
+        summary = engine.run_once(TODAY)
+
+        self.assertEqual(summary['archived'], 2)
+        self.assertFalse(any(os.path.exists(path) for path in older))
+        with zipfile.ZipFile(segment) as archive:
+            self.assertEqual(len(archive.namelist()), 2)
+        names = set(os.listdir(os.path.join(self.dir, 'archive')))
+        names.remove(os.path.basename(segment))
+        self.assertRegex(names.pop(), r'^captures-\d{8}-bad\d+\.zip$')
+        self.assertFalse(names)
+
+    def test_pass_is_bounded(self):
+        for index in range(5):
+            self.capture(10, index)
+        engine = self.make_engine(max_files_per_run=2)
+        self.assertEqual(engine.run_once(TODAY)['reduced'], 2)
+        self.assertIsNone(engine.state['reduced_through'])
+        self.assertEqual(engine.run_once(TODAY)['reduced'], 2)
+        self.assertEqual(engine.run_once(TODAY)['reduced'], 1)
+        self.assertEqual(engine.state['reduced_through'], (TODAY - timedelta(days=10)).isoformat())
+
+    def test_low_space_deletes_oldest_first(self):
+        oldest = self.capture(3, 1)
+        newer = self.capture(2, 2)
+        checks = iter([False, True])
+        engine = self.make_engine(free_space_check=lambda: next(checks))
+        engine.run_once(TODAY)
+        self.assertFalse(os.path.exists(oldest))
+        self.assertTrue(os.path.exists(newer))
+
+    def test_low_space_stops_once_enough_is_freed(self):
+        oldest = self.capture(3, 1)
+        newer = self.capture(2, 2)
+        freed = []
+        engine = self.make_engine(free_space_check=lambda: sum(freed) > 0, on_freed=freed.append)
+        engine.run_once(TODAY)
+        self.assertFalse(os.path.exists(oldest))
+        self.assertTrue(os.path.exists(newer))
+
+    def test_low_space_marks_catalog(self):
+        oldest = self.capture(3, 1)
+        catalog = CaptureCatalog(os.path.join(self.dir, 'catalog.db'), flush_interval=0.05)
+        catalog.add({'filename': os.path.basename(oldest)})
+        catalog.flush()
+        checks = iter([False, True])
+        engine = self.make_engine(catalog=catalog, free_space_check=lambda: next(checks))
+        engine.run_once(TODAY)
+        catalog.flush()
+        self.assertIn('deleted', catalog.get(os.path.basename(oldest)))
+        catalog.close()
+
+    def test_request_pass_ignored_during_pass(self):
+        engine = self.make_engine()
+        engine.in_pass = True
+        engine.request_pass()
+        self.assertFalse(engine.wake.is_set())
+        engine.in_pass = False
+        engine.request_pass()
+        self.assertTrue(engine.wake.is_set())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import cv2
+from capture_writer import CaptureWriter
+from spool_common import atomic_write
+
+class TestCaptureWriter(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.dir = self.tempdir.name
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_close_flushes_pending_writes(self):
+        writer = CaptureWriter(workers=2, queue_size=4)
+        frame = np.random.randint(0, 255, (120, 160, 3), dtype=np.uint8)
+        for index in range(10):
+            writer.submit_image(os.path.join(self.dir, f"{index}.jpg"), frame, 90)
+        writer.close()
+
+        stats = writer.stats()
+        self.assertEqual(stats['written'], 10)
+        self.assertEqual(stats['failed'], 0)
+        self.assertEqual(stats['queue_depth'], 0)
+        for index in range(10):
+            image = cv2.imread(os.path.join(self.dir, f"{index}.jpg"))
+            self.assertEqual(image.shape, frame.shape)
+        self.assertFalse([name for name in os.listdir(self.dir) if name.endswith('.tmp')])
+
+    def test_failed_write_is_counted(self):
+        writer = CaptureWriter(workers=1)
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        writer.submit_image(os.path.join(self.dir, 'missing', 'x.jpg'), frame)
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(writer.stats()['failed'], 1)
+        writer.close()
+
+    def test_refine_replaces_frame_before_done(self):
+        writer = CaptureWriter(workers=1)
+        path = os.path.join(self.dir, 'ticket.jpg')
+        first = np.zeros((16, 16, 3), dtype=np.uint8)
+        better = np.full((24, 32, 3), 255, dtype=np.uint8)
+        done = []
+        writer.submit_image(path, first, 90, refine=lambda: better,
+                            on_done=lambda path, ok: done.append((path, ok, os.path.exists(path))))
+        writer.close()
+
+        self.assertEqual(done, [(path, True, True)])
+        self.assertEqual(cv2.imread(path).shape, better.shape)
+
+    def test_failed_refine_keeps_first_frame(self):
+        writer = CaptureWriter(workers=1)
+        path = os.path.join(self.dir, 'ticket.jpg')
+        first = np.zeros((16, 16, 3), dtype=np.uint8)
+        done = []
+
+        def refine():
+            raise RuntimeError("stream gone")
+
+        writer.submit_image(path, first, 90, refine=refine, on_done=lambda path, ok: done.append(ok))
+        writer.close()
+
+        self.assertEqual(done, [True])
+        self.assertEqual(cv2.imread(path).shape, first.shape)
+
+    def test_atomic_write_replaces_file(self):
+        path = os.path.join(self.dir, 'counter.txt')
+        atomic_write(path, b'1')
+        atomic_write(path, b'2')
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'2')
+        self.assertEqual(os.listdir(self.dir), ['counter.txt'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import struct
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image, ImageDraw
+from escpos_raster import GS_CUT, GS_RASTER, RasterPrinter, pack_image, raster_commands
+from printer_backend import FileBackend
+
+def parse_raster(data):
+    # Reassemble the dot matrix from every GS v 0 command in a print job
+    rows = []
+    start = data.find(GS_RASTER)
+    while start != -1:
+        width_bytes, height = struct.unpack('<HH', data[start + 4:start + 8])
+        body = np.frombuffer(data[start + 8:start + 8 + width_bytes * height], dtype=np.uint8)
+        rows.append(np.unpackbits(body.reshape(height, width_bytes), axis=1).astype(bool))
+        start = data.find(GS_RASTER, start + 8 + width_bytes * height)
+    return np.vstack(rows)
+
+def sample_ticket():
+    image = Image.new('RGB', (400, 300), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((10, 10, 60, 40), fill='black')
+    draw.rectangle((100, 100, 390, 290), fill=(200, 200, 200))
+    draw.text((120, 20), "B 1234 XY", fill='black')
+    return image
+
+class RecordingBackend:
+    def __init__(self):
+        self.writes = []
+        self.closed = False
+
+    def write(self, data):
+        self.writes.append(bytes(data))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+class TestPacking(unittest.TestCase):
+    def test_threshold_and_centering(self):
+        image = sample_ticket()
+        packed = pack_image(image, paper_width=576)
+        self.assertEqual(packed.shape, (300, 72))
+        dots = np.unpackbits(packed, axis=1).astype(bool)
+        expected = np.asarray(image.convert('L')) < 128
+        self.assertTrue(np.array_equal(dots[:, 88:488], expected))
+        self.assertFalse(dots[:, :88].any() or dots[:, 488:].any())
+        # Light gray stays white
+        self.assertFalse(dots[150, 88 + 200])
+
+    def test_one_bit_images_and_odd_widths(self):
+        image = Image.new('1', (13, 2), 1)
+        image.putpixel((12, 1), 0)
+        packed = pack_image(image)
+        self.assertEqual(packed.shape, (2, 2))
+        # 13 dots centered in 16: the last pixel lands on dot 13
+        self.assertEqual(packed[1].tolist(), [0, 0x04])
+
+    def test_wide_images_are_scaled_to_paper(self):
+        packed = pack_image(Image.new('L', (800, 100), 0), paper_width=384)
+        self.assertEqual(packed.shape, (48, 48))
+
+    def test_bands(self):
+        packed = pack_image(sample_ticket(), paper_width=576)
+        commands = list(raster_commands(packed, band_height=128))
+        self.assertEqual(len(commands), 3)
+        self.assertEqual(struct.unpack('<HH', commands[-1][4:8]), (72, 300 - 256))
+
+class TestRasterPrinter(unittest.TestCase):
+    def test_job_round_trips_through_file_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'printer.bin')
+            printer = RasterPrinter(FileBackend(path), paper_width=576)
+            image = sample_ticket()
+            printer.print_image(image)
+            printer.close()
+            with open(path, 'rb') as f:
+                data = f.read()
+        self.assertTrue(data.startswith(b"\x1b\x40"))
+        self.assertTrue(data.endswith(GS_CUT))
+        self.assertTrue(np.array_equal(parse_raster(data), np.unpackbits(pack_image(image, 576), axis=1).astype(bool)))
+        self.assertEqual(printer.stats()['bytes_sent'], len(data))
+
+    def test_streams_in_chunks(self):
+        backend = RecordingBackend()
+        printer = RasterPrinter(backend, chunk_size=1000)
+        printer.print_image(sample_ticket(), cut=False)
+        self.assertTrue(all(len(chunk) <= 1000 for chunk in backend.writes))
+        self.assertGreater(len(backend.writes), 20)
+        self.assertFalse(b"".join(backend.writes).endswith(GS_CUT))
+        printer.close()
+        self.assertTrue(backend.closed)
+
+if __name__ == '__main__':
+    unittest.main()
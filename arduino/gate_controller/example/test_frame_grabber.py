@@ -0,0 +1,136 @@
+import unittest
+import time
+import numpy as np
+from frame_grabber import FrameGrabber, sharpness
+
+class FakeCamera:
+    """Stands in for cv2.VideoCapture, producing numbered frames"""
+
+    def __init__(self, fps=50, fail_after=None):
+        self.fps = fps
+        self.count = 0
+        self.fail_after = fail_after
+
+    def get(self, prop):
+        return self.fps
+
+    def read(self):
+        time.sleep(1.0 / self.fps)
+        if self.fail_after is not None and self.count >= self.fail_after:
+            return False, None
+        self.count += 1
+        return True, np.full((4, 4, 3), self.count % 256, dtype=np.uint8)
+
+    def grab(self):
+        return self.read()[0]
+
+    def retrieve(self):
+        return True, np.full((4, 4, 3), self.count % 256, dtype=np.uint8)
+
+class TextureCamera(FakeCamera):
+    """Every fifth frame is sharp, the rest are flat"""
+
+    def read(self):
+        ret, frame = super().read()
+        if ret and self.count % 5 == 0:
+            frame = np.indices((64, 64)).sum(axis=0).astype(np.uint8) % 2 * 255
+            frame = np.dstack([frame] * 3)
+        elif ret:
+            frame = np.zeros((64, 64, 3), dtype=np.uint8)
+        return ret, frame
+
+class TestFrameGrabber(unittest.TestCase):
+    def test_latest_returns_newest_frame(self):
+        grabber = FrameGrabber(FakeCamera(), buffer_size=3)
+        grabber.start()
+        try:
+            frame, timestamp = grabber.wait_for_frame(after=0, timeout=1.0)
+            self.assertIsNotNone(frame)
+            time.sleep(0.1)
+            frame, timestamp = grabber.latest()
+            self.assertEqual(int(frame[0, 0, 0]), grabber.frames_read % 256)
+            self.assertLessEqual(len(grabber.frames), 3)
+        finally:
+            grabber.stop()
+
+    def test_stale_frames_are_rejected(self):
+        grabber = FrameGrabber(FakeCamera(fail_after=2))
+        grabber.start()
+        try:
+            time.sleep(0.3)
+            frame, _ = grabber.latest(max_age=0.1)
+            self.assertIsNone(frame)
+            self.assertGreater(grabber.stats()['failed_reads'], 0)
+        finally:
+            grabber.stop()
+
+    def test_wait_for_frame_times_out_when_stopped(self):
+        grabber = FrameGrabber(FakeCamera(fail_after=0))
+        grabber.start()
+        try:
+            frame, timestamp = grabber.wait_for_frame(timeout=0.2)
+            self.assertIsNone(frame)
+            self.assertIsNone(timestamp)
+        finally:
+            grabber.stop()
+
+    def test_history_is_bounded_by_memory(self):
+        frame_bytes = 64 * 64 * 3
+        grabber = FrameGrabber(TextureCamera(), buffer_size=2, history_seconds=10,
+                               max_bytes=frame_bytes * 4)
+        grabber.start()
+        try:
+            time.sleep(0.3)
+            self.assertLessEqual(len(grabber.frames), 4)
+            self.assertLessEqual(grabber.buffer_bytes, frame_bytes * 4)
+        finally:
+            grabber.stop()
+
+    def test_best_frames_picks_sharpest_around_trigger(self):
+        grabber = FrameGrabber(TextureCamera(), history_seconds=1.0)
+        grabber.start()
+        try:
+            time.sleep(0.3)
+            trigger_time = time.time()
+            selection = grabber.best_frames(trigger_time, before=0.3, after=0.2)
+            self.assertGreater(selection['considered'], 5)
+            self.assertLess(selection['before']['timestamp'], trigger_time)
+            self.assertGreaterEqual(selection['after']['timestamp'], trigger_time)
+            self.assertGreater(selection['best']['sharpness'], 0)
+            self.assertEqual(selection['best']['sharpness'],
+                             sharpness(selection['best']['frame']))
+        finally:
+            grabber.stop()
+
+    def test_grab_only_until_decode_requested(self):
+        grabber = FrameGrabber(FakeCamera(), decode=False)
+        grabber.start()
+        try:
+            time.sleep(0.15)
+            self.assertGreater(grabber.frames_read, 0)
+            self.assertEqual(len(grabber.frames), 0)
+            self.assertFalse(grabber.stats()['decoding'])
+
+            grabber.request_decode(0.3)
+            frame, _ = grabber.wait_for_frame(timeout=1.0)
+            self.assertIsNotNone(frame)
+            time.sleep(0.5)
+            self.assertFalse(grabber.is_decoding())
+        finally:
+            grabber.stop()
+
+    def test_idle_fps_keeps_history_while_grabbing(self):
+        grabber = FrameGrabber(FakeCamera(), decode=False, idle_fps=10, history_seconds=1.0)
+        grabber.start()
+        try:
+            time.sleep(0.45)
+            self.assertFalse(grabber.is_decoding())
+            self.assertGreaterEqual(len(grabber.frames), 3)
+            self.assertLess(len(grabber.frames), grabber.frames_read)
+            frame, _ = grabber.latest(max_age=0.5)
+            self.assertIsNotNone(frame)
+        finally:
+            grabber.stop()
+
+if __name__ == '__main__':
+    unittest.main()
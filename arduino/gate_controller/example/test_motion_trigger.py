@@ -0,0 +1,101 @@
+import unittest
+import os
+import sys
+import tempfile
+import numpy as np
+from multiprocessing import shared_memory
+from motion_trigger import MotionDetector
+from plate_reader import PlateReader
+
+def scene(car=False):
+    frame = np.full((240, 320, 3), 90, dtype=np.uint8)
+    if car:
+        frame[100:200, 120:260] = 220
+    return frame
+
+class TestMotionDetector(unittest.TestCase):
+    def feed(self, detector, frame, count, start=0.0):
+        return [detector.update(frame, start + index * 0.1) for index in range(count)]
+
+    def test_enter_and_leave_with_hysteresis(self):
+        detector = MotionDetector(on_frames=3, off_frames=5)
+        self.assertEqual(self.feed(detector, scene(), 5), [None] * 5)
+
+        events = self.feed(detector, scene(car=True), 10, start=1.0)
+        self.assertEqual(events[:3], [None, None, 'enter'])
+        # A parked car is not learned into the background
+        self.assertEqual(events[3:], [None] * 7)
+        self.assertTrue(detector.active)
+
+        events = self.feed(detector, scene(), 5, start=3.0)
+        self.assertEqual(events, [None] * 4 + ['leave'])
+        self.assertFalse(detector.active)
+
+    def test_single_frame_glitch_is_ignored(self):
+        detector = MotionDetector(on_frames=3)
+        self.feed(detector, scene(), 3)
+        self.assertIsNone(detector.update(scene(car=True), 1.0))
+        self.assertIsNone(detector.update(scene(), 1.1))
+        self.assertIsNone(detector.update(scene(car=True), 1.2))
+        self.assertFalse(detector.active)
+
+    def test_zone_excludes_motion_elsewhere(self):
+        detector = MotionDetector(zone=(0.0, 0.0, 0.25, 0.25), on_frames=2)
+        self.feed(detector, scene(), 3)
+        self.assertEqual(self.feed(detector, scene(car=True), 5, start=1.0), [None] * 5)
+
+    def test_long_event_resets_background(self):
+        detector = MotionDetector(on_frames=1, max_active_seconds=5)
+        self.feed(detector, scene(), 2)
+        self.assertEqual(detector.update(scene(car=True), 1.0), 'enter')
+        self.assertEqual(detector.update(scene(car=True), 7.0), 'leave')
+        # The car is now background
+        self.assertIsNone(detector.update(scene(car=True), 7.1))
+
+SERVER = r'''
+import sys, json
+print(json.dumps({'event': 'ready'}), flush=True)
+for line in sys.stdin:
+    request = json.loads(line)
+    handoff = 'shm' if 'shm' in request else 'image'
+    print(json.dumps({'id': request['id'], 'plate': 'B1234XYZ', 'handoff': handoff,
+                      'shm': request.get('shm', {}).get('name')}), flush=True)
+'''
+
+class TestPlateReader(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.script = os.path.join(self.tempdir.name, 'server.py')
+        with open(self.script, 'w') as f:
+            f.write(SERVER)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_round_trip(self):
+        reader = PlateReader(self.script, python=sys.executable)
+        try:
+            futures = [reader.recognize(scene(car=True)) for _ in range(3)]
+            responses = [future.result(timeout=10) for future in futures]
+            self.assertTrue(reader.ready.is_set())
+            self.assertEqual({response['plate'] for response in responses}, {'B1234XYZ'})
+            self.assertEqual(len({response['id'] for response in responses}), 3)
+            self.assertEqual({response['handoff'] for response in responses}, {'shm'})
+        finally:
+            reader.close()
+        # Segments are released once answered
+        self.assertEqual(reader.segments, {})
+        for response in responses:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=response['shm'])
+
+    def test_jpeg_handoff(self):
+        reader = PlateReader(self.script, python=sys.executable, use_shared_memory=False)
+        try:
+            response = reader.recognize(scene(car=True)).result(timeout=10)
+            self.assertEqual(response['handoff'], 'image')
+        finally:
+            reader.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from print_spooler import PaperOutError, PrintSpooler
+
+class FakePrinter:
+    def __init__(self, failures=()):
+        self.sent = []
+        self.failures = list(failures)
+        self.gate = threading.Event()
+        self.gate.set()
+        self.entered = threading.Event()
+
+    def send(self, data):
+        self.entered.set()
+        self.gate.wait(5)
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append(data)
+
+class TestPrintSpooler(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.queue_dir = os.path.join(self.temp.name, 'queue')
+        self.spoolers = []
+
+    def tearDown(self):
+        for spooler in self.spoolers:
+            spooler.stop()
+        self.temp.cleanup()
+
+    def make(self, printer, **kwargs):
+        kwargs.setdefault('retry_delay', 0.01)
+        kwargs.setdefault('paper_out_delay', 0.01)
+        spooler = PrintSpooler(printer.send, self.queue_dir, **kwargs)
+        self.spoolers.append(spooler)
+        return spooler
+
+    def test_submit_does_not_wait_for_printer(self):
+        printer = FakePrinter()
+        printer.gate.clear()
+        spooler = self.make(printer)
+        spooler.start()
+        started = time.perf_counter()
+        job_id = spooler.submit(b"ticket-1", name="T1")
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertTrue(printer.entered.wait(2))
+        self.assertEqual(spooler.job_state(job_id), 'printing')
+        self.assertTrue(spooler.busy)
+        printer.gate.set()
+        self.assertTrue(spooler.flush(2))
+        self.assertEqual(spooler.job_state(job_id), 'printed')
+        self.assertEqual(printer.sent, [b"ticket-1"])
+        self.assertEqual(os.listdir(self.queue_dir), [])
+
+    def test_waiting_jobs_are_coalesced_in_order(self):
+        printer = FakePrinter()
+        printer.gate.clear()
+        spooler = self.make(printer, max_batch=2)
+        spooler.start()
+        spooler.submit(b"a")
+        self.assertTrue(printer.entered.wait(2))
+        for payload in (b"b", b"c", b"d"):
+            spooler.submit(payload)
+        printer.gate.set()
+        self.assertTrue(spooler.flush(2))
+        self.assertEqual(printer.sent, [b"a", b"b", b"c", b"d"])
+        stats = spooler.stats()
+        self.assertEqual((stats['printed'], stats['coalesced']), (4, 1))
+        self.assertGreater(stats['latency_max_ms'], 0)
+
+    def test_partial_batch_only_reprints_unsent_jobs(self):
+        printer = FakePrinter()
+        printer.gate.clear()
+        failed = []
+
+        def send(data):
+            if data == b"c" and not failed:
+                failed.append(data)
+                raise OSError("offline")
+            printer.send(data)
+
+        spooler = PrintSpooler(send, self.queue_dir, retry_delay=0.01)
+        self.spoolers.append(spooler)
+        spooler.start()
+        spooler.submit(b"a")
+        self.assertTrue(printer.entered.wait(2))
+        for payload in (b"b", b"c", b"d"):
+            spooler.submit(payload)
+        printer.gate.set()
+        self.assertTrue(spooler.flush(2))
+        self.assertEqual(printer.sent, [b"a", b"b", b"c", b"d"])
+        self.assertEqual(spooler.stats()['retries'], 1)
+        self.assertEqual(os.listdir(self.queue_dir), [])
+
+    def test_paper_out_holds_job_without_using_attempts(self):
+        printer = FakePrinter(failures=[PaperOutError("no paper")] * 5)
+        states = []
+        spooler = self.make(printer, max_attempts=2, on_state=lambda job, state: states.append(state))
+        spooler.start()
+        spooler.submit(b"ticket")
+        self.assertTrue(spooler.flush(2))
+        self.assertEqual(printer.sent, [b"ticket"])
+        self.assertIn('paper_out', states)
+        self.assertEqual(states[-1], 'printed')
+        self.assertEqual(spooler.stats()['paper_out_events'], 1)
+
+    def test_errors_retry_then_fail(self):
+        printer = FakePrinter(failures=[OSError("offline")] * 3)
+        spooler = self.make(printer, max_attempts=2)
+        spooler.start()
+        first = spooler.submit(b"first")
+        self.assertTrue(spooler.flush(2))
+        self.assertEqual(spooler.job_state(first), 'failed')
+        self.assertEqual(os.listdir(self.queue_dir), [f"{first:08d}.failed"])
+        second = spooler.submit(b"second")
+        self.assertTrue(spooler.flush(2))
+        self.assertEqual(spooler.job_state(second), 'printed')
+        self.assertEqual(printer.sent, [b"second"])
+        self.assertEqual(spooler.stats()['retries'], 2)
+
+    def test_queue_survives_restart(self):
+        printer = FakePrinter()
+        first = self.make(printer)
+        first.submit(b"one", name="T1")
+        first.submit(b"two", name="T2")
+        restored = self.make(printer)
+        self.assertEqual(restored.stats()['queue_depth'], 2)
+        self.assertEqual(restored.submit(b"three"), 3)
+        restored.start()
+        self.assertTrue(restored.flush(2))
+        self.assertEqual(b"".join(printer.sent), b"onetwothree")
+
+    def test_duplicate_key_is_queued_once(self):
+        printer = FakePrinter()
+        spooler = self.make(printer)
+        first = spooler.submit(b"ticket", key="PK-1")
+        self.assertEqual(spooler.submit(b"ticket", key="PK-1"), first)
+        spooler.start()
+        self.assertTrue(spooler.flush(2))
+        self.assertEqual(printer.sent, [b"ticket"])
+        self.assertEqual(spooler.stats()['duplicates'], 1)
+
+    def test_shared_lock_serializes_other_printing(self):
+        printer = FakePrinter()
+        lock = threading.Lock()
+        spooler = self.make(printer, lock=lock)
+        spooler.start()
+        with lock:
+            spooler.submit(b"ticket")
+            time.sleep(0.1)
+            self.assertEqual(printer.sent, [])
+        self.assertTrue(spooler.flush(2))
+        self.assertEqual(printer.sent, [b"ticket"])
+
+if __name__ == '__main__':
+    unittest.main()
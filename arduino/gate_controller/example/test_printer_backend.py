@@ -0,0 +1,150 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import configparser
+from print_spooler import PaperOutError, PrintSpooler
+from printer_backend import FileBackend, TcpBackend, open_backend
+
+EXAMPLE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def printer_config(**values):
+    config = configparser.ConfigParser()
+    config.read_dict({'printer': values})
+    return config
+
+class FakeJetDirect:
+    """Accepts connections on a local port and records what is sent"""
+
+    def __init__(self):
+        self.server = socket.create_server(('127.0.0.1', 0))
+        self.port = self.server.getsockname()[1]
+        self.received = []
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            with conn:
+                while True:
+                    data = conn.recv(65536)
+                    if not data:
+                        break
+                    self.received.append(data)
+
+    def close(self):
+        self.server.close()
+
+class TestPrinterBackends(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_file_backend_from_config(self):
+        path = os.path.join(self.temp.name, 'out.bin')
+        backend = open_backend(printer_config(type='file', output_file=path))
+        self.assertIsInstance(backend, FileBackend)
+        backend.send(b"\x1b\x40ticket 1")
+        backend.write(b"part ")
+        backend.write(memoryview(b"two"))
+        backend.flush()
+        backend.close()
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"\x1b\x40ticket 1part two")
+        self.assertEqual(backend.jobs, 2)
+
+    def test_paper_out_through_spooler(self):
+        backend = FileBackend(os.path.join(self.temp.name, 'out.bin'))
+        backend.paper = False
+        with self.assertRaises(PaperOutError):
+            backend.send(b"ticket")
+        spooler = PrintSpooler(backend.send, os.path.join(self.temp.name, 'queue'), paper_out_delay=0.01)
+        spooler.start()
+        job_id = spooler.submit(b"ticket")
+        self.assertFalse(spooler.flush(0.2))
+        self.assertEqual(spooler.job_state(job_id), 'paper_out')
+        backend.paper = True
+        self.assertTrue(spooler.flush(2))
+        spooler.stop()
+        self.assertEqual(backend.jobs, 1)
+        backend.close()
+
+    def test_tcp_backend_reconnects(self):
+        server = FakeJetDirect()
+        try:
+            backend = open_backend(printer_config(type='tcp', host='127.0.0.1', tcp_port=str(server.port)))
+            self.assertIsInstance(backend, TcpBackend)
+            backend.send(b"first")
+            backend.close()
+            backend.send(b"second")
+            backend.close()
+            deadline = time.time() + 2
+            while len(b"".join(server.received)) < len(b"firstsecond") and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(b"".join(server.received), b"firstsecond")
+        finally:
+            server.close()
+
+    def test_unknown_type(self):
+        with self.assertRaises(ValueError):
+            open_backend(printer_config(type='lpt'))
+
+    @unittest.skipIf(sys.platform == 'win32', "pywin32 is available on Windows")
+    def test_win32_backend_needs_pywin32_only_when_selected(self):
+        with self.assertRaises(ImportError):
+            open_backend(printer_config(type='win32'))
+
+class TestEntryScriptsImport(unittest.TestCase):
+    def test_scripts_import_without_pywin32(self):
+        missing = []
+        for module in ('serial', 'requests', 'psycopg2'):
+            try:
+                __import__(module)
+            except ImportError:
+                missing.append(module)
+        if missing:
+            self.skipTest(f"Entry script dependencies not installed: {', '.join(missing)}")
+        with tempfile.TemporaryDirectory() as directory:
+            # Run elsewhere so the scripts' log files don't land in the repo
+            result = subprocess.run(
+                [sys.executable, '-c', "import button_handler, app3, parking_client, parking_camera_windows"],
+                cwd=directory, env=dict(os.environ, PYTHONPATH=EXAMPLE_DIR),
+                capture_output=True, text=True, timeout=120
+            )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_button_handler_runs_without_printer(self):
+        try:
+            import serial, requests
+        except ImportError as e:
+            self.skipTest(f"Entry script dependencies not installed: {e}")
+        script = (
+            "from button_handler import ParkingButton\n"
+            "button = ParkingButton(None)\n"
+            "assert button.spooler is None\n"
+            "assert button._print_ticket({'plat': 'B1234XY', 'jenis': 'Motor', "
+            "'tiket': 'OFF000001', 'waktu_masuk': '2024-03-19 12:34:56'})\n"
+            "button.stop()\n"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'config.ini'), 'w') as f:
+                f.write("[printer]\ntype = lpt\n")
+            result = subprocess.run(
+                [sys.executable, '-c', script],
+                cwd=directory, env=dict(os.environ, PYTHONPATH=EXAMPLE_DIR),
+                capture_output=True, text=True, timeout=120
+            )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import time
+import threading
+from storage_monitor import StorageMonitor, GB
+
+class FakeDisk:
+    def __init__(self, free_gb):
+        self.free = free_gb * GB
+        self.calls = 0
+
+    def usage(self, path):
+        self.calls += 1
+        return 100 * GB, 100 * GB - self.free, self.free
+
+class TestStorageMonitor(unittest.TestCase):
+    def test_flags_follow_free_space(self):
+        disk = FakeDisk(5)
+        low_events = []
+        monitor = StorageMonitor('.', min_free_gb=1, hard_min_free_gb=0.2,
+                                 on_low=low_events.append, usage_func=disk.usage)
+        self.assertFalse(monitor.low)
+        disk.free = 0.5 * GB
+        monitor.sample()
+        self.assertTrue(monitor.low)
+        self.assertFalse(monitor.critical)
+        self.assertEqual(low_events, [0.5 * GB])
+        disk.free = 0.1 * GB
+        monitor.sample()
+        self.assertTrue(monitor.critical)
+
+    def test_failed_sample_never_reports_low_space(self):
+        disk = FakeDisk(0.5)
+        monitor = StorageMonitor('.', min_free_gb=1, usage_func=disk.usage)
+        self.assertFalse(monitor.has_free_space())
+        monitor.usage_func = lambda path: (_ for _ in ()).throw(OSError("unreadable"))
+        self.assertIsNone(monitor.sample())
+        self.assertTrue(monitor.has_free_space())
+
+    def test_freed_bytes_clear_low_flag(self):
+        disk = FakeDisk(0.5)
+        monitor = StorageMonitor('.', min_free_gb=1, usage_func=disk.usage)
+        monitor.record_freed(0.3 * GB)
+        self.assertFalse(monitor.has_free_space())
+        monitor.record_freed(0.3 * GB)
+        self.assertTrue(monitor.has_free_space())
+        self.assertEqual(disk.calls, 1)
+
+    def test_bytes_written_triggers_early_sample(self):
+        disk = FakeDisk(5)
+        monitor = StorageMonitor('.', interval=60, sample_bytes=1000, usage_func=disk.usage)
+        monitor.start()
+        try:
+            monitor.record_written(400)
+            time.sleep(0.1)
+            self.assertEqual(disk.calls, 1)
+            monitor.record_written(700)
+            deadline = time.time() + 2
+            while disk.calls < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(disk.calls, 2)
+            self.assertEqual(monitor.bytes_since_sample, 0)
+        finally:
+            monitor.stop()
+
+    def test_trend_predicts_low_space(self):
+        disk = FakeDisk(2)
+        monitor = StorageMonitor('.', min_free_gb=1, usage_func=disk.usage)
+        self.assertIsNone(monitor.trend())
+        # Fake one sample per hour, losing 0.1 GB each
+        monitor.samples.clear()
+        for hour in range(5):
+            monitor.samples.append((hour * 3600.0, (2 - 0.1 * hour) * GB))
+        monitor.free_bytes = 1.6 * GB
+        self.assertAlmostEqual(monitor.trend() * 3600 / GB, -0.1)
+        self.assertAlmostEqual(monitor.seconds_until_low() / 3600, 6.0)
+        self.assertAlmostEqual(monitor.stats()['trend_gb_per_day'], -2.4)
+
+    def test_concurrent_writes_are_all_counted(self):
+        monitor = StorageMonitor('.', sample_bytes=10 * GB, usage_func=FakeDisk(5).usage)
+
+        def write():
+            for _ in range(10000):
+                monitor.record_written(3)
+
+        threads = [threading.Thread(target=write) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(monitor.bytes_since_sample, 4 * 10000 * 3)
+        self.assertFalse(monitor.wake.is_set())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import os
+import time
+import tempfile
+from stream_probe import probe_streams, load_cached_stream, save_cached_stream
+
+class FakeCapture:
+    def __init__(self, url, delay, works):
+        time.sleep(delay)
+        self.url = url
+        self.works = works
+        self.released = False
+
+    def isOpened(self):
+        return self.works
+
+    def read(self):
+        return True, object()
+
+    def release(self):
+        self.released = True
+
+def make_factory(behaviour, created):
+    # behaviour: url -> (delay, works)
+    def factory(url, timeout):
+        capture = FakeCapture(url, *behaviour[url])
+        created.append(capture)
+        return capture
+    return factory
+
+class TestStreamProbe(unittest.TestCase):
+    def test_preferred_url_wins_over_faster_fallback(self):
+        created = []
+        factory = make_factory({'a': (0.2, True), 'b': (0.0, True), 'c': (0.0, False)}, created)
+        index, capture = probe_streams(['a', 'b', 'c'], timeout=2, capture_factory=factory)
+        self.assertEqual(index, 0)
+        self.assertEqual(capture.url, 'a')
+        self.assertTrue(all(c.released for c in created if c is not capture))
+
+    def test_probes_run_in_parallel_with_deadline(self):
+        created = []
+        factory = make_factory({'slow': (3.0, True), 'ok': (0.1, True)}, created)
+        started = time.time()
+        index, capture = probe_streams(['slow', 'ok'], timeout=0.5, capture_factory=factory)
+        self.assertLess(time.time() - started, 2.0)
+        self.assertEqual(capture.url, 'ok')
+
+    def test_nothing_works(self):
+        factory = make_factory({'a': (0.0, False)}, [])
+        self.assertEqual(probe_streams(['a'], timeout=1, capture_factory=factory), (None, None))
+
+    def test_cache_round_trip(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            cache_file = os.path.join(tempdir, 'stream_cache.json')
+            self.assertIsNone(load_cached_stream(cache_file))
+            save_cached_stream(cache_file, '/cam/realmonitor?channel=1&subtype=0')
+            self.assertEqual(load_cached_stream(cache_file), '/cam/realmonitor?channel=1&subtype=0')
+
+if __name__ == '__main__':
+    unittest.main()
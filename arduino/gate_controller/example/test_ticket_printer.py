@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from PIL import Image, ImageChops
+from ticket_printer import TicketPrinter
+
+SAMPLE_TICKET = {
+    "plate_number": "B 1234 XY",
+    "vehicle_type": "Motor",
+    "entry_time": "2024-03-19 12:34:56"
+}
+
+class TestTicketTemplate(unittest.TestCase):
+    def test_cached_template_matches_full_redraw(self):
+        printer = TicketPrinter()
+        cached = printer.render_ticket(SAMPLE_TICKET)
+        redrawn = printer.render_ticket(SAMPLE_TICKET, use_cache=False)
+        self.assertIsNone(ImageChops.difference(cached, redrawn).getbbox())
+
+    def test_template_is_shared_and_not_modified(self):
+        first, second = TicketPrinter(), TicketPrinter()
+        template = first.get_template()
+        self.assertIs(template, second.get_template())
+        before = template.base.copy()
+        first.render_ticket(SAMPLE_TICKET)
+        self.assertIsNone(ImageChops.difference(before, template.base).getbbox())
+
+    def test_values_change_between_tickets(self):
+        printer = TicketPrinter()
+        first = printer.render_ticket(SAMPLE_TICKET)
+        second = printer.render_ticket(dict(SAMPLE_TICKET, plate_number="AB 99 CD"))
+        self.assertIsNotNone(ImageChops.difference(first, second).getbbox())
+
+    def test_ticket_images_for_the_same_plate_do_not_collide(self):
+        printer = TicketPrinter()
+        with tempfile.TemporaryDirectory() as directory:
+            printer.temp_dir = directory
+            first = printer.create_ticket_image(SAMPLE_TICKET)
+            second = printer.create_ticket_image(SAMPLE_TICKET)
+            self.assertNotEqual(first, second)
+            for path in (first, second):
+                self.assertEqual(os.path.dirname(path), directory)
+                with Image.open(path) as image:
+                    self.assertEqual(image.size, (printer.ticket_width, printer.ticket_height))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,110 @@
 import os
+import threading
 from datetime import datetime
-from barcode import Code128
-from barcode.writer import ImageWriter
 from PIL import Image, ImageDraw, ImageFont
+from barcode_render import render_barcode
 import logging
 import tempfile
 
 logger = logging.getLogger(__name__)
 
+class TicketTemplate:
+    """Ticket layout with the static parts rasterized once
+
+    The header, footer and field labels never change between tickets, so
+    they are drawn and measured once into a base image. Rendering a ticket
+    copies the base and draws only the field values and the barcode.
+    """
+
+    HEADER_TEXT = "PARKIR RSI BANJARNEGARA"
+    FOOTER_TEXT = "Terima kasih atas kunjungan Anda"
+    FIELDS = [
+        ('plate_number', "Nomor Plat : "),
+        ('vehicle_type', "Jenis      : "),
+        ('entry_time', "Masuk      : ")
+    ]
+
+    def __init__(self, width, height, margin, font_header, font_normal):
+        self.width = width
+        self.height = height
+        self.margin = margin
+        self.font_header = font_header
+        self.font_normal = font_normal
+
+        # Layout positions
+        self.fields_y = 80  # Start after header
+        self.line_spacing = 30
+        self.barcode_size = (360, 100)
+        self.barcode_x = (self.width - self.barcode_size[0]) // 2
+        self.barcode_y = self.fields_y + len(self.FIELDS) * self.line_spacing + 20
+        self.footer_y = self.barcode_y + self.barcode_size[1] + 20
+
+        self.base = self._render_base()
+
+    def _render_base(self):
+        base = Image.new('RGB', (self.width, self.height), 'white')
+        draw = ImageDraw.Draw(base)
+
+        header_bbox = draw.textbbox((0, 0), self.HEADER_TEXT, font=self.font_header)
+        draw.text(((self.width - (header_bbox[2] - header_bbox[0])) // 2, self.margin),
+                  self.HEADER_TEXT, font=self.font_header, fill='black')
+
+        # Labels are drawn now; values go right after each label's measured width
+        self.value_x = []
+        y = self.fields_y
+        for _, label in self.FIELDS:
+            draw.text((self.margin, y), label, font=self.font_normal, fill='black')
+            self.value_x.append(self.margin + int(round(draw.textlength(label, font=self.font_normal))))
+            y += self.line_spacing
+
+        footer_bbox = draw.textbbox((0, 0), self.FOOTER_TEXT, font=self.font_normal)
+        draw.text(((self.width - (footer_bbox[2] - footer_bbox[0])) // 2, self.footer_y),
+                  self.FOOTER_TEXT, font=self.font_normal, fill='black')
+        return base
+
+    def render(self, ticket_data, barcode_img):
+        """Composite one ticket
+
+        Args:
+            ticket_data: Dictionary containing ticket information
+            barcode_img: PIL image of the barcode
+
+        Returns:
+            PIL image of the ticket
+        """
+        ticket = self.base.copy()
+        draw = ImageDraw.Draw(ticket)
+        y = self.fields_y
+        for (key, _), x in zip(self.FIELDS, self.value_x):
+            draw.text((x, y), str(ticket_data.get(key, 'N/A')), font=self.font_normal, fill='black')
+            y += self.line_spacing
+        if barcode_img.size != self.barcode_size:
+            barcode_img = barcode_img.resize(self.barcode_size)
+        ticket.paste(barcode_img, (self.barcode_x, self.barcode_y))
+        return ticket
+
+# Templates by layout and font, shared by every TicketPrinter in the process
+_template_cache = {}
+_template_lock = threading.Lock()
+
+def get_template(width, height, margin, font_header, font_normal):
+    """Cached TicketTemplate for a layout and font pair"""
+    key = (width, height, margin, font_key(font_header), font_key(font_normal))
+    with _template_lock:
+        template = _template_cache.get(key)
+        if template is None:
+            template = TicketTemplate(width, height, margin, font_header, font_normal)
+            _template_cache[key] = template
+    return template
+
+def font_key(font):
+    # Truetype fonts are identified by file (or family, for fonts loaded from
+    # memory such as Pillow's default) and size; bitmap fonts by type
+    path = getattr(font, 'path', None)
+    if not isinstance(path, str) and hasattr(font, 'getname'):
+        path = font.getname()
+    return (path, getattr(font, 'size', None), type(font).__name__)
+
 class TicketPrinter:
     def __init__(self):
         self.ticket_width = 400
@@ -25,28 +122,45 @@ class TicketPrinter:
         self.temp_dir = tempfile.gettempdir()
         logger.info("Ticket printer initialized")
 
-    def generate_barcode(self, data):
+    def get_template(self, use_cache=True):
+        """Template for this printer's layout; use_cache=False rebuilds it"""
+        if not use_cache:
+            return TicketTemplate(self.ticket_width, self.ticket_height, self.margin,
+                                  self.font_header, self.font_normal)
+        return get_template(self.ticket_width, self.ticket_height, self.margin,
+                            self.font_header, self.font_normal)
+
+    def generate_barcode(self, data, size=None):
         """Generate barcode image
         
         Args:
             data: String to encode in barcode
+            size: Optional (width, height) to render at
             
         Returns:
-            Path to generated barcode image
+            PIL image of the Code128 barcode (1-bit, in memory)
         """
         try:
-            # Generate Code128 barcode
-            code128 = Code128(data, writer=ImageWriter())
-            
-            # Save barcode to temp file
-            barcode_path = os.path.join(self.temp_dir, f"barcode_{data}")
-            code128.save(barcode_path)
-            
-            return f"{barcode_path}.png"
+            return render_barcode(data, 'code128', size=size)
         except Exception as e:
             logger.error(f"Failed to generate barcode: {e}")
             raise
     
+    def render_ticket(self, ticket_data, use_cache=True):
+        """Render a ticket in memory
+        
+        Args:
+            ticket_data: Dictionary containing ticket information
+            use_cache: Reuse the pre-rendered template (False redraws everything)
+            
+        Returns:
+            PIL image of the ticket
+        """
+        template = self.get_template(use_cache)
+        # Rendered at the template's size so the paste needs no resize
+        barcode_img = self.generate_barcode(ticket_data['plate_number'], size=template.barcode_size)
+        return template.render(ticket_data, barcode_img)
+
     def create_ticket_image(self, ticket_data):
         """Create ticket image with text and barcode
         
@@ -54,74 +168,17 @@ class TicketPrinter:
             ticket_data: Dictionary containing ticket information
             
         Returns:
-            Path to generated ticket image
+            Path to generated ticket image, unique per call (the caller removes it)
         """
         try:
-            # Create blank ticket with white background
-            ticket = Image.new('RGB', (self.ticket_width, self.ticket_height), 'white')
-            draw = ImageDraw.Draw(ticket)
-
-            # Add header text
-            header_text = "PARKIR RSI BANJARNEGARA"
-            header_bbox = draw.textbbox((0, 0), header_text, font=self.font_header)
-            header_width = header_bbox[2] - header_bbox[0]
-            draw.text(
-                ((self.ticket_width - header_width) // 2, self.margin),
-                header_text,
-                font=self.font_header,
-                fill='black'
-            )
-
-            # Generate barcode
-            barcode_path = self.generate_barcode(ticket_data['plate_number'])
-            barcode_img = Image.open(barcode_path)
-
-            # Calculate vertical positions
-            current_y = 80  # Start after header
-            line_spacing = 30
-
-            # Add ticket details
-            details = [
-                f"Nomor Plat : {ticket_data.get('plate_number', 'N/A')}",
-                f"Jenis      : {ticket_data.get('vehicle_type', 'N/A')}",
-                f"Masuk      : {ticket_data.get('entry_time', 'N/A')}"
-            ]
-
-            for detail in details:
-                draw.text(
-                    (self.margin, current_y),
-                    detail,
-                    font=self.font_normal,
-                    fill='black'
-                )
-                current_y += line_spacing
-
-            # Add barcode image - centered
-            barcode_x = (self.ticket_width - 360) // 2
-            barcode_y = current_y + 20
-            ticket.paste(barcode_img.resize((360, 100)), (barcode_x, barcode_y))
-
-            # Add footer text
-            footer_y = barcode_y + 100 + 20
-            footer_text = "Terima kasih atas kunjungan Anda"
-            footer_bbox = draw.textbbox((0, 0), footer_text, font=self.font_normal)
-            footer_width = footer_bbox[2] - footer_bbox[0]
-            draw.text(
-                ((self.ticket_width - footer_width) // 2, footer_y),
-                footer_text,
-                font=self.font_normal,
-                fill='black'
-            )
-
-            # Save the ticket
-            ticket_path = os.path.join(self.temp_dir, f"ticket_{ticket_data['plate_number']}.png")
-            ticket.save(ticket_path)
-
-            # Clean up temporary barcode file
-            try:
-                os.remove(barcode_path)
-            except:
-                pass
+            ticket = self.render_ticket(ticket_data)
+
+            # Save the ticket under a name of its own, so two tickets for the
+            # same plate (or two terminals sharing the temp dir) never overwrite
+            # each other's image before it is printed
+            fd, ticket_path = tempfile.mkstemp(prefix="ticket_", suffix=".png", dir=self.temp_dir)
+            with os.fdopen(fd, 'wb') as f:
+                ticket.save(f, format='PNG')
 
             logger.info(f"Ticket created successfully: {ticket_path}")
             return ticket_path
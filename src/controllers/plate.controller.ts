@@ -1,18 +1,33 @@
 import { Response } from 'express';
 import { AuthenticatedRequest } from '../shared/types';
-import * as fs from 'fs';
 import * as path from 'path';
-import { spawn } from 'child_process';
+import * as readline from 'readline';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+
+interface PendingRecognition {
+    resolve: (plateNumber: string) => void;
+    reject: (error: Error) => void;
+    timer: NodeJS.Timeout;
+}
 
 export class PlateController {
-    private readonly TEMP_DIR = path.join(__dirname, '../../temp');
     private readonly PYTHON_SCRIPT = path.join(__dirname, '../scripts/recognize_plate.py');
+    private readonly REQUEST_TIMEOUT_MS = 30000;
+    private readonly RESTART_BASE_DELAY_MS = 1000;
+    private readonly RESTART_MAX_DELAY_MS = 30000;
+
+    // Long-lived recognition server; the EasyOCR model is loaded once per process
+    private recognizer: ChildProcessWithoutNullStreams | null = null;
+    private pending = new Map<number, PendingRecognition>();
+    private nextRequestId = 1;
+
+    // Respawn backoff after the server failed to start or died
+    private restartFailures = 0;
+    private nextStartAt = 0;
 
     constructor() {
-        // Ensure temp directory exists
-        if (!fs.existsSync(this.TEMP_DIR)) {
-            fs.mkdirSync(this.TEMP_DIR, { recursive: true });
-        }
+        // Start loading the model before the first vehicle arrives
+        this.startRecognizer();
     }
 
     recognizePlate = async (req: AuthenticatedRequest, res: Response) => {
@@ -24,61 +39,113 @@ export class PlateController {
             }
 
             // Remove header from base64 string
-            const base64Data = image.replace(/^data:image\/jpeg;base64,/, '');
+            const base64Data = image.replace(/^data:image\/[a-z]+;base64,/, '');
 
-            // Save image to temp file
-            const tempImagePath = path.join(this.TEMP_DIR, `plate_${Date.now()}.jpg`);
-            fs.writeFileSync(tempImagePath, base64Data, 'base64');
+            // Hand the encoded image straight to the recognition server;
+            // no temp file is written or read back
+            const plateNumber = await this.runPlateRecognition(base64Data);
 
-            try {
-                // Call Python script for plate recognition
-                const plateNumber = await this.runPlateRecognition(tempImagePath);
-                
-                // Clean up temp file
-                fs.unlinkSync(tempImagePath);
-
-                return res.json({ plateNumber });
-            } catch (error) {
-                // Clean up temp file
-                if (fs.existsSync(tempImagePath)) {
-                    fs.unlinkSync(tempImagePath);
-                }
-                throw error;
-            }
+            return res.json({ plateNumber });
         } catch (error) {
             console.error('Plate recognition error:', error);
             return res.status(500).json({ message: 'Error processing image' });
         }
     };
 
-    private runPlateRecognition = (imagePath: string): Promise<string> => {
+    private startRecognizer = (): ChildProcessWithoutNullStreams => {
+        const recognizer = spawn('python', [this.PYTHON_SCRIPT, '--serve']);
+
+        readline.createInterface({ input: recognizer.stdout }).on('line', (line) => {
+            // Any output means the server came up; reset the backoff
+            this.restartFailures = 0;
+
+            let response: { id?: number; plate?: string; error?: string; event?: string };
+            try {
+                response = JSON.parse(line);
+            } catch {
+                console.error('Invalid response from plate recognizer:', line);
+                return;
+            }
+
+            if (response.event || response.id === undefined) {
+                return;
+            }
+
+            const request = this.pending.get(response.id);
+            if (!request) {
+                return;
+            }
+            this.pending.delete(response.id);
+            clearTimeout(request.timer);
+
+            if (response.plate) {
+                request.resolve(response.plate);
+            } else {
+                request.reject(new Error(`Plate recognition failed: ${response.error || 'No plate number detected'}`));
+            }
+        });
+
+        recognizer.stderr.on('data', (data) => {
+            console.error('Plate recognizer:', data.toString().trim());
+        });
+
+        // Writes to a child that never started fail here instead of crashing
+        recognizer.stdin.on('error', (error) => {
+            console.error('Plate recognizer stdin error:', error.message);
+        });
+
+        // 'exit' does not fire when spawn itself fails (e.g. python not on PATH)
+        recognizer.on('error', (error) => {
+            console.error('Failed to start plate recognizer:', error);
+            this.recognizerStopped(recognizer);
+        });
+
+        recognizer.on('exit', (code) => {
+            console.error(`Plate recognizer exited with code ${code}`);
+            this.recognizerStopped(recognizer);
+        });
+
+        this.recognizer = recognizer;
+        return recognizer;
+    };
+
+    private recognizerStopped = (recognizer: ChildProcessWithoutNullStreams) => {
+        if (this.recognizer === recognizer) {
+            this.recognizer = null;
+            const delay = Math.min(
+                this.RESTART_BASE_DELAY_MS * 2 ** this.restartFailures,
+                this.RESTART_MAX_DELAY_MS
+            );
+            this.restartFailures++;
+            this.nextStartAt = Date.now() + delay;
+        }
+
+        // Fail everything in flight; the next request restarts the server
+        for (const [id, request] of this.pending) {
+            clearTimeout(request.timer);
+            request.reject(new Error('Plate recognizer stopped'));
+            this.pending.delete(id);
+        }
+    };
+
+    private runPlateRecognition = (base64Image: string): Promise<string> => {
         return new Promise((resolve, reject) => {
-            const process = spawn('python', [this.PYTHON_SCRIPT, imagePath]);
-            let output = '';
-            let error = '';
-
-            process.stdout.on('data', (data) => {
-                output += data.toString();
-            });
-
-            process.stderr.on('data', (data) => {
-                error += data.toString();
-            });
-
-            process.on('close', (code) => {
-                if (code !== 0) {
-                    reject(new Error(`Plate recognition failed: ${error}`));
-                    return;
-                }
-
-                const plateNumber = output.trim();
-                if (!plateNumber) {
-                    reject(new Error('No plate number detected'));
-                    return;
-                }
-
-                resolve(plateNumber);
-            });
+            if (!this.recognizer && Date.now() < this.nextStartAt) {
+                const wait = Math.ceil((this.nextStartAt - Date.now()) / 1000);
+                reject(new Error(`Plate recognizer unavailable, restarting in ${wait}s`));
+                return;
+            }
+
+            const recognizer = this.recognizer || this.startRecognizer();
+            const id = this.nextRequestId++;
+
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error('Plate recognition timed out'));
+            }, this.REQUEST_TIMEOUT_MS);
+
+            this.pending.set(id, { resolve, reject, timer });
+            recognizer.stdin.write(JSON.stringify({ id, image: base64Image }) + '\n');
         });
     };
-} 
\ No newline at end of file
+}
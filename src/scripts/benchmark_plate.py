@@ -0,0 +1,247 @@
+import sys
+import os
+import re
+import csv
+import json
+import time
+import argparse
+import platform
+from datetime import datetime
+import numpy as np
+
+import recognize_plate
+
+STAGES = ('decode', 'preprocess', 'localize', 'ocr', 'postprocess', 'total')
+PERCENTILES = (50, 95, 99)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def normalize_plate(text):
+    return re.sub(r'[^A-Z0-9]', '', str(text).upper())
+
+def list_images(image_dir):
+    return [os.path.join(image_dir, filename)
+            for filename in sorted(os.listdir(image_dir))
+            if filename.lower().endswith(IMAGE_EXTENSIONS)]
+
+def load_labels(image_dir, labels_path=None, catalog_path=None):
+    # Ground truth plates by filename, from a labels file (JSON object or
+    # CSV "filename,plate") and from 'plate_number' in capture metadata
+    labels = {}
+    if labels_path:
+        if labels_path.lower().endswith('.csv'):
+            with open(labels_path, newline='') as f:
+                for row in csv.reader(f):
+                    if len(row) >= 2 and row[0] != 'filename':
+                        labels[row[0]] = row[1]
+        else:
+            with open(labels_path, 'r') as f:
+                labels.update(json.load(f))
+
+    captures = recognize_plate.load_capture_metadata(image_dir, catalog_path)
+    for image_path in list_images(image_dir):
+        filename = os.path.basename(image_path)
+        plate = (captures.get(filename) or {}).get('plate_number')
+        if filename not in labels and plate:
+            labels[filename] = plate
+
+    return {filename: normalize_plate(plate) for filename, plate in labels.items()}
+
+def summarize(samples):
+    summary = {}
+    for stage, values in samples.items():
+        if not values:
+            continue
+        values_ms = np.array(values) * 1000.0
+        summary[stage] = {f"p{p}_ms": float(np.percentile(values_ms, p)) for p in PERCENTILES}
+        summary[stage]['mean_ms'] = float(values_ms.mean())
+    return summary
+
+def run_latency(image_paths, labels, repeat):
+    # Single-process pipeline over every image, timing each stage
+    samples = {stage: [] for stage in STAGES}
+    per_image = []
+
+    for iteration in range(repeat):
+        for image_path in image_paths:
+            started = time.perf_counter()
+            with open(image_path, 'rb') as f:
+                image = recognize_plate.load_image(f.read())
+            timings = {'decode': time.perf_counter() - started}
+            if image is None:
+                print(f"Skipping unreadable image: {image_path}", file=sys.stderr)
+                continue
+
+            candidates = recognize_plate.recognize_image(image, timings)
+            timings['total'] = time.perf_counter() - started
+            for stage in STAGES:
+                samples[stage].append(timings.get(stage, 0.0))
+
+            if iteration == 0:
+                filename = os.path.basename(image_path)
+                plate = candidates[0]['plate'] if candidates else None
+                expected = labels.get(filename)
+                per_image.append({
+                    'image': filename,
+                    'plate': plate,
+                    'expected': expected,
+                    'correct': expected is not None and plate == expected,
+                    'total_ms': timings['total'] * 1000.0
+                })
+
+    labeled = [result for result in per_image if result['expected'] is not None]
+    accuracy = {
+        'labeled_images': len(labeled),
+        'exact_matches': sum(1 for result in labeled if result['correct']),
+        'exact_match_rate': (sum(1 for result in labeled if result['correct']) / len(labeled)
+                             if labeled else None),
+        'read_rate': (sum(1 for result in per_image if result['plate']) / len(per_image)
+                      if per_image else None)
+    }
+    return summarize(samples), accuracy, per_image
+
+def run_throughput(image_paths, max_workers, min_jobs):
+    # Plates per second through the worker pool at 1..N workers
+    images = [recognize_plate.load_image(image_path) for image_path in image_paths]
+    images = [image for image in images if image is not None]
+    if not images:
+        return []
+    jobs = (images * (min_jobs // len(images) + 1))[:max(min_jobs, len(images))]
+
+    throughput = []
+    for workers in range(1, max_workers + 1):
+        # Queue sized to hold the whole run: this measures capacity, not shedding
+        pool = recognize_plate.RecognitionPool(workers, queue_size=len(jobs), job_timeout=3600)
+        try:
+            pool.wait_ready()
+            started = time.perf_counter()
+            futures = [pool.submit('recognize', image, 3600) for image in jobs]
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - started
+            stats = pool.stats()
+        finally:
+            pool.close()
+
+        throughput.append({
+            'workers': workers,
+            'jobs': len(jobs),
+            'seconds': elapsed,
+            'plates_per_second': len(jobs) / elapsed,
+            'utilisation': [worker['utilisation'] for worker in stats['workers']]
+        })
+        print(f"  {workers} worker(s): {len(jobs) / elapsed:.2f} plates/s")
+    return throughput
+
+def compare_with_baseline(report, baseline_path):
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {baseline_path}:")
+    for stage in STAGES:
+        old = baseline.get('latency', {}).get(stage, {}).get('p50_ms')
+        new = report['latency'].get(stage, {}).get('p50_ms')
+        if old and new:
+            print(f"  {stage:<12} p50 {old:8.1f} ms -> {new:8.1f} ms ({(new - old) / old * 100:+.1f}%)")
+
+    old_rate = baseline.get('accuracy', {}).get('exact_match_rate')
+    new_rate = report['accuracy']['exact_match_rate']
+    if old_rate is not None and new_rate is not None:
+        print(f"  accuracy     {old_rate:.1%} -> {new_rate:.1%}")
+
+    old_throughput = {entry['workers']: entry['plates_per_second']
+                      for entry in baseline.get('throughput', [])}
+    for entry in report['throughput']:
+        old = old_throughput.get(entry['workers'])
+        if old:
+            new = entry['plates_per_second']
+            print(f"  {entry['workers']} worker(s)  {old:.2f} -> {new:.2f} plates/s "
+                  f"({(new - old) / old * 100:+.1f}%)")
+
+def print_summary(report):
+    print("\nLatency per stage (ms):")
+    print(f"  {'stage':<12} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for stage in STAGES:
+        values = report['latency'].get(stage)
+        if values:
+            print(f"  {stage:<12} {values['p50_ms']:8.1f} {values['p95_ms']:8.1f} {values['p99_ms']:8.1f}")
+
+    accuracy = report['accuracy']
+    if accuracy['labeled_images']:
+        print(f"\nExact match: {accuracy['exact_matches']}/{accuracy['labeled_images']} "
+              f"({accuracy['exact_match_rate']:.1%})")
+    else:
+        print("\nNo labeled images; accuracy not measured")
+
+def parse_args(argv):
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               '../../arduino/gate_controller/example/capture_images')
+    parser = argparse.ArgumentParser(description="Plate recognition benchmark")
+    parser.add_argument('image_dir', nargs='?', default=os.path.normpath(default_dir),
+                        help="Directory of captured frames")
+    parser.add_argument('--labels', default=None,
+                        help="Ground truth as JSON {filename: plate} or CSV filename,plate")
+    parser.add_argument('--catalog', default=None,
+                        help="Capture catalog database to read plate_number labels from")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Passes over the image set for latency percentiles")
+    parser.add_argument('--workers', type=int, default=min(os.cpu_count() or 1, 4),
+                        help="Measure throughput at 1..N worker processes (0 skips)")
+    parser.add_argument('--min-jobs', type=int, default=20,
+                        help="Minimum jobs per throughput run")
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help="Where to write the machine-readable report")
+    parser.add_argument('--baseline', default=None,
+                        help="Previous report to compare against")
+    parser.add_argument('--config', default=None,
+                        help="Gate config.ini to read the [roi] section from")
+    parser.add_argument('--no-fast-localization', dest='fast_localization', action='store_false',
+                        help="Benchmark the full-resolution contour search")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    recognize_plate.PREPROCESS_PARAMS['fast_localization'] = args.fast_localization
+    if args.config:
+        recognize_plate.PREPROCESS_PARAMS['roi'] = recognize_plate.load_roi(args.config)
+
+    image_paths = list_images(args.image_dir)
+    if not image_paths:
+        print(f"No images found in {args.image_dir}", file=sys.stderr)
+        sys.exit(1)
+    labels = load_labels(args.image_dir, args.labels, args.catalog)
+    print(f"{len(image_paths)} images, {len(labels)} labeled")
+
+    # Model load and first-pass initialisation are not part of the measurement
+    recognize_plate.warm_up(recognize_plate.get_reader())
+
+    latency, accuracy, per_image = run_latency(image_paths, labels, args.repeat)
+
+    throughput = []
+    if args.workers > 0:
+        print("\nThroughput:")
+        throughput = run_throughput(image_paths, args.workers, args.min_jobs)
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'image_dir': os.path.abspath(args.image_dir),
+        'images': len(image_paths),
+        'repeat': args.repeat,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'preprocess_params': recognize_plate.PREPROCESS_PARAMS,
+        'latency': latency,
+        'accuracy': accuracy,
+        'throughput': throughput,
+        'per_image': per_image
+    }
+
+    print_summary(report)
+    if args.baseline:
+        compare_with_baseline(report, args.baseline)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
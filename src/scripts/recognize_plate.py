@@ -1,95 +1,1303 @@
 import sys
+import os
+import re
+import json
+import base64
+import binascii
+import time
+import sqlite3
+import hashlib
+import socket
+import queue
+import argparse
+import configparser
+import tempfile
+import threading
+import socketserver
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import cv2
 import numpy as np
-import easyocr
-import re
 
-def preprocess_image(image):
-    # Convert to grayscale
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), 'recognize_plate.sock')
+
+# Number of images (and text regions) fed to the OCR model per forward pass
+DEFAULT_BATCH_SIZE = 8
+
+# Multi-frame fusion: stop reading frames once every character position of the
+# fused plate is backed by at least this share of the accumulated confidence
+FUSION_CONSENSUS = 0.7
+FUSION_MIN_FRAMES = 2
+FUSION_WORKERS = 4
+
+# Preprocessing parameters. They are part of the result cache key, so tuning
+# them never serves reads produced by the old pipeline
+PREPROCESS_PARAMS = {
+    'bilateral': (11, 17, 17),
+    'canny': (30, 200),
+    'max_contours': 10,
+    'aspect_ratio': (2.0, 5.5),
+    'padding': 5,
+    # Fast localization searches a downscaled copy first and only falls back
+    # to the full-resolution contour search when it finds nothing
+    'fast_localization': True,
+    'localize_width': 640,
+    'min_plate_area': 1500,
+    # Fixed cameras see plates in the same band of the frame; (x, y, w, h) in
+    # frame pixels, or None to process the whole frame
+    'roi': None
+}
+
+# Auto-calibration keeps plates between these percentiles of the historical
+# boxes and widens the result by the margin (fraction of the ROI size)
+ROI_PERCENTILES = (5, 95)
+ROI_MARGIN = 0.15
+
+DEFAULT_CACHE_SIZE = 256
+
+# Worker pool defaults: jobs waiting beyond the queue size are rejected and
+# jobs still queued after their deadline are dropped unprocessed
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_JOB_TIMEOUT = 10.0
+
+# Seconds every worker gets to load its model, and how often the pool checks
+# for workers that died (their jobs are failed and the worker respawned)
+DEFAULT_READY_TIMEOUT = 120.0
+WORKER_CHECK_INTERVAL = 1.0
+
+# The EasyOCR reader is expensive to build (model load takes seconds), so each
+# process keeps a single instance and serializes access to it
+_reader = None
+_reader_lock = threading.Lock()
+
+def get_reader():
+    global _reader
+    if _reader is None:
+        # Imported lazily so thin clients never pay for torch/easyocr
+        import easyocr
+        _reader = easyocr.Reader(['en'])
+    return _reader
+
+def warm_up(reader):
+    # Run one pass over a blank frame so the first real request doesn't pay
+    # for lazy initialisation inside the detector/recognizer
+    blank = np.full((64, 256), 255, dtype=np.uint8)
+    reader.readtext(blank)
+
+def locate_plate_full(gray, limit=1):
+    params = PREPROCESS_PARAMS
+    plate_rects = []
+
     # Apply bilateral filter to remove noise while keeping edges sharp
-    bilateral = cv2.bilateralFilter(gray, 11, 17, 17)
-    
+    bilateral = cv2.bilateralFilter(gray, *params['bilateral'])
+
     # Find edges using Canny
-    edges = cv2.Canny(bilateral, 30, 200)
-    
+    edges = cv2.Canny(bilateral, *params['canny'])
+
     # Find contours
-    contours, _ = cv2.findContours(edges.copy(), cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-    
+    contours, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+
     # Sort contours by area and keep the largest ones
-    contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
-    
-    plate_contour = None
-    plate_rect = None
-    
+    contours = sorted(contours, key=cv2.contourArea, reverse=True)[:params['max_contours']]
+    min_aspect, max_aspect = params['aspect_ratio']
+
     for contour in contours:
         perimeter = cv2.arcLength(contour, True)
         approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
-        
+
         # Look for a rectangle-like contour
         if len(approx) == 4:
             x, y, w, h = cv2.boundingRect(approx)
             aspect_ratio = w / float(h)
-            
+
             # Check if aspect ratio matches typical license plate dimensions
-            if 2.0 <= aspect_ratio <= 5.5:
-                plate_contour = approx
-                plate_rect = (x, y, w, h)
-                break
-    
+            if min_aspect <= aspect_ratio <= max_aspect:
+                plate_rects.append((x, y, w, h))
+                if len(plate_rects) >= limit:
+                    break
+
+    return plate_rects
+
+def locate_plate_fast(gray, limit=1):
+    params = PREPROCESS_PARAMS
+    plate_rects = []
+
+    # Search a pyramid-downscaled copy; plates stay well above the noise floor
+    small = gray
+    scale = 1
+    while small.shape[1] > params['localize_width']:
+        small = cv2.pyrDown(small)
+        scale *= 2
+
+    bilateral = cv2.bilateralFilter(small, *params['bilateral'])
+    edges = cv2.Canny(bilateral, *params['canny'])
+
+    # Outer contours only; nested edges inside characters are never plates
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return plate_rects
+
+    # Reject implausible shapes for all contours at once using their bounding rects
+    rects = np.array([cv2.boundingRect(contour) for contour in contours])
+    widths = rects[:, 2].astype(np.float32)
+    heights = np.maximum(rects[:, 3], 1).astype(np.float32)
+    areas = widths * heights
+    aspect_ratios = widths / heights
+    min_aspect, max_aspect = params['aspect_ratio']
+    mask = ((aspect_ratios >= min_aspect) & (aspect_ratios <= max_aspect)
+            & (areas >= params['min_plate_area'] / float(scale * scale)))
+    candidates = np.flatnonzero(mask)
+    if candidates.size == 0:
+        return plate_rects
+
+    # Pick the largest few without sorting every contour
+    keep = min(params['max_contours'], candidates.size)
+    top = candidates[np.argpartition(-areas[candidates], keep - 1)[:keep]]
+    top = top[np.argsort(-areas[top])]
+
+    for index in top:
+        contour = contours[index]
+        perimeter = cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+        if len(approx) == 4:
+            x, y, w, h = cv2.boundingRect(approx)
+            if min_aspect <= w / float(h) <= max_aspect:
+                # Map back to full resolution for the crop
+                plate_rects.append((x * scale, y * scale, w * scale, h * scale))
+                if len(plate_rects) >= limit:
+                    break
+
+    return plate_rects
+
+def locate_plate_regions(gray, limit=1):
+    # Candidate plate rectangles, most plausible first
+    plate_rects = []
+    if PREPROCESS_PARAMS['fast_localization']:
+        plate_rects = locate_plate_fast(gray, limit)
+    if not plate_rects:
+        plate_rects = locate_plate_full(gray, limit)
+    return plate_rects
+
+def locate_plate(gray):
+    plate_rects = locate_plate_regions(gray)
+    return plate_rects[0] if plate_rects else None
+
+def crop_plate(gray, plate_rect):
+    x, y, w, h = plate_rect
+    pad = PREPROCESS_PARAMS['padding']
+    # Extract the plate region with some padding
+    plate_img = gray[max(y-pad,0):min(y+h+pad,gray.shape[0]),
+                   max(x-pad,0):min(x+w+pad,gray.shape[1])]
+
+    # Apply thresholding to make the text more visible
+    _, plate_img = cv2.threshold(plate_img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return plate_img
+
+def apply_roi(image, roi=None):
+    # Crop a frame to the configured region of interest
+    roi = roi or PREPROCESS_PARAMS['roi']
+    if not roi:
+        return image
+    x, y, w, h = roi
+    height, width = image.shape[:2]
+    x0, y0 = max(int(x), 0), max(int(y), 0)
+    x1, y1 = min(int(x + w), width), min(int(y + h), height)
+    if x1 <= x0 or y1 <= y0:
+        return image
+    return image[y0:y1, x0:x1]
+
+def preprocess_image(image):
+    # Only the plate band of a fixed camera is worth filtering and reading
+    image = apply_roi(image)
+
+    # Convert to grayscale
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    plate_rect = locate_plate(gray)
     if plate_rect is not None:
-        x, y, w, h = plate_rect
-        # Extract the plate region with some padding
-        plate_img = gray[max(y-5,0):min(y+h+5,gray.shape[0]), 
-                       max(x-5,0):min(x+w+5,gray.shape[1])]
-        
-        # Apply thresholding to make the text more visible
-        _, plate_img = cv2.threshold(plate_img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
-        return plate_img
-    
+        return crop_plate(gray, plate_rect)
+
     return gray
 
+# Indonesian plates: region prefix, 1-4 digits (no leading zero), 0-3 letter suffix
+REGION_CODES = (
+    'A', 'B', 'D', 'E', 'F', 'G', 'H', 'K', 'L', 'M', 'N', 'P', 'R', 'S', 'T', 'W', 'Z',
+    'AA', 'AB', 'AD', 'AE', 'AG',
+    'BA', 'BB', 'BD', 'BE', 'BG', 'BH', 'BK', 'BL', 'BM', 'BN', 'BP',
+    'DA', 'DB', 'DC', 'DD', 'DE', 'DG', 'DH', 'DK', 'DL', 'DM', 'DN', 'DP', 'DR', 'DT', 'DW',
+    'EA', 'EB', 'ED',
+    'KB', 'KH', 'KT', 'KU',
+    'PA', 'PB',
+    'CC', 'CD', 'RI'
+)
+PLATE_PATTERN = re.compile(
+    r'^(' + '|'.join(sorted(REGION_CODES, key=len, reverse=True)) + r')([1-9][0-9]{0,3})([A-Z]{0,3})$'
+)
+
+# Common OCR confusions, mapped towards the character class the grammar expects
+TO_LETTER = {'0': 'O', '1': 'I', '2': 'Z', '4': 'A', '5': 'S', '6': 'G', '7': 'T', '8': 'B'}
+TO_DIGIT = {'O': '0', 'D': '0', 'Q': '0', 'I': '1', 'L': '1', 'Z': '2', 'A': '4',
+            'S': '5', 'G': '6', 'T': '7', 'B': '8'}
+
+# Candidate scoring: OCR confidence scaled by how well the text fits the grammar
+GRAMMAR_BONUS = 1.0
+NON_GRAMMAR_FACTOR = 0.5
+CORRECTION_FACTOR = 0.9
+
+# Stop reading further plate regions once a grammatical candidate scores this high
+FAST_PATH_SCORE = 0.8
+MAX_OCR_REGIONS = 3
+
 def clean_plate_text(text):
     # Remove non-alphanumeric characters
     text = re.sub(r'[^A-Z0-9]', '', text.upper())
-    
+
     # Check if the result matches common plate formats
     if len(text) >= 5 and len(text) <= 8:
         return text
     return None
 
-def recognize_plate(image_path):
+def correct_plate_text(text):
+    # Fit text to prefix/digits/suffix, correcting confusable characters by
+    # position. Returns (plate, corrections) or (None, 0) if nothing fits
+    best = None
+    for prefix_len in (1, 2):
+        for suffix_len in (0, 1, 2, 3):
+            digit_len = len(text) - prefix_len - suffix_len
+            if not 1 <= digit_len <= 4:
+                continue
+            prefix = ''.join(TO_LETTER.get(c, c) for c in text[:prefix_len])
+            digits = ''.join(TO_DIGIT.get(c, c) for c in text[prefix_len:prefix_len + digit_len])
+            suffix = ''.join(TO_LETTER.get(c, c) for c in text[prefix_len + digit_len:])
+            plate = prefix + digits + suffix
+            if not PLATE_PATTERN.match(plate):
+                continue
+            corrections = sum(1 for a, b in zip(text, plate) if a != b)
+            # Prefer fewer corrections, then the split with more digits
+            rank = (corrections, -digit_len)
+            if best is None or rank < best[0]:
+                best = (rank, plate, corrections)
+    if best is None:
+        return None, 0
+    return best[1], best[2]
+
+def score_plate_text(text, confidence):
+    # Build a candidate from raw OCR text, or None if it can't be a plate
+    cleaned = clean_plate_text(text)
+    if not cleaned:
+        return None
+
+    plate, corrections = correct_plate_text(cleaned)
+    if plate:
+        return {
+            'plate': plate,
+            'confidence': float(confidence),
+            'score': float(confidence) * GRAMMAR_BONUS * (CORRECTION_FACTOR ** corrections),
+            'grammatical': True,
+            'corrections': corrections
+        }
+    return {
+        'plate': cleaned,
+        'confidence': float(confidence),
+        'score': float(confidence) * NON_GRAMMAR_FACTOR,
+        'grammatical': False,
+        'corrections': 0
+    }
+
+class ResultCache:
+    # Bounded LRU of recognition results keyed by the decoded pixels plus the
+    # preprocessing parameters, optionally backed by a small SQLite store so
+    # entries survive a server restart. With a ttl, entries older than ttl
+    # seconds are treated as misses
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE, db_path=None, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self.db.commit()
+
+    @staticmethod
+    def make_key(image):
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{image.shape}:{image.dtype}".encode('utf-8'))
+        digest.update(json.dumps(PREPROCESS_PARAMS, sort_keys=True).encode('utf-8'))
+        digest.update(np.ascontiguousarray(image).data)
+        return digest.hexdigest()
+
+    def _expired(self, created_at):
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                created_at, result = self.entries[key]
+                if not self._expired(created_at):
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(result)
+                del self.entries[key]
+
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT result, created_at FROM results WHERE key = ?", (key,)).fetchone()
+                if row and not self._expired(row[1]):
+                    result = json.loads(row[0])
+                    self._remember(key, result, row[1])
+                    self.hits += 1
+                    return dict(result)
+
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        with self.lock:
+            now = time.time()
+            self._remember(key, result, now)
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO results (key, result, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(result), now))
+                # Keep the on-disk store as small as the in-memory one
+                self.db.execute(
+                    "DELETE FROM results WHERE key NOT IN "
+                    "(SELECT key FROM results ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_entries,))
+                if self.ttl is not None:
+                    self.db.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl,))
+                self.db.commit()
+
+    def _remember(self, key, result, created_at):
+        self.entries[key] = (created_at, dict(result))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+# Set by the server entry points; None disables caching
+_cache = None
+
+def load_image(source):
+    # Accept a file path, encoded image bytes or an already-decoded frame
+    if source is None:
+        return None
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        buffer = np.frombuffer(source, dtype=np.uint8)
+        if buffer.size == 0:
+            return None
+        return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    return cv2.imread(source)
+
+def extract_candidates(results):
+    # Turn raw OCR results into plate candidates ranked by score, one per plate
+    candidates = {}
+
+    def add(candidate):
+        if candidate is None:
+            return
+        current = candidates.get(candidate['plate'])
+        if current is None or candidate['score'] > current['score']:
+            candidates[candidate['plate']] = candidate
+
+    for (bbox, text, prob) in results:
+        add(score_plate_text(text, prob))
+
+    # Plates are often read as separate fragments ("B 1234" and "XYZ");
+    # also try them joined left to right
+    if len(results) > 1:
+        ordered = sorted(results, key=lambda result: min(point[0] for point in result[0]))
+        joined_text = ''.join(text for (bbox, text, prob) in ordered)
+        total_length = sum(len(text) for (bbox, text, prob) in ordered) or 1
+        joined_confidence = sum(len(text) * prob for (bbox, text, prob) in ordered) / total_length
+        joined = score_plate_text(joined_text, joined_confidence)
+        if joined is not None and joined['grammatical']:
+            # The fragments themselves are no longer candidates
+            for plate in list(candidates):
+                if plate != joined['plate'] and plate in joined['plate']:
+                    del candidates[plate]
+        add(joined)
+
+    return sorted(candidates.values(), key=lambda candidate: candidate['score'], reverse=True)
+
+def merge_candidates(*candidate_lists):
+    merged = {}
+    for candidates in candidate_lists:
+        for candidate in candidates:
+            current = merged.get(candidate['plate'])
+            if current is None or candidate['score'] > current['score']:
+                merged[candidate['plate']] = candidate
+    return sorted(merged.values(), key=lambda candidate: candidate['score'], reverse=True)
+
+def is_confident(candidates):
+    return bool(candidates) and candidates[0]['grammatical'] and candidates[0]['score'] >= FAST_PATH_SCORE
+
+class StageTimer:
+    # Accumulates wall time per pipeline stage when a timings dict is given
+
+    def __init__(self, timings):
+        self.timings = timings
+        self.started = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        if self.timings is not None:
+            self.timings[stage] = self.timings.get(stage, 0.0) + (now - self.started)
+        self.started = now
+
+def recognize_image(image, timings=None):
+    # Read the most plausible plate regions in turn and rank every candidate.
+    # A confident grammatical read skips OCR on the remaining regions
+    timer = StageTimer(timings)
+    image = apply_roi(image)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    timer.lap('preprocess')
+
+    plate_rects = locate_plate_regions(gray, MAX_OCR_REGIONS)
+    timer.lap('localize')
+    regions = [crop_plate(gray, plate_rect) for plate_rect in plate_rects]
+    timer.lap('preprocess')
+
+    candidates = []
+    reader = get_reader()
+    for region in regions:
+        with _reader_lock:
+            results = reader.readtext(region)
+        timer.lap('ocr')
+        candidates = merge_candidates(candidates, extract_candidates(results))
+        timer.lap('postprocess')
+        if is_confident(candidates):
+            return candidates
+
+    # Nothing convincing in the localized regions; read the whole frame
+    with _reader_lock:
+        results = reader.readtext(gray)
+    timer.lap('ocr')
+    candidates = merge_candidates(candidates, extract_candidates(results))
+    timer.lap('postprocess')
+    return candidates
+
+def recognize_batch(sources, batch_size=DEFAULT_BATCH_SIZE):
+    # Recognize plates in several images (paths, encoded bytes or frames).
+    # Returns one result per source, in order, holding its plate candidates
+    results = [None] * len(sources)
+    processed = {}
+
+    for index, source in enumerate(sources):
+        image = load_image(source)
+        if image is None:
+            results[index] = {'candidates': [], 'error': "Could not read image file"}
+            continue
+        processed[index] = preprocess_image(image)
+
+    # EasyOCR can only batch the detector over images of identical size,
+    # so group the preprocessed images by shape
+    groups = {}
+    for index, processed_img in processed.items():
+        groups.setdefault(processed_img.shape, []).append(index)
+
+    reader = get_reader()
+    for indices in groups.values():
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start + batch_size]
+            images = [processed[index] for index in chunk]
+            with _reader_lock:
+                if len(images) == 1:
+                    batch_results = [reader.readtext(images[0], batch_size=batch_size)]
+                else:
+                    batch_results = reader.readtext_batched(images, batch_size=batch_size)
+
+            for index, ocr_results in zip(chunk, batch_results):
+                candidates = extract_candidates(ocr_results)
+                results[index] = {'candidates': candidates}
+                if not candidates:
+                    results[index]['error'] = "No valid plate number found"
+
+    return results
+
+def read_frame_candidates(source, stop=None):
+    # Decode and preprocess run concurrently; the OCR pass itself is serialized.
+    # Returns None without reading if `stop` is set by the time the reader is free
+    image = load_image(source)
+    if image is None:
+        return []
+    processed_img = preprocess_image(image)
+    with _reader_lock:
+        if stop is not None and stop.is_set():
+            return None
+        results = get_reader().readtext(processed_img)
+    return extract_candidates(results)
+
+def vote_plate(readings):
+    # readings: (plate, confidence) pairs, at most one per frame.
+    # First agree on the plate length, then vote per character position
+    # weighted by OCR confidence
+    if not readings:
+        return None, 0.0
+
+    length_weights = {}
+    for plate, confidence in readings:
+        length_weights[len(plate)] = length_weights.get(len(plate), 0.0) + confidence
+    length = max(length_weights, key=length_weights.get)
+
+    same_length = [(plate, confidence) for plate, confidence in readings if len(plate) == length]
+    fused = []
+    consensus = 1.0
+    for position in range(length):
+        char_weights = {}
+        for plate, confidence in same_length:
+            char = plate[position]
+            char_weights[char] = char_weights.get(char, 0.0) + confidence
+        best_char = max(char_weights, key=char_weights.get)
+        total = sum(char_weights.values())
+        fused.append(best_char)
+        if total > 0:
+            consensus = min(consensus, char_weights[best_char] / total)
+
+    # Frames that disagreed on the length count against the consensus too
+    total_weight = sum(length_weights.values())
+    if total_weight > 0:
+        consensus *= length_weights[length] / total_weight
+
+    return ''.join(fused), consensus
+
+def fuse_frames(sources, consensus=FUSION_CONSENSUS, min_frames=FUSION_MIN_FRAMES,
+                max_workers=FUSION_WORKERS):
+    # Read a burst of frames of the same vehicle and fuse them into one plate,
+    # stopping early once the vote is confident enough
+    readings = []
+    frames_read = 0
+    plate, agreement = None, 0.0
+    stop = threading.Event()
+
+    def read(source):
+        # Frames still waiting for OCR when consensus is reached are skipped
+        if stop.is_set():
+            return None
+        if _pool is not None:
+            return dispatch('candidates', source)
+        return read_frame_candidates(source, stop)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [executor.submit(read, source) for source in sources]
+        for future in as_completed(futures):
+            try:
+                candidates = future.result()
+            except Exception:
+                candidates = []
+            if candidates is None:
+                continue
+            frames_read += 1
+            if candidates:
+                best = candidates[0]
+                readings.append((best['plate'], best['confidence']))
+
+            plate, agreement = vote_plate(readings)
+            if plate and len(readings) >= min_frames and agreement >= consensus:
+                stop.set()
+                break
+    finally:
+        # Don't wait for frames that will be skipped anyway
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return {
+        'plate': plate,
+        'consensus': agreement,
+        'frames_read': frames_read,
+        'frames_used': len(readings)
+    }
+
+def decode_base64_image(data):
+    # Encoded image bytes sent inline, with or without a data URL header
+    data = re.sub(r'^data:image/[a-z]+;base64,', '', data)
+    try:
+        return load_image(base64.b64decode(data))
+    except (binascii.Error, ValueError):
+        return None
+
+def read_shared_frame(header):
+    # An already-decoded frame placed in shared memory by the caller,
+    # described by {'name', 'shape', 'dtype'}
+    try:
+        segment = shared_memory.SharedMemory(name=header['name'])
+    except (KeyError, FileNotFoundError):
+        return None
+    # The segment belongs to the caller; don't let this process's resource
+    # tracker unlink it on exit
+    resource_tracker.unregister(segment._name, 'shared_memory')
+    try:
+        frame = np.ndarray(tuple(header['shape']), dtype=np.dtype(header.get('dtype', 'uint8')),
+                           buffer=segment.buf)
+        # Copy out so the caller can reuse or unlink the segment immediately
+        return frame.copy()
+    except (KeyError, TypeError, ValueError):
+        return None
+    finally:
+        segment.close()
+
+def request_image(request):
+    # The image of a single request: inline bytes, shared memory or a file path
+    if request.get('image'):
+        return decode_base64_image(request['image'])
+    if request.get('shm'):
+        return read_shared_frame(request['shm'])
+    if request.get('path'):
+        return cv2.imread(request['path'])
+    return None
+
+def request_sources(request):
+    # The images of a multi-image request, as paths or decoded frames
+    if isinstance(request.get('images'), list) and request['images']:
+        return [decode_base64_image(image) for image in request['images']]
+    if isinstance(request.get('paths'), list) and request['paths']:
+        return request['paths']
+    return None
+
+class QueueFullError(Exception):
+    pass
+
+def run_job(kind, payload):
+    # Execute one unit of recognition work in the current process
+    if kind == 'recognize':
+        candidates = recognize_image(payload)
+        if candidates:
+            return {'plate': candidates[0]['plate'], 'candidates': candidates}
+        return {'error': "No valid plate number found", 'candidates': []}
+    if kind == 'candidates':
+        return read_frame_candidates(payload)
+    if kind == 'batch':
+        sources, batch_size = payload
+        return recognize_batch(sources, batch_size)
+    raise ValueError(f"Unknown job kind: {kind}")
+
+def _pool_worker(worker_id, jobs, results, preprocess_params):
+    # Spawned workers start from the module defaults; apply the server's settings
+    PREPROCESS_PARAMS.update(preprocess_params)
+
+    # Each worker process owns and warms its own reader
+    warm_up(get_reader())
+    results.put(('ready', worker_id, None, None, 0.0))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, deadline, kind, payload = job
+
+        started = time.time()
+        if started > deadline:
+            results.put(('expired', worker_id, job_id, None, 0.0))
+            continue
+        # Lets the pool fail this job if the process dies while running it
+        results.put(('started', worker_id, job_id, None, 0.0))
+
+        try:
+            results.put(('done', worker_id, job_id, run_job(kind, payload), time.time() - started))
+        except Exception as e:
+            results.put(('failed', worker_id, job_id, str(e), time.time() - started))
+
+class RecognitionPool:
+    # N pre-warmed OCR processes fed from one bounded job queue. A worker that
+    # dies fails the job it was running and is replaced
+
+    def __init__(self, workers, queue_size=DEFAULT_QUEUE_SIZE, job_timeout=DEFAULT_JOB_TIMEOUT,
+                 worker=_pool_worker):
+        # Spawn rather than fork so workers don't inherit threads or torch state
+        self.context = multiprocessing.get_context('spawn')
+        self.worker = worker
+        self.preprocess_params = dict(PREPROCESS_PARAMS)
+        self.job_timeout = job_timeout
+        self.queue_size = queue_size
+        self.jobs = self.context.Queue()
+        self.results = self.context.Queue()
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.deadlines = {}
+        self.running_jobs = {}
+        self.next_job_id = 1
+        self.rejected = 0
+        self.expired = 0
+        self.closing = False
+        self.last_check = time.time()
+        self.started_at = time.time()
+        self.ready = threading.Semaphore(0)
+        self.worker_stats = {
+            worker_id: {'jobs': 0, 'failed': 0, 'busy_seconds': 0.0, 'restarts': 0}
+            for worker_id in range(workers)
+        }
+
+        self.processes = [self._start_worker(worker_id) for worker_id in range(workers)]
+
+        self.collector = threading.Thread(target=self._collect, daemon=True)
+        self.collector.start()
+
+    def _start_worker(self, worker_id):
+        process = self.context.Process(target=self.worker,
+                                       args=(worker_id, self.jobs, self.results, self.preprocess_params),
+                                       daemon=True)
+        process.start()
+        return process
+
+    def wait_ready(self, timeout=DEFAULT_READY_TIMEOUT):
+        # Raises TimeoutError if a worker never finishes loading its model
+        deadline = time.time() + timeout
+        for _ in self.processes:
+            if not self.ready.acquire(timeout=max(deadline - time.time(), 0)):
+                raise TimeoutError(f"Recognition workers not ready after {timeout:.0f}s")
+
+    def check_workers(self):
+        # Fail the jobs of dead workers and respawn them; also drop jobs whose
+        # worker vanished without reporting that it had started them
+        failed = []
+        now = time.time()
+        with self.lock:
+            self.last_check = now
+            if self.closing:
+                return
+            for worker_id, process in enumerate(self.processes):
+                if process.is_alive():
+                    continue
+                job_id = self.running_jobs.pop(worker_id, None)
+                if job_id in self.futures:
+                    failed.append((self.futures.pop(job_id),
+                                   RuntimeError(f"Recognition worker {worker_id} died")))
+                    self.deadlines.pop(job_id, None)
+                self.worker_stats[worker_id]['restarts'] += 1
+                self.processes[worker_id] = self._start_worker(worker_id)
+            for job_id, deadline in list(self.deadlines.items()):
+                if now > deadline + self.job_timeout and job_id not in self.running_jobs.values():
+                    del self.deadlines[job_id]
+                    failed.append((self.futures.pop(job_id), TimeoutError("Job was lost by its worker")))
+        for future, error in failed:
+            future.set_exception(error)
+
+    def submit(self, kind, payload, timeout=None):
+        future = Future()
+        deadline = time.time() + (timeout or self.job_timeout)
+        self.check_workers()
+
+        with self.lock:
+            # Shed load once every worker is busy and the queue is full
+            if len(self.futures) >= len(self.processes) + self.queue_size:
+                self.rejected += 1
+                raise QueueFullError("Recognition queue is full")
+            job_id = self.next_job_id
+            self.next_job_id += 1
+            self.futures[job_id] = future
+            self.deadlines[job_id] = deadline
+
+        self.jobs.put((job_id, deadline, kind, payload))
+        return future
+
+    def run(self, kind, payload, timeout=None):
+        timeout = timeout or self.job_timeout
+        future = self.submit(kind, payload, timeout)
+        # Allow the job to finish if a worker picked it up just before its deadline
+        return future.result(timeout=timeout * 2)
+
+    def _collect(self):
+        while True:
+            if time.time() - self.last_check >= WORKER_CHECK_INTERVAL:
+                self.check_workers()
+            try:
+                message = self.results.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+            if message is None:
+                break
+            status, worker_id, job_id, result, busy_seconds = message
+
+            if status == 'ready':
+                self.ready.release()
+                continue
+
+            with self.lock:
+                if status == 'started':
+                    self.running_jobs[worker_id] = job_id
+                    continue
+                if self.running_jobs.get(worker_id) == job_id:
+                    del self.running_jobs[worker_id]
+                self.deadlines.pop(job_id, None)
+                future = self.futures.pop(job_id, None)
+                stats = self.worker_stats[worker_id]
+                stats['busy_seconds'] += busy_seconds
+                if status == 'done':
+                    stats['jobs'] += 1
+                elif status == 'failed':
+                    stats['failed'] += 1
+                else:
+                    self.expired += 1
+
+            if future is None:
+                continue
+            if status == 'done':
+                future.set_result(result)
+            elif status == 'failed':
+                future.set_exception(RuntimeError(result))
+            else:
+                future.set_exception(TimeoutError("Job expired before a worker was free"))
+
+    def stats(self):
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        with self.lock:
+            # Jobs submitted but not finished: waiting in the queue or running
+            in_flight = len(self.futures)
+            workers = []
+            for worker_id, stats in self.worker_stats.items():
+                workers.append({
+                    'worker': worker_id,
+                    'alive': self.processes[worker_id].is_alive(),
+                    'jobs': stats['jobs'],
+                    'failed': stats['failed'],
+                    'restarts': stats['restarts'],
+                    'utilisation': min(stats['busy_seconds'] / elapsed, 1.0)
+                })
+            return {
+                'queue_depth': max(in_flight - len(self.processes), 0),
+                'in_flight': in_flight,
+                'queue_size': self.queue_size,
+                'rejected': self.rejected,
+                'expired': self.expired,
+                'workers': workers
+            }
+
+    def close(self):
+        with self.lock:
+            self.closing = True
+        for _ in self.processes:
+            self.jobs.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+        self.results.put(None)
+        self.collector.join(timeout=5)
+
+# Set by the server entry points; None runs jobs in-process
+_pool = None
+
+def dispatch(kind, payload, timeout=None):
+    # Run a job on the worker pool when one is running, otherwise in-process
+    if _pool is not None:
+        return _pool.run(kind, payload, timeout)
+    return run_job(kind, payload)
+
+def handle_request(request):
+    response = {'id': request.get('id')}
+    op = request.get('op', 'recognize')
+    timeout = request.get('timeout')
+
+    if op == 'ping':
+        response['ok'] = True
+        return response
+    if op == 'stats':
+        response['cache'] = _cache.stats() if _cache is not None else None
+        response['pool'] = _pool.stats() if _pool is not None else None
+        return response
+
+    try:
+        if op == 'batch':
+            sources = request_sources(request)
+            if not sources:
+                response['error'] = "Missing images"
+                return response
+            batch_size = int(request.get('batch_size', DEFAULT_BATCH_SIZE))
+            response['results'] = dispatch('batch', (sources, batch_size), timeout)
+            return response
+
+        if op == 'fuse':
+            sources = request_sources(request)
+            if not sources:
+                response['error'] = "Missing images"
+                return response
+            fusion = fuse_frames(sources, float(request.get('consensus', FUSION_CONSENSUS)))
+            response.update(fusion)
+            if not fusion['plate']:
+                response['error'] = "No valid plate number found"
+            return response
+
+        if op != 'recognize':
+            response['error'] = f"Unknown op: {op}"
+            return response
+
+        if not any(request.get(key) for key in ('image', 'shm', 'path')):
+            response['error'] = "Missing image"
+            return response
+
+        image = request_image(request)
+        if image is None:
+            response['error'] = "Could not read image file"
+            return response
+
+        cache_key = None
+        if _cache is not None:
+            cache_key = _cache.make_key(image)
+            cached = _cache.get(cache_key)
+            if cached is not None:
+                response.update(cached)
+                response['cached'] = True
+                return response
+
+        result = dispatch('recognize', image, timeout)
+        if cache_key is not None:
+            _cache.put(cache_key, result)
+        response.update(result)
+        return response
+
+    except QueueFullError as e:
+        response['error'] = str(e)
+        response['rejected'] = True
+        return response
+    except TimeoutError:
+        response['error'] = "Recognition timed out"
+        return response
+    except Exception as e:
+        response['error'] = f"Recognition failed: {e}"
+        return response
+
+def handle_line(line):
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return {'id': None, 'error': "Invalid JSON request"}
+    if not isinstance(request, dict):
+        return {'id': None, 'error': "Request must be a JSON object"}
+    return handle_request(request)
+
+def load_and_warm_up():
+    if _pool is not None:
+        _pool.wait_ready()
+    else:
+        warm_up(get_reader())
+    print("Recognition server ready", file=sys.stderr)
+
+def serve_stdio():
+    # One JSON request per line on stdin, one JSON response per line on stdout
+    load_and_warm_up()
+    print(json.dumps({'event': 'ready'}), flush=True)
+
+    if _pool is None:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            print(json.dumps(handle_line(line)), flush=True)
+        return
+
+    # With a worker pool, requests are answered out of order as they finish.
+    # Lines beyond what the pool can hold are rejected immediately
+    output_lock = threading.Lock()
+    capacity = len(_pool.processes) + _pool.queue_size
+    slots = threading.BoundedSemaphore(capacity)
+
+    def respond(request):
+        try:
+            response = handle_request(request)
+        finally:
+            slots.release()
+        with output_lock:
+            print(json.dumps(response), flush=True)
+
+    with ThreadPoolExecutor(max_workers=capacity) as executor:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                request = json.loads(line)
+            except ValueError:
+                request = None
+            if not isinstance(request, dict) or request.get('op') in ('ping', 'stats'):
+                # Malformed lines and control ops are answered inline
+                response = handle_line(line)
+            elif slots.acquire(blocking=False):
+                executor.submit(respond, request)
+                continue
+            else:
+                response = {'id': request.get('id'), 'error': "Recognition queue is full",
+                            'rejected': True}
+
+            with output_lock:
+                print(json.dumps(response), flush=True)
+
+class RecognitionRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            line = line.decode('utf-8').strip()
+            if not line:
+                continue
+            response = json.dumps(handle_line(line)) + '\n'
+            self.wfile.write(response.encode('utf-8'))
+            self.wfile.flush()
+
+def serve_socket(socket_path):
+    if not hasattr(socket, 'AF_UNIX'):
+        print("Error: Unix sockets are not supported on this platform", file=sys.stderr)
+        sys.exit(1)
+
+    # Remove a stale socket left behind by a previous run
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    load_and_warm_up()
+    server = socketserver.ThreadingUnixStreamServer(socket_path, RecognitionRequestHandler)
+    server.daemon_threads = True
+    print(f"Listening on {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def request_server(request, socket_path, timeout=30.0):
+    # Send a single request to a running recognition server
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(socket_path)
+        client.sendall((json.dumps(request) + '\n').encode('utf-8'))
+
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data.decode('utf-8'))
+
+def recognize_plate(image_path, socket_path=DEFAULT_SOCKET_PATH):
+    # Prefer a warm server when one is running; fall back to in-process OCR
+    if hasattr(socket, 'AF_UNIX') and os.path.exists(socket_path):
+        try:
+            response = request_server({'path': os.path.abspath(image_path)}, socket_path)
+        except (OSError, ValueError):
+            response = None
+        if response is not None:
+            if response.get('plate'):
+                print(response['plate'])
+                sys.exit(0)
+            print(response.get('error', "No valid plate number found"), file=sys.stderr)
+            sys.exit(1)
+
     # Read image
     image = cv2.imread(image_path)
     if image is None:
         print("Error: Could not read image file", file=sys.stderr)
         sys.exit(1)
-    
-    # Preprocess image
-    processed_img = preprocess_image(image)
-    
-    # Initialize EasyOCR
-    reader = easyocr.Reader(['en'])
-    
-    # Perform OCR
-    results = reader.readtext(processed_img)
-    
-    # Process results
-    for (bbox, text, prob) in results:
-        # Clean and validate the text
-        plate_number = clean_plate_text(text)
-        if plate_number:
-            print(plate_number)
-            sys.exit(0)
-    
+
+    candidates = recognize_image(image)
+    if candidates:
+        print(candidates[0]['plate'])
+        sys.exit(0)
+
     print("No valid plate number found", file=sys.stderr)
     sys.exit(1)
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python recognize_plate.py <image_path>", file=sys.stderr)
+def load_roi(config_path):
+    # Read the [roi] section of the gate config.ini, if enabled
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    if not config.has_section('roi') or not config.getboolean('roi', 'enabled', fallback=False):
+        return None
+    return tuple(config.getint('roi', key) for key in ('x', 'y', 'width', 'height'))
+
+def parse_roi(value):
+    try:
+        x, y, w, h = (int(part) for part in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError("ROI must be x,y,width,height")
+    return (x, y, w, h)
+
+def load_capture_metadata(capture_dir, catalog_path=None):
+    # Capture metadata by filename: from the gate's SQLite capture catalog
+    # (capture_catalog.db next to the capture directory by default) and from
+    # any JSON sidecars left over from before the catalog
+    metadata = {}
+    if catalog_path is None:
+        catalog_path = os.path.join(os.path.dirname(os.path.abspath(capture_dir)), 'capture_catalog.db')
+    if os.path.exists(catalog_path):
+        conn = sqlite3.connect(catalog_path)
+        try:
+            for filename, record in conn.execute("SELECT filename, metadata FROM captures"):
+                metadata[filename] = json.loads(record)
+        except sqlite3.Error as e:
+            print(f"Could not read capture catalog {catalog_path}: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+
+    for filename in os.listdir(capture_dir):
+        if not filename.lower().endswith('.jpg.json'):
+            continue
+        image_name = filename[:-len('.json')]
+        if image_name in metadata:
+            continue
+        try:
+            with open(os.path.join(capture_dir, filename), 'r') as f:
+                metadata[image_name] = json.load(f)
+        except ValueError:
+            continue
+    return metadata
+
+def historical_plate_boxes(capture_dir, catalog_path=None):
+    # Plate boxes from capture metadata when recorded, otherwise localized
+    # afresh. Also returns the largest frame size seen so the ROI can be clamped
+    boxes = []
+    frame_width, frame_height = 0, 0
+    captures = load_capture_metadata(capture_dir, catalog_path)
+    for filename in sorted(os.listdir(capture_dir)):
+        if not filename.lower().endswith('.jpg'):
+            continue
+        image_path = os.path.join(capture_dir, filename)
+
+        box = None
+        metadata = captures.get(filename)
+        if metadata:
+            box = metadata.get('plate_bbox')
+            resolution = metadata.get('resolution') or {}
+            frame_width = max(frame_width, resolution.get('width', 0))
+            frame_height = max(frame_height, resolution.get('height', 0))
+
+        if box is None:
+            image = cv2.imread(image_path)
+            if image is None:
+                continue
+            frame_height = max(frame_height, image.shape[0])
+            frame_width = max(frame_width, image.shape[1])
+            box = locate_plate(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+
+        if box:
+            boxes.append(box)
+    return boxes, (frame_width, frame_height)
+
+def calibrate_roi(capture_dir, catalog_path=None):
+    boxes, (frame_width, frame_height) = historical_plate_boxes(capture_dir, catalog_path)
+    if not boxes:
+        return None
+
+    boxes = np.array(boxes, dtype=np.float64)
+    low, high = ROI_PERCENTILES
+    x0 = np.percentile(boxes[:, 0], low)
+    y0 = np.percentile(boxes[:, 1], low)
+    x1 = np.percentile(boxes[:, 0] + boxes[:, 2], high)
+    y1 = np.percentile(boxes[:, 1] + boxes[:, 3], high)
+
+    margin_x = (x1 - x0) * ROI_MARGIN
+    margin_y = (y1 - y0) * ROI_MARGIN
+    x0, y0 = max(x0 - margin_x, 0), max(y0 - margin_y, 0)
+    x1, y1 = x1 + margin_x, y1 + margin_y
+    if frame_width and frame_height:
+        x1, y1 = min(x1, frame_width), min(y1, frame_height)
+    return (int(x0), int(y0), int(round(x1 - x0)), int(round(y1 - y0)))
+
+def save_roi(config_path, roi):
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    if not config.has_section('roi'):
+        config.add_section('roi')
+    config.set('roi', 'enabled', 'true')
+    for key, value in zip(('x', 'y', 'width', 'height'), roi):
+        config.set('roi', key, str(value))
+    with open(config_path, 'w') as f:
+        config.write(f)
+
+def run_calibration(capture_dir, config_path, catalog_path=None):
+    # Learn the ROI over full frames, ignoring any ROI already configured
+    PREPROCESS_PARAMS['roi'] = None
+    roi = calibrate_roi(capture_dir, catalog_path)
+    if roi is None:
+        print("No plate boxes found in capture directory", file=sys.stderr)
         sys.exit(1)
-    
-    recognize_plate(sys.argv[1]) 
\ No newline at end of file
+
+    print("ROI: x={} y={} width={} height={}".format(*roi))
+    if config_path:
+        save_roi(config_path, roi)
+        print(f"Saved to {config_path}")
+    sys.exit(0)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="License plate recognition")
+    parser.add_argument('image_path', nargs='?', help="Image to recognize")
+    parser.add_argument('--config', default=None,
+                        help="Gate config.ini to read the [roi] section from")
+    parser.add_argument('--roi', type=parse_roi, default=None,
+                        help="Region of interest as x,y,width,height (overrides --config)")
+    parser.add_argument('--calibrate-roi', dest='calibrate_dir', default=None,
+                        help="Learn the ROI from plate boxes in a capture directory "
+                             "and store it in --config")
+    parser.add_argument('--catalog', default=None,
+                        help="Capture catalog database (default: capture_catalog.db next to "
+                             "the capture directory)")
+    parser.add_argument('--serve', action='store_true',
+                        help="Run as a long-lived recognition server")
+    parser.add_argument('--socket', dest='socket_path', default=None,
+                        help="Unix socket path (server: listen here instead of stdin/stdout)")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help="Server result cache entries (0 disables the cache)")
+    parser.add_argument('--cache-db', default=None,
+                        help="Optional SQLite file that persists the result cache")
+    parser.add_argument('--cache-ttl', type=float, default=0,
+                        help="Seconds a cached result stays valid (0 keeps it until evicted)")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Number of OCR worker processes (0 runs OCR in the server process)")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Maximum jobs waiting for a worker before new ones are rejected")
+    parser.add_argument('--job-timeout', type=float, default=DEFAULT_JOB_TIMEOUT,
+                        help="Seconds a job may wait before it is dropped")
+    parser.add_argument('--no-fast-localization', dest='fast_localization', action='store_false',
+                        help="Always use the full-resolution contour search")
+    args = parser.parse_args(argv)
+    if not args.serve and not args.calibrate_dir and not args.image_path:
+        parser.error("image_path is required unless --serve or --calibrate-roi is given")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    PREPROCESS_PARAMS['fast_localization'] = args.fast_localization
+    if args.roi:
+        PREPROCESS_PARAMS['roi'] = args.roi
+    elif args.config:
+        PREPROCESS_PARAMS['roi'] = load_roi(args.config)
+
+    if args.calibrate_dir:
+        run_calibration(args.calibrate_dir, args.config, args.catalog)
+
+    if args.serve:
+        if args.cache_size > 0:
+            _cache = ResultCache(args.cache_size, args.cache_db, args.cache_ttl or None)
+        if args.workers > 0:
+            _pool = RecognitionPool(args.workers, args.queue_size, args.job_timeout)
+
+        try:
+            if args.socket_path:
+                serve_socket(args.socket_path)
+            else:
+                serve_stdio()
+        finally:
+            if _pool is not None:
+                _pool.close()
+    else:
+        recognize_plate(args.image_path, args.socket_path or DEFAULT_SOCKET_PATH)
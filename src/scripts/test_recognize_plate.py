@@ -0,0 +1,308 @@
+import os
+import json
+import time
+import base64
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+import recognize_plate
+from recognize_plate import (RecognitionPool, ResultCache, fuse_frames, recognize_batch,
+                             locate_plate_fast, locate_plate_regions, apply_roi, calibrate_roi,
+                             decode_base64_image, read_shared_frame, clean_plate_text, correct_plate_text,
+                             score_plate_text, extract_candidates)
+
+class FakeReader:
+    """Stands in for easyocr.Reader, answering every region with fixed OCR results"""
+
+    def __init__(self, results=None, delay=0.0):
+        self.results = results if results is not None else [([(0, 0)], 'B1234XY', 0.9)]
+        self.delay = delay
+        self.calls = 0
+
+    def readtext(self, image, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.results
+
+class BatchReader:
+    """Fake reader whose text encodes the frame's fill value, recording batch calls"""
+
+    def __init__(self):
+        self.batches = []
+
+    def read(self, image):
+        return [([(0, 0)], f"B{int(image.flat[0]) + 1}234XY", 0.9)]
+
+    def readtext(self, image, **kwargs):
+        self.batches.append(1)
+        return self.read(image)
+
+    def readtext_batched(self, images, **kwargs):
+        self.batches.append(len(images))
+        return [self.read(image) for image in images]
+
+def frames(count, shape=(60, 200, 3)):
+    return [np.zeros(shape, dtype=np.uint8) for _ in range(count)]
+
+def crashing_worker(worker_id, jobs, results, preprocess_params):
+    # Stands in for _pool_worker without loading EasyOCR; 'crash' kills the process
+    results.put(('ready', worker_id, None, None, 0.0))
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, deadline, kind, payload = job
+        results.put(('started', worker_id, job_id, None, 0.0))
+        if payload == 'crash':
+            # Give the queue's feeder thread time to deliver 'started'
+            time.sleep(0.2)
+            os._exit(1)
+        results.put(('done', worker_id, job_id, payload, 0.0))
+
+def never_ready_worker(worker_id, jobs, results, preprocess_params):
+    # A worker stuck loading its model
+    jobs.get()
+
+def ocr_result(text, left, confidence):
+    # EasyOCR result tuple: (box corners, text, confidence)
+    return ([(left, 0), (left + 40, 0), (left + 40, 20), (left, 20)], text, confidence)
+
+class TestPlateGrammar(unittest.TestCase):
+    def test_clean_plate_text(self):
+        self.assertEqual(clean_plate_text('b-1234 xy'), 'B1234XY')
+        self.assertIsNone(clean_plate_text('B1'))
+        self.assertIsNone(clean_plate_text('B123456789'))
+
+    def test_confusable_characters_are_corrected_by_position(self):
+        self.assertEqual(correct_plate_text('8I234XY'), ('B1234XY', 2))
+        self.assertEqual(correct_plate_text('B12345'), ('B1234S', 1))
+        self.assertEqual(correct_plate_text('AB1234CD'), ('AB1234CD', 0))
+
+    def test_invalid_text_is_rejected(self):
+        self.assertEqual(correct_plate_text('QQ1234'), (None, 0))
+        self.assertEqual(correct_plate_text('B0123XY'), (None, 0))
+        self.assertIsNone(score_plate_text('XX', 0.9))
+
+    def test_grammar_and_corrections_affect_score(self):
+        exact = score_plate_text('B1234XY', 0.9)
+        corrected = score_plate_text('8I234XY', 0.9)
+        ungrammatical = score_plate_text('12345678', 0.9)
+        self.assertTrue(exact['grammatical'])
+        self.assertAlmostEqual(exact['score'], 0.9)
+        self.assertLess(corrected['score'], exact['score'])
+        self.assertFalse(ungrammatical['grammatical'])
+        self.assertLess(ungrammatical['score'], corrected['score'])
+
+    def test_fragments_are_joined_left_to_right(self):
+        candidates = extract_candidates([ocr_result('XYZ', 60, 0.8), ocr_result('B 1234', 0, 0.9)])
+        self.assertEqual([candidate['plate'] for candidate in candidates], ['B1234XYZ'])
+
+    def test_candidates_ranked_one_per_plate(self):
+        candidates = extract_candidates([ocr_result('B1234XY', 0, 0.6), ocr_result('B1234XY', 0, 0.9)])
+        self.assertEqual(len(candidates), 1)
+        self.assertAlmostEqual(candidates[0]['confidence'], 0.9)
+
+class TestRecognizeBatch(unittest.TestCase):
+    def test_results_keep_source_order_across_shape_groups(self):
+        small = [np.full((20, 80), value, dtype=np.uint8) for value in (0, 2, 4)]
+        large = [np.full((40, 160), value, dtype=np.uint8) for value in (1, 3)]
+        sources = [small[0], large[0], b'', small[1], large[1], small[2]]
+        reader = BatchReader()
+        with mock.patch.object(recognize_plate, '_reader', reader), \
+                mock.patch.object(recognize_plate, 'preprocess_image', lambda image: image):
+            results = recognize_batch(sources, batch_size=2)
+
+        plates = [result['candidates'][0]['plate'] if result['candidates'] else None for result in results]
+        self.assertEqual(plates, ['B1234XY', 'B2234XY', None, 'B3234XY', 'B4234XY', 'B5234XY'])
+        self.assertEqual(results[2]['error'], "Could not read image file")
+        # Same-shape images share a forward pass, at most batch_size at a time
+        self.assertEqual(sorted(reader.batches), [1, 2, 2])
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.caches = []
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.db.close()
+        shutil.rmtree(self.dir)
+
+    def make(self, **kwargs):
+        cache = ResultCache(db_path=os.path.join(self.dir, 'cache.db'), **kwargs)
+        self.caches.append(cache)
+        return cache
+
+    def test_key_depends_on_pixels(self):
+        image = np.zeros((10, 10, 3), dtype=np.uint8)
+        changed = image.copy()
+        changed[5, 5] = 1
+        self.assertEqual(ResultCache.make_key(image), ResultCache.make_key(image.copy()))
+        self.assertNotEqual(ResultCache.make_key(image), ResultCache.make_key(changed))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResultCache(max_entries=2)
+        cache.put('a', {'plate': 'A'})
+        cache.put('b', {'plate': 'B'})
+        self.assertEqual(cache.get('a'), {'plate': 'A'})
+        cache.put('c', {'plate': 'C'})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'plate': 'A'})
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['hits'], stats['misses']), (2, 2, 1))
+
+    def test_expired_entries_are_misses(self):
+        cache = self.make(ttl=60)
+        cache.put('a', {'plate': 'A'})
+        with mock.patch.object(recognize_plate.time, 'time', return_value=time.time() + 120):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_database_survives_restart_and_is_trimmed(self):
+        cache = self.make(max_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, {'plate': key.upper()})
+            time.sleep(0.01)
+        self.assertEqual(cache.db.execute("SELECT COUNT(*) FROM results").fetchone()[0], 2)
+
+        restarted = self.make(max_entries=2)
+        self.assertEqual(restarted.get('c'), {'plate': 'C'})
+        self.assertIsNone(restarted.get('a'))
+
+def plate_frame(rect, size=(1080, 1920)):
+    # Grayscale frame with one white plate-shaped box on black
+    gray = np.zeros(size, dtype=np.uint8)
+    x, y, w, h = rect
+    cv2.rectangle(gray, (x, y), (x + w, y + h), 255, -1)
+    return gray
+
+class TestLocalization(unittest.TestCase):
+    def test_fast_search_maps_back_to_full_resolution(self):
+        expected = (800, 600, 400, 100)
+        rects = locate_plate_fast(plate_frame(expected))
+        self.assertEqual(len(rects), 1)
+        # 1920 px is searched at 480 px, so coordinates are exact to ~2 pyramid pixels
+        for found, wanted in zip(rects[0], expected):
+            self.assertAlmostEqual(found, wanted, delta=8)
+
+    def test_implausible_shapes_are_rejected(self):
+        self.assertEqual(locate_plate_fast(plate_frame((800, 400, 200, 200))), [])
+        self.assertEqual(locate_plate_fast(np.zeros((1080, 1920), dtype=np.uint8)), [])
+
+    def test_full_search_is_the_fallback(self):
+        gray = plate_frame((100, 100, 200, 50), size=(480, 640))
+        with mock.patch.object(recognize_plate, 'locate_plate_fast', return_value=[]) as fast, \
+                mock.patch.object(recognize_plate, 'locate_plate_full', return_value=[(1, 2, 3, 4)]) as full:
+            self.assertEqual(locate_plate_regions(gray), [(1, 2, 3, 4)])
+        fast.assert_called_once()
+        full.assert_called_once()
+
+class TestRoi(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_apply_roi_crops_and_clamps(self):
+        image = np.arange(100 * 200).reshape(100, 200)
+        self.assertEqual(apply_roi(image, (50, 20, 40, 30)).shape, (30, 40))
+        self.assertEqual(apply_roi(image, (50, 20, 40, 30))[0, 0], image[20, 50])
+        self.assertEqual(apply_roi(image, (150, 80, 100, 100)).shape, (20, 50))
+        # Nothing configured, or a box outside the frame, keeps the whole frame
+        self.assertIs(apply_roi(image, None), image)
+        self.assertIs(apply_roi(image, (300, 0, 10, 10)), image)
+
+    def add_captures(self, box, count=10):
+        for index in range(count):
+            name = f"TKT{index:04d}_{index:04d}.jpg"
+            open(os.path.join(self.dir, name), 'wb').close()
+            with open(os.path.join(self.dir, name + '.json'), 'w') as f:
+                json.dump({'plate_bbox': box, 'resolution': {'width': 1920, 'height': 1080}}, f)
+
+    def test_calibrate_roi_adds_margin_around_plate_boxes(self):
+        self.add_captures([100, 500, 200, 50])
+        self.assertEqual(calibrate_roi(self.dir), (70, 492, 260, 65))
+
+    def test_calibrate_roi_is_clamped_to_the_frame(self):
+        self.add_captures([1800, 1000, 120, 80])
+        self.assertEqual(calibrate_roi(self.dir), (1782, 988, 138, 92))
+
+    def test_calibrate_roi_without_boxes(self):
+        self.assertIsNone(calibrate_roi(self.dir))
+
+class TestImageHandoff(unittest.TestCase):
+    def test_decode_base64_image(self):
+        frame = np.random.randint(0, 255, (20, 30, 3), dtype=np.uint8)
+        ok, encoded = cv2.imencode('.png', frame)
+        self.assertTrue(ok)
+        data = base64.b64encode(encoded.tobytes()).decode('ascii')
+        np.testing.assert_array_equal(decode_base64_image(data), frame)
+        np.testing.assert_array_equal(decode_base64_image('data:image/png;base64,' + data), frame)
+        self.assertIsNone(decode_base64_image('not base64!'))
+        self.assertIsNone(decode_base64_image(base64.b64encode(b'not an image').decode('ascii')))
+
+    def test_read_shared_frame_copies_the_segment(self):
+        frame = np.random.randint(0, 255, (20, 30, 3), dtype=np.uint8)
+        segment = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        try:
+            shared = np.ndarray(frame.shape, dtype=frame.dtype, buffer=segment.buf)
+            shared[:] = frame
+            header = {'name': segment.name, 'shape': list(frame.shape), 'dtype': 'uint8'}
+            # The segment stays owned by its creator (here, this process)
+            with mock.patch.object(recognize_plate.resource_tracker, 'unregister') as unregister:
+                result = read_shared_frame(header)
+                self.assertIsNone(read_shared_frame(dict(header, shape=[40, 30, 3])))
+            self.assertEqual(unregister.call_count, 2)
+            np.testing.assert_array_equal(result, frame)
+            # The caller may reuse the segment as soon as the call returns
+            shared[:] = 0
+            np.testing.assert_array_equal(result, frame)
+            del shared
+        finally:
+            segment.close()
+            segment.unlink()
+        self.assertIsNone(read_shared_frame(header))
+
+class TestFusion(unittest.TestCase):
+    def test_consensus_stops_further_ocr(self):
+        reader = FakeReader(delay=0.2)
+        with mock.patch.object(recognize_plate, '_reader', reader):
+            started = time.time()
+            result = fuse_frames(frames(8))
+            elapsed = time.time() - started
+        self.assertEqual(result['plate'], 'B1234XY')
+        self.assertEqual(result['frames_read'], 2)
+        # One more read may already hold the reader when consensus is reached
+        self.assertLessEqual(reader.calls, 3)
+        self.assertLess(elapsed, 0.8)
+
+class TestRecognitionPool(unittest.TestCase):
+    def test_dead_worker_fails_its_job_and_is_respawned(self):
+        pool = RecognitionPool(1, job_timeout=5, worker=crashing_worker)
+        try:
+            pool.wait_ready(timeout=30)
+            future = pool.submit('candidates', 'crash')
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=10)
+            self.assertEqual(pool.run('candidates', 'ok'), 'ok')
+            stats = pool.stats()
+            self.assertEqual(stats['workers'][0]['restarts'], 1)
+            self.assertEqual(stats['in_flight'], 0)
+        finally:
+            pool.close()
+
+    def test_wait_ready_times_out(self):
+        pool = RecognitionPool(1, worker=never_ready_worker)
+        try:
+            with self.assertRaises(TimeoutError):
+                pool.wait_ready(timeout=0.5)
+        finally:
+            pool.close()
+
+if __name__ == '__main__':
+    unittest.main()